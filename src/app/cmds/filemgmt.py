@@ -2,7 +2,10 @@ from .base_cmd import CmdBase
 from generate_code.gen_java import PySourceAsJava
 import wx
 import os
-from parsing.api import old_parser, new_parser
+import sys
+from parsing.api import old_parser, new_parser, iter_parse_files, Reachable
+from parsing.parse_cache import ParseCache
+from view.watch_sync import WatchSync
 from app.settings import RefreshPlantUmlEvent
 from gui.coord_utils import setpos, getpos
 from gui.settings import PRO_EDITION, ALSM_PARSING
@@ -25,6 +28,8 @@ except AttributeError:
 log = logging.getLogger(__name__)
 config_log(log)
 
+PARALLEL_PARSE_MIN_FILES = 20  # importing fewer files than this, a pool of workers costs more than it saves
+
 class CmdFileNew(CmdBase):
     def execute(self):
         self.context.umlcanvas.Clear()
@@ -117,13 +122,11 @@ class CmdFileImportBase(CmdBase):  # BASE
 
     def _old_parse_and_build_graph(self):
         pmodels = []
+        parsed = []
         msgs = ""
-        for f in self.files:
-            # pmodel, debuginfo = old_parser(f)
-            # pmodel, debuginfo = new_parser(f)
-            mode = getattr(self, "mode", 2)
-            # print(f"Importing Python in syntax mode {mode}")
-            pmodel, debuginfo = new_parser(f, options={"mode": mode})
+        mode = getattr(self, "mode", 2)
+        # print(f"Importing Python in syntax mode {mode}")
+        for f, pmodel, debuginfo, elapsed in self._iter_parse(options={"mode": mode}):
             if pmodel.errors:
                 # print(pmodel.errors)
                 msgs += pmodel.errors + "\n"
@@ -141,8 +144,11 @@ class CmdFileImportBase(CmdBase):  # BASE
                 log.exception(
                     'You probably need to upgrade your version of beautifultable e.g. pip install beautifultable --upgrade')
 
-            self.context.displaymodel.build_graphmodel(pmodel)
-            # self.context.displaymodel.Dump(msg="import, after build_graphmodel")
+            parsed.append(pmodel)
+
+        # all in one go, each class's attrs and meths merged once however many files mention it
+        self.context.displaymodel.build_graphmodel_bulk(parsed)
+        # self.context.displaymodel.Dump(msg="import, after build_graphmodel")
 
         msgs += "\n"
         for pmodel in pmodels:
@@ -150,6 +156,40 @@ class CmdFileImportBase(CmdBase):  # BASE
 
         return msgs
 
+    def _iter_parse(self, options):
+        return iter_parse_files(self.files, options=options, jobs=self._parse_jobs(len(self.files)), cache=self._parse_cache())
+
+    def _parse_jobs(self, num_files=None):
+        """
+        Parsing in worker processes is opt in, add e.g. ParseJobs = 4 to your pynsource.ini,
+        or ParseJobs = 0 for one worker per cpu core.  Otherwise files are parsed in this process.
+        """
+        # Worker processes misbehave in a pyinstaller bundle (see notes in pynsource-gui.py
+        # re freeze_support), so only parse in parallel when running from source.
+        if getattr(sys, 'frozen', False):
+            return 1
+        if num_files is not None and num_files < PARALLEL_PARSE_MIN_FILES:
+            return 1
+        try:
+            return int(self.context.config.get("ParseJobs", 1))
+        except ValueError:
+            log.warning(f"ParseJobs in {self.context.config.filename} should be a number, parsing in this process")
+            return 1
+
+    def _parse_cache(self):
+        """
+        The on disk parse cache is opt in too, add ParseCache = yes to your pynsource.ini, plus
+        e.g. ParseCacheDir = ~/pynsource-cache to keep it somewhere other than the default.
+        """
+        config = self.context.config
+        if str(config.get("ParseCache", "no")).lower() not in ("yes", "true", "on", "1"):
+            return None
+        try:
+            return ParseCache(os.path.expanduser(config.get("ParseCacheDir", "")) or None)
+        except OSError:
+            log.exception("Could not create parse cache directory, parsing without a cache")
+            return None
+
 
 class CmdFileImportFromFilePath(CmdFileImportBase):  # was class CmdFileImportSource(CmdBase):
     def __init__(self, files=None):
@@ -216,6 +256,79 @@ class CmdFileImportViaArgs(CmdFileImportBase):
         log.info("Importing files passed on command line, Python mode is {self.mode} files are {files}")
 
 
+class CmdFileImportReachable(CmdFileImportBase):
+    """
+    Imports the entry modules passed in plus every module they transitively import, found
+    under the source roots, rather than a whole source tree - so tests, vendored code and
+    dead modules aren't parsed.  Modules are parsed in parallel as they are discovered.
+    Example Usage:
+        python3 src/pynsource-gui.py --follow-imports src/pynsource-cli.py
+    """
+    def __init__(self, files=None, mode=3, source_roots=None, max_depth=None):
+        self.files = files
+        self.mode = mode
+        self.source_roots = source_roots
+        self.max_depth = max_depth
+
+    def _iter_parse(self, options):
+        self.reachable = Reachable(self.files, self.source_roots, self.max_depth)
+        log.info(f"Importing modules reachable from {self.files}, source roots {self.reachable.source_roots}")
+        return self.reachable.iter_parse(options, jobs=self._parse_jobs(), cache=self._parse_cache())
+
+
+class CmdFileWatch(CmdBase):
+    """
+    Imports all the Python files in a directory tree, then keeps the diagram in sync as files
+    change, re-parsing just the changed files and updating just the affected shapes, so that
+    the layout is preserved.
+    Example Usage:
+        python3 src/pynsource-gui.py --watch src/layout
+    """
+    def __init__(self, directory, mode=3):
+        self.directory = directory
+        self.mode = mode
+
+    def execute(self):
+        previous = getattr(self.context.wxapp, "file_watch", None)
+        if previous:
+            previous.stop()
+        self.context.wxapp.file_watch = self
+
+        workspace_was_empty: bool = len(self.context.displaymodel.graph.nodes) == 0
+        self.sync = WatchSync(self.context.displaymodel, self.directory, options={"mode": self.mode})
+        log.info(f"Watching {len(self.sync.watcher.files)} files in {self.directory}")
+        self.sync.import_all()
+        self.refresh_view(layout=workspace_was_empty)
+
+        self.timer = wx.Timer(self.context.frame)
+        self.context.frame.Bind(wx.EVT_TIMER, self.on_timer, self.timer)
+        self.timer.Start(int(self.sync.watcher.interval * 1000))
+
+    def stop(self):
+        self.timer.Stop()
+
+    def on_timer(self, event):
+        batch, changes = self.sync.poll()
+        if not batch:
+            return
+        log.info(f"Watch: {len(batch.changed)} files changed, {len(batch.removed)} removed")
+        for errors in self.sync.errors.values():
+            log.warning(errors)
+
+        if any(changes):  # build_view() deletes the shapes of whatever was removed
+            self.refresh_view(layout=False, remove_overlaps=bool(changes.added_nodes))
+
+    def refresh_view(self, layout, remove_overlaps=True):
+        self.context.umlcanvas.displaymodel.build_view(translatecoords=False)
+        self.context.umlcanvas.GetDiagram().ShowAll(1)
+        if layout:
+            self.context.umlcanvas.layout_and_position_shapes()
+        elif remove_overlaps:
+            self.context.overlap_remover.RemoveOverlaps(watch_removals=True)
+        self.context.umlcanvas.mega_refresh()
+        wx.PostEvent(self.context.frame, RefreshPlantUmlEvent())
+
+
 class CmdBootStrap(CmdBase):
     def execute(self):
         self.frame = self.context.frame
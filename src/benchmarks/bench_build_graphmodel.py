@@ -0,0 +1,82 @@
+# Display model graph construction from many pmodels - build_graphmodel_bulk() vs
+# build_graphmodel() called once per pmodel
+#
+# Run with
+# python -m benchmarks.bench_build_graphmodel [--modules 1000] [--repeat 3]
+#
+# from the src directory.  Each generated module defines a few classes of its own, inheriting
+# from and composed of a pool of shared classes, plus its own methods and attrs of a class
+# 'Common' which every module extends - so popular classes are mentioned by most modules,
+# as base classes and utility classes are in real projects.
+
+import argparse
+import random
+import time
+from parsing.api import parse_text
+from view.display_model import DisplayModel
+
+
+def module_source(i, rnd, num_shared=50):
+    lines = []
+    for k in range(3):
+        base = f"Shared{rnd.randrange(num_shared)}"
+        lines += [f"class C{i}_{k}({base}):", "    def __init__(self):"]
+        lines += [f"        self.s{j} = Shared{rnd.randrange(num_shared)}()" for j in range(3)]
+        lines += [f"        self.a{j} = {j}" for j in range(10)]
+        lines += [f"    def m{j}(self):\n        pass" for j in range(5)]
+    lines += ["class Common:", "    def __init__(self):", f"        self.common{i} = C{i}_0()"]
+    lines += [f"    def common_m{i}(self):\n        pass"]
+    return "\n".join(lines) + "\n"
+
+
+def make_pmodels(num_modules, seed=1):
+    rnd = random.Random(seed)
+    pmodels = []
+    for i in range(num_modules):
+        pmodel, _ = parse_text(module_source(i, rnd), f"module{i}.py", options={"mode": 3})
+        pmodels.append(pmodel)
+    return pmodels
+
+
+def graph_of(displaymodel):
+    nodes = sorted((node.id, node.attrs, node.meths) for node in displaymodel.graph.nodes)
+    edges = sorted((e["source"].id, e["target"].id, e["uml_edge_type"]) for e in displaymodel.graph.edges)
+    return nodes, edges
+
+
+def one_by_one(pmodels):
+    displaymodel = DisplayModel()
+    for pmodel in pmodels:
+        displaymodel.build_graphmodel(pmodel)
+    return displaymodel
+
+
+def bulk(pmodels):
+    displaymodel = DisplayModel()
+    displaymodel.build_graphmodel_bulk(pmodels)
+    return displaymodel
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark building the display model graph")
+    parser.add_argument("--modules", type=int, default=1000, help="number of modules")
+    parser.add_argument("--repeat", type=int, default=3, help="take the best of this many runs")
+    args = parser.parse_args()
+
+    pmodels = make_pmodels(args.modules)
+    results = {}
+    for build in (one_by_one, bulk):
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            displaymodel = build(pmodels)
+            best = min(best, time.perf_counter() - start)
+        results[build.__name__] = graph_of(displaymodel)
+        print(f"{build.__name__:<11} {best * 1000:9.1f} ms")
+    nodes, edges = results["bulk"]
+    assert results["one_by_one"] == results["bulk"], "graphs differ"
+    print(f"{args.modules} modules, {len(nodes)} nodes, {len(edges)} edges")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# Graph edge lookups - the indexed edge store vs scanning the whole edge list, as the Graph did
+#
+# Run with
+# python -m benchmarks.bench_graph_edges [--sizes 1000,5000,10000,50000] [--scan-max N]
+#
+# from the src directory.  For each number of edges E a random class diagram is built the way
+# DisplayModel.AddUmlEdge does - FindEdge() for duplicates before every AddEdge() - then every
+# edge is looked up again, the edges of each node are found, and 1% of the nodes are deleted.
+# Scanning is O(E^2) to build, so is only run up to --scan-max edges.
+
+import argparse
+import random
+import time
+from view.graph import Graph, GraphNode
+
+EDGE_TYPES = ("composition", "generalisation", "association")
+
+
+class ScanningGraph(Graph):
+    """The Graph as it was, every edge lookup a scan of the whole edge list"""
+
+    def find_edges_for(self, node):
+        return [edge for edge in self.edges if edge["source"] == node or edge["target"] == node]
+
+    def FindEdge(self, from_node, to_node, edge_type):
+        for edge in self.edges:
+            if edge["source"] == from_node and edge["target"] == to_node and edge.get("uml_edge_type", "") == edge_type:
+                return edge
+        return None
+
+    def DeleteNode(self, node):
+        self.nodes.remove(node)
+        del self.nodeSet[node.id]
+        for edge in self.edges[:]:
+            if edge["source"].id == node.id or edge["target"].id == node.id:
+                self.delete_edge(edge)
+
+    def delete_edge(self, edge):
+        self.edges.remove(edge)
+
+
+def random_edges(num_edges, seed=1):
+    """(from, to, edge_type) triples between num_edges / 4 nodes, about 5% of them duplicates"""
+    rnd = random.Random(seed)
+    num_nodes = max(2, num_edges // 4)
+    return num_nodes, [
+        (rnd.randrange(num_nodes), rnd.randrange(num_nodes), rnd.choice(EDGE_TYPES)) for _ in range(num_edges)
+    ]
+
+
+def run(graph_class, num_nodes, edges):
+    timings = {}
+    graph = graph_class()
+    nodes = [graph.AddNode(GraphNode(f"C{i}", 0, 0)) for i in range(num_nodes)]
+
+    start = time.perf_counter()
+    for i, j, edge_type in edges:
+        if not graph.FindEdge(nodes[i], nodes[j], edge_type):
+            graph.AddEdge(nodes[i], nodes[j])["uml_edge_type"] = edge_type
+    timings["build"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found = sum(1 for i, j, edge_type in edges if graph.FindEdge(nodes[i], nodes[j], edge_type))
+    timings["find"] = time.perf_counter() - start
+    assert found == len(edges)
+
+    start = time.perf_counter()
+    for node in nodes:
+        graph.find_edges_for(node)
+    timings["edges_for"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for node in nodes[:: 100]:
+        graph.DeleteNode(node)
+    timings["delete"] = time.perf_counter() - start
+    return timings, len(graph.edges)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Graph edge store")
+    parser.add_argument("--sizes", default="1000,5000,10000,50000", help="comma separated numbers of edges")
+    parser.add_argument("--scan-max", type=int, default=10000, help="largest size to run the scanning graph at")
+    args = parser.parse_args()
+
+    print(f"{'edges':>7} {'graph':<9} {'build':>9} {'find':>9} {'edges_for':>10} {'delete 1%':>10}   (ms)")
+    for size in map(int, args.sizes.split(",")):
+        num_nodes, edges = random_edges(size)
+        results = {}
+        for label, graph_class in (("scanning", ScanningGraph), ("indexed", Graph)):
+            if graph_class is ScanningGraph and size > args.scan_max:
+                print(f"{size:>7} {label:<9} {'skipped, over --scan-max':>41}")
+                continue
+            timings, remaining = run(graph_class, num_nodes, edges)
+            results[label] = remaining
+            print(
+                f"{size:>7} {label:<9} "
+                + " ".join(f"{timings[k] * 1000:{w}.1f}" for k, w in (("build", 9), ("find", 9), ("edges_for", 10), ("delete", 10)))
+            )
+        if len(results) == 2:
+            assert results["scanning"] == results["indexed"], results
+
+
+if __name__ == "__main__":
+    main()
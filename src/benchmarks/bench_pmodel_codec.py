@@ -0,0 +1,66 @@
+# Encode / decode time and size of a large parse model, pmodel_codec vs pickle
+#
+# Run with
+# python -m benchmarks.bench_pmodel_codec [--classes N] [--repeat N] [files...]
+#
+# from the src directory.  The classes of all the files parsed (default: the src tree) are
+# copied, under new names, into one pmodel of the requested size.
+
+import argparse
+import itertools
+import os
+import pickle
+import time
+from glob import glob
+from parsing.api import new_parser
+from parsing.core_parser_ast import OldParseModel
+from parsing.dump_pmodel import pmodel_to_dict
+from parsing import pmodel_codec
+
+
+def big_pmodel(files, num_classes):
+    entries = [c for filename in files for c in new_parser(filename, options={"mode": 3})[0].classlist.values()]
+    pmodel = OldParseModel()
+    pmodel.filename = "big.py"
+    for i, c in zip(range(num_classes), itertools.cycle(entries)):
+        pmodel.classlist[f"{c.name}_{i}"] = pickle.loads(pickle.dumps(c))  # a distinct copy
+    return pmodel
+
+
+def best_time(fn, arg, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(arg)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the binary pmodel codec against pickle")
+    parser.add_argument("files", nargs="*", help="python files to take classes from")
+    parser.add_argument("--classes", type=int, default=50000, help="number of classes in the pmodel")
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs, best is reported")
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob(os.path.join(os.getcwd(), "**", "*.py"), recursive=True))
+    pmodel = big_pmodel(files, args.classes)
+    num_attrs = sum(len(c.attrs) for c in pmodel.classlist.values())
+    print(f"{len(pmodel.classlist)} classes, {num_attrs} attributes, best of {args.repeat}")
+
+    codecs = {
+        "pmodel_codec": (pmodel_codec.encode, pmodel_codec.decode),
+        "pickle": (lambda p: pickle.dumps(p, protocol=pickle.HIGHEST_PROTOCOL), pickle.loads),
+    }
+    for label, (encode, decode) in codecs.items():
+        encode_time, data = best_time(encode, pmodel, args.repeat)
+        decode_time, decoded = best_time(decode, data, args.repeat)
+        assert pmodel_to_dict(decoded) == pmodel_to_dict(pmodel)
+        print(
+            f"  {label:<13} encode {encode_time * 1000:7.1f} ms   decode {decode_time * 1000:7.1f} ms   "
+            f"round trip {(encode_time + decode_time) * 1000:7.1f} ms   {len(data) / 1024:8.1f} KiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# Memory of parse models, compact (slots, interned names) vs the old dict backed classes,
+# plus parse time of classes with very many attributes
+#
+# Run with
+# python -m benchmarks.bench_pmodel_memory [--copies N] [files...]
+#
+# from the src directory.  Defaults to every python file in the src tree.  Each file's
+# pmodel is pickled on its own, as the parse cache and worker processes do, and the
+# memory retained by unpickling them all is measured.
+
+import argparse
+import os
+import pickle
+import time
+import tracemalloc
+from glob import glob
+from parsing.api import new_parser, parse_text
+
+
+class LegacyClassEntry:
+    """ClassEntry as it was, before __slots__ and indexing"""
+
+    def __init__(self, c):
+        self.name = c.name
+        self.name_long = c.name_long
+        self.stack_functions = list(c.stack_functions)
+        self.defs = list(c.defs)
+        self.attrs = [LegacyAttribute(a.attrname, list(a.attrtype)) for a in c.attrs]
+        self.classdependencytuples = list(c.classdependencytuples)
+        self.classesinheritsfrom = list(c.classesinheritsfrom)
+        self.ismodulenotrealclass = c.ismodulenotrealclass
+
+
+class LegacyAttribute:
+    def __init__(self, attrname, attrtype="normal"):
+        self.attrname = attrname
+        self.attrtype = attrtype
+
+
+def legacy_pmodel(pmodel):
+    legacy = pickle.loads(pickle.dumps(pmodel))
+    legacy.classlist = {name: LegacyClassEntry(c) for name, c in pmodel.classlist.items()}
+    return legacy
+
+
+def retained_memory(blobs):
+    """Bytes retained by unpickling all the blobs"""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        pmodels = [pickle.loads(blob) for blob in blobs]
+        return tracemalloc.get_traced_memory()[0] - before, pmodels
+    finally:
+        tracemalloc.stop()
+
+
+def many_attributes_source(n):
+    lines = ["class Big:", "    def __init__(self):"]
+    lines += [f"        self.attr{i} = Thing{i % 50}()" for i in range(n)]
+    lines += [f"        self.attr{i} = []" for i in range(0, n, 2)]  # revisit half of them
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parse model memory and attribute indexing")
+    parser.add_argument("files", nargs="*", help="python files to parse")
+    parser.add_argument("--copies", type=int, default=4, help="load the corpus this many times over")
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob(os.path.join(os.getcwd(), "**", "*.py"), recursive=True))
+    pmodels = [new_parser(filename, options={"mode": 3})[0] for filename in files]
+    compact = [pickle.dumps(pmodel, protocol=pickle.HIGHEST_PROTOCOL) for pmodel in pmodels] * args.copies
+    legacy = [pickle.dumps(legacy_pmodel(pmodel), protocol=pickle.HIGHEST_PROTOCOL) for pmodel in pmodels]
+    legacy *= args.copies
+
+    num_classes = sum(len(pmodel.classlist) for pmodel in pmodels) * args.copies
+    num_attrs = sum(len(c.attrs) for pmodel in pmodels for c in pmodel.classlist.values()) * args.copies
+    compact_bytes, _ = retained_memory(compact)
+    legacy_bytes, _ = retained_memory(legacy)
+    print(f"{len(files)} files x {args.copies}, {num_classes} classes, {num_attrs} attributes")
+    print(f"  legacy  {legacy_bytes / 1024:10.1f} KiB")
+    print(f"  compact {compact_bytes / 1024:10.1f} KiB   {compact_bytes / legacy_bytes:.0%} of legacy")
+
+    print("Parse time of one class with n attributes")
+    for n in (250, 500, 1000, 2000, 4000):
+        source = many_attributes_source(n)
+        start = time.perf_counter()
+        pmodel, _ = parse_text(source, options={"mode": 3})
+        elapsed = time.perf_counter() - start
+        assert len(pmodel.classlist["Big"].attrs) == n
+        print(f"  n={n:<5} {elapsed * 1000:8.1f} ms   {elapsed / n * 1e6:6.1f} us per attribute")
+
+
+if __name__ == "__main__":
+    main()
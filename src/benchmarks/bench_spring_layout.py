@@ -0,0 +1,158 @@
+# Spring layout over struct of arrays node coordinates vs node attributes, as it was done,
+# plus the memory of slotted graph nodes
+#
+# Run with
+# python -m benchmarks.bench_spring_layout [--sizes 50,100,200] [--iterations N]
+#
+# from the src directory.  Each random graph has twice as many edges as nodes and is laid
+# out for a fixed number of iterations, from the same random seed, so both layouts must
+# arrive at exactly the same positions.
+
+import argparse
+import math
+import random
+import time
+import tracemalloc
+from layout.layout_spring import GraphLayoutSpring
+from view.graph import Graph, GraphNode
+
+
+class AttributeSpringLayout(GraphLayoutSpring):
+    """The spring layout as it was, every number an attribute of a node or an edge"""
+
+    def layout(self, keep_current_positions=False, optimise=True):
+        self.layoutPrepare()
+        for i in range(0, self.iterations):
+            self.layoutIteration()
+        self.layoutCalcBounds()
+
+    def layoutIteration(self):
+        for i in range(0, len(self.graph.nodes)):
+            node1 = self.graph.nodes[i]
+            for j in range(i + 1, len(self.graph.nodes)):
+                node2 = self.graph.nodes[j]
+                self.layoutRepulsive(node1, node2)
+        for edge in self.graph.edges:
+            self.layoutAttractive(edge)
+        for node in self.graph.nodes:
+            xmove = self.c * node.layoutForceX
+            ymove = self.c * node.layoutForceY
+            max = self.maxVertexMovement
+            if xmove > max:
+                xmove = max
+            if xmove < -max:
+                xmove = -max
+            if ymove > max:
+                ymove = max
+            if ymove < -max:
+                ymove = -max
+            node.layoutPosX += xmove
+            node.layoutPosY += ymove
+            node.layoutForceX = 0
+            node.layoutForceY = 0
+
+    def layoutRepulsive(self, node1, node2):
+        dx = node2.layoutPosX - node1.layoutPosX
+        dy = node2.layoutPosY - node1.layoutPosY
+        d2 = dx * dx + dy * dy
+        if d2 < 0.01:
+            dx = 0.1 * random.randint(0, 1000) / 1000.0 + 0.1
+            dy = 0.1 * random.randint(0, 1000) / 1000.0 + 0.1
+            d2 = dx * dx + dy * dy
+        d = math.sqrt(d2)
+        if d < self.maxRepulsiveForceDistance:
+            repulsiveForce = self.k * self.k / d
+            node2.layoutForceX += repulsiveForce * dx / d
+            node2.layoutForceY += repulsiveForce * dy / d
+            node1.layoutForceX -= repulsiveForce * dx / d
+            node1.layoutForceY -= repulsiveForce * dy / d
+
+    def layoutAttractive(self, edge):
+        node1 = edge["source"]
+        node2 = edge["target"]
+        dx = node2.layoutPosX - node1.layoutPosX
+        dy = node2.layoutPosY - node1.layoutPosY
+        d2 = dx * dx + dy * dy
+        if d2 < 0.01:
+            dx = 0.1 * random.randint(0, 1000) / 1000.0 + 0.1
+            dy = 0.1 * random.randint(0, 1000) / 1000.0 + 0.1
+            d2 = dx * dx + dy * dy
+        d = math.sqrt(d2)
+        if d > self.maxRepulsiveForceDistance:
+            d = self.maxRepulsiveForceDistance
+            d2 = d * d
+        attractiveForce = (d2 - self.k * self.k) / self.k
+        if (not edge.get("weight", None)) or (edge["weight"] < 1):
+            edge["weight"] = 1
+        attractiveForce *= math.log(edge["weight"]) * 0.5 + 1
+        node2.layoutForceX -= attractiveForce * dx / d
+        node2.layoutForceY -= attractiveForce * dy / d
+        node1.layoutForceX += attractiveForce * dx / d
+        node1.layoutForceY += attractiveForce * dy / d
+
+
+class DictNode:
+    """A graph node as it was, its attributes in a __dict__"""
+
+    def __init__(self, id, left, top, width=60, height=60):
+        self.id = id
+        self.left = left
+        self.top = top
+        self.width = width
+        self.height = height
+        self.layoutPosX = 0
+        self.layoutPosY = 0
+        self.layoutForceX = 0
+        self.layoutForceY = 0
+        self.previous_left = left
+        self.previous_top = top
+
+
+def random_graph(num_nodes, seed=1):
+    rnd = random.Random(seed)
+    graph = Graph()
+    nodes = [graph.AddNode(GraphNode(f"C{i}", 0, 0)) for i in range(num_nodes)]
+    for _ in range(num_nodes * 2):
+        graph.AddEdge(nodes[rnd.randrange(num_nodes)], nodes[rnd.randrange(num_nodes)])
+    return graph
+
+
+def time_layout(layout_class, num_nodes, iterations):
+    graph = random_graph(num_nodes)
+    layouter = layout_class(graph)
+    layouter.iterations = iterations
+    random.seed(1)
+    start = time.perf_counter()
+    layouter.layout(optimise=False)
+    elapsed = time.perf_counter() - start
+    return elapsed, [(node.layoutPosX, node.layoutPosY) for node in graph.nodes]
+
+
+def node_memory(node_class, count=10000):
+    ids = [f"C{i}" for i in range(count)]  # made beforehand, only the nodes themselves count
+    tracemalloc.start()
+    nodes = [node_class(id, 0, 0) for id in ids]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del nodes
+    return size / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the spring layout and graph node memory")
+    parser.add_argument("--sizes", default="50,100,200", help="comma separated numbers of nodes")
+    parser.add_argument("--iterations", type=int, default=200, help="layout iterations")
+    args = parser.parse_args()
+
+    print(f"{'nodes':>6} {'attributes':>11} {'arrays':>9}   (ms for {args.iterations} iterations)")
+    for size in map(int, args.sizes.split(",")):
+        before, positions_before = time_layout(AttributeSpringLayout, size, args.iterations)
+        after, positions_after = time_layout(GraphLayoutSpring, size, args.iterations)
+        assert positions_before == positions_after, "layouts differ"
+        print(f"{size:>6} {before * 1000:>11.1f} {after * 1000:>9.1f}")
+
+    print(f"bytes per node: dict {node_memory(DictNode):.0f}, slotted {node_memory(GraphNode):.0f}")
+
+
+if __name__ == "__main__":
+    main()
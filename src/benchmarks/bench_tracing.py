@@ -0,0 +1,102 @@
+# Parse time and peak memory, with and without visitor tracing
+#
+# Run with
+# python -m benchmarks.bench_tracing [--repeat N] [--mode 3] [files...]
+#
+# from the src directory.  Defaults to parsing all of tests/python-in
+
+import argparse
+import sys
+import time
+import tracemalloc
+from glob import glob
+from parsing.api import new_parser
+from parsing.core_parser_ast import Visitor, ast_backend, _ast_parse
+from parsing.quick_parse import QuickParse
+from common.logwriter import LogWriterNull
+from tests.settings import PYTHON_CODE_EXAMPLES_TO_PARSE
+
+
+def parse_all(files, options):
+    for filename in files:
+        new_parser(filename, options=options)
+
+
+def best_time(files, options, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse_all(files, options)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def peak_memory(files, options):
+    """Largest tracemalloc peak of any single file parse"""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for filename in files:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            new_parser(filename, options=options)
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return max(peaks)
+
+
+def trace_buffer_size(files, options):
+    """Total bytes of debug trace held by the visitor at the end of each parse"""
+    total = 0
+    ast = ast_backend(options["mode"])
+    for filename in files:
+        with open(filename, encoding="utf-8") as f:
+            source = f.read()
+        try:
+            node = _ast_parse(source, ast)
+        except SyntaxError:
+            continue
+        logh = LogWriterNull()
+        v = Visitor(QuickParse(filename, logh, source=source), logh, options, ast)
+        v.source_code_lines = source.splitlines(keepends=True)
+        v.visit(node)
+        total += sys.getsizeof(v.result_for_log_proper) + sum(map(sys.getsizeof, v.result_for_log_proper))
+        total += sys.getsizeof(v.history)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ast parser with tracing on and off")
+    parser.add_argument("files", nargs="*", help="python files to parse")
+    parser.add_argument("--repeat", type=int, default=3, help="timing runs, best is reported")
+    parser.add_argument("--mode", type=int, default=3, help="python syntax mode 2 or 3")
+    args = parser.parse_args()
+
+    files = args.files or sorted(glob(PYTHON_CODE_EXAMPLES_TO_PARSE + "*.py"))
+    parse_all(files, {"mode": args.mode})  # warm up imports and file system cache
+
+    results = {}
+    for label, trace in (("tracing", True), ("production", False)):
+        options = {"mode": args.mode, "TRACE_PARSE": trace}
+        results[label] = (
+            best_time(files, options, args.repeat),
+            peak_memory(files, options),
+            trace_buffer_size(files, options),
+        )
+
+    print(f"{len(files)} files, best of {args.repeat}")
+    for label, (elapsed, peak, trace) in results.items():
+        print(
+            f"  {label:<12} {elapsed * 1000:8.1f} ms   "
+            f"max peak per file {peak / 1024:8.1f} KiB   trace buffers {trace / 1024:8.1f} KiB"
+        )
+    (t_trace, m_trace, b_trace), (t_prod, m_prod, b_prod) = results["tracing"], results["production"]
+    print(
+        f"  speedup {t_trace / t_prod:.2f}x, "
+        f"peak memory {m_prod / m_trace:.0%} of tracing, trace buffers {b_prod / b_trace:.1%} of tracing"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# Visitor traversal - the iterative, dispatch table driven visit vs recursive getattr dispatch
+#
+# Run with
+# python -m benchmarks.bench_visitor_traversal [--repeat N] [--scale N] [files...]
+#
+# from the src directory.  The corpus is that of benchmarks.parse_phases.  Both traversals
+# drive the same visit_ methods, the recursive one the way ast.NodeVisitor does - a getattr
+# of "visit_" + class name per node and a python call frame per level of the tree.  Also
+# reports the deepest expression each can visit.
+
+import argparse
+import sys
+import tempfile
+import time
+from parsing.core_parser_ast import Visitor, ast_backend, _ast_parse, _decode_source
+from parsing.quick_parse import QuickParseAst
+from common.logwriter import LogWriterNull
+from benchmarks.parse_phases import default_corpus, synthetic_modules
+
+
+class RecursiveVisitor(Visitor):
+    """The Visitor driven recursively, as before the iterative traversal"""
+
+    def visit(self, node):
+        self.history.append(node)
+        children = getattr(self, "visit_" + node.__class__.__name__, self.generic_visit)(node)
+        if children is not None:
+            for child in children:
+                self.visit(child)
+
+
+def parse_trees(files, ast):
+    trees = []
+    for filename in files:
+        with open(filename, "rb") as f:
+            try:
+                trees.append(_ast_parse(_decode_source(f.read()), ast))
+            except SyntaxError:
+                pass
+    return trees
+
+
+def visit_all(visitor_class, trees, ast):
+    logh = LogWriterNull()
+    for root in trees:
+        visitor_class(QuickParseAst(root, ast), logh, {}, ast).visit(root)
+
+
+def best_time(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def deepest(visitor_class, ast, depths=(100, 250, 500, 1000, 2000, 2900)):
+    """Deepest 'self.x = a + a + ... + B()' expression visited without error, ast.parse() manages 2900"""
+    ok = 0
+    for depth in depths:
+        root = _ast_parse(f"class A:\n    def f(self):\n        self.x = {'a + ' * depth}B()\n", ast)
+        try:
+            visit_all(visitor_class, [root], ast)
+        except RecursionError:
+            break
+        ok = depth
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Visitor traversal")
+    parser.add_argument("files", nargs="*", help="python files to parse instead of the default corpus")
+    parser.add_argument("--repeat", type=int, default=7, help="timing runs, best is reported")
+    parser.add_argument("--scale", type=int, default=1, help="size of the generated modules, 0 for none")
+    args = parser.parse_args()
+
+    ast = ast_backend(3)
+    with tempfile.TemporaryDirectory() as directory:
+        files = args.files or default_corpus()
+        if args.scale > 0 and not args.files:
+            files += synthetic_modules(directory, args.scale)
+        trees = parse_trees(files, ast)
+
+    num_nodes = sum(1 for root in trees for _ in ast.walk(root))
+    print(f"{len(trees)} files, {num_nodes} nodes, best of {args.repeat}, recursion limit {sys.getrecursionlimit()}")
+    timings = {}
+    for label, visitor_class in (("recursive", RecursiveVisitor), ("iterative", Visitor)):
+        timings[label] = best_time(lambda: visit_all(visitor_class, trees, ast), args.repeat)
+        print(
+            f"  {label:<10} {timings[label] * 1000:8.1f} ms   {num_nodes / timings[label] / 1e6:5.2f} M nodes/sec   "
+            f"deepest expression visited {deepest(visitor_class, ast)}"
+        )
+    print(f"  iterative takes {timings['iterative'] / timings['recursive']:.0%} of the recursive time")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+# Where parse time goes - per phase timings, files/sec and peak memory over a fixed corpus
+#
+# Run with
+# python -m benchmarks.parse_phases [--repeat N] [--output results.json] [--baseline baseline.json]
+#
+# from the src directory.  The corpus is tests/python-in, the python-in of the
+# tests/testing-generate-* directories and some generated large modules, or pass files.
+#
+# Phases, each timed on its own over the whole corpus, best of --repeat runs:
+#   read            reading and decoding the files
+#   quick_parse     the old regex QuickParse pre-scan
+#   ast_parse       ast.parse()
+#   annotate        adding parent/root to the tree, collecting class names (_annotate_tree)
+#   quick_parse_ast QuickParseAst, the default quick parse
+#   visit           the Visitor traversal building the pmodel, including...
+#   rhs_analyser    ...the RhsAnalyser, timed in a separate instrumented run
+#   total           parse() end to end, per file, as the app does it
+#
+# Save the JSON output of a release as a baseline, later runs with --baseline report each
+# metric against it and exit with status 1 if any got worse by more than --tolerance.
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from glob import glob
+from parsing import core_parser_ast
+from parsing.core_parser_ast import Visitor, ast_backend, _annotate_tree, _decode_source, parse
+from parsing.parse_rhs_analyser import RhsAnalyser
+from parsing.quick_parse import QuickParse, QuickParseAst
+from common.logwriter import LogWriterNull
+from tests.settings import PYTHON_CODE_EXAMPLES_TO_PARSE
+
+RESULTS_VERSION = 1
+PHASES = ["read", "quick_parse", "ast_parse", "annotate", "quick_parse_ast", "visit", "rhs_analyser", "total"]
+
+
+def default_corpus():
+    files = glob(PYTHON_CODE_EXAMPLES_TO_PARSE + "*.py")
+    files += glob("tests/testing-generate-*/python-in/*.py")
+    return sorted(files)
+
+
+def synthetic_modules(directory, scale=1):
+    """Write some large generated modules into directory, returns their filenames"""
+    modules = {}
+
+    lines = []
+    num_classes = 100 * scale
+    for i in range(num_classes):
+        lines.append(f"class Class{i}(Class{i // 2}):" if i else "class Class0:")
+        for m in range(10):
+            lines.append(f"    def method{m}(self, a, b=None):")
+            lines.append(f"        self.attr{m} = Class{(i + m) % num_classes}()")
+            lines.append(f"        self.items{m}.append(a)")
+            lines.append(f"        return helper{m}(self.attr{m}, [x for x in b or []])")
+    lines += [f"def helper{m}(a, b):\n    return a" for m in range(10)]
+    modules["synthetic_many_classes.py"] = lines
+
+    lines = ["class Big:", "    def __init__(self):"]
+    lines += [f"        self.attr{i} = Thing{i % 50}()" for i in range(3000 * scale)]
+    modules["synthetic_big_class.py"] = lines
+
+    lines = []
+    for depth in range(40):
+        lines.append("    " * depth + f"class Nested{depth}:")
+        lines.append("    " * (depth + 1) + f"x{depth} = {depth}")
+    modules["synthetic_nested.py"] = lines * scale
+
+    filenames = []
+    for name, lines in modules.items():
+        filename = os.path.join(directory, name)
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        filenames.append(filename)
+    return filenames
+
+
+class TimedRhsAnalyser(RhsAnalyser):
+    elapsed = 0.0
+
+    def __init__(self, visitor):
+        start = time.perf_counter()
+        super().__init__(visitor)
+        TimedRhsAnalyser.elapsed += time.perf_counter() - start
+
+    def is_rhs_reference_to_a_class(self):
+        start = time.perf_counter()
+        result = super().is_rhs_reference_to_a_class()
+        TimedRhsAnalyser.elapsed += time.perf_counter() - start
+        return result
+
+
+def best_time(fn, items, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            fn(*item)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(files, mode=3, repeat=5):
+    """Returns the results dict"""
+    options = {"mode": mode}
+    ast = ast_backend(mode)
+    logh = LogWriterNull()
+
+    sources = []
+    for filename in files:
+        with open(filename, "rb") as f:
+            sources.append((filename, _decode_source(f.read())))
+    trees = []
+    syntax_errors = 0
+    for filename, source in sources:
+        try:
+            trees.append((filename, source, ast.parse(source)))
+        except SyntaxError:
+            syntax_errors += 1
+    for filename, source, root in trees:
+        root.source_code = source
+        _annotate_tree(root, ast)
+
+    def read(filename, source):
+        with open(filename, "rb") as f:
+            _decode_source(f.read())
+
+    def visit(filename, source, root):
+        v = Visitor(QuickParseAst(root, ast), logh, options, ast)
+        v.source_code_lines = source.splitlines(keepends=True)
+        try:
+            v.visit(root)
+        except Exception:
+            pass  # parse() reports these in pmodel.errors, the time still counts
+
+    def rhs_analyser():
+        TimedRhsAnalyser.elapsed = 0.0
+        core_parser_ast.RhsAnalyser = TimedRhsAnalyser
+        try:
+            for item in trees:
+                visit(*item)
+        finally:
+            core_parser_ast.RhsAnalyser = RhsAnalyser
+        return TimedRhsAnalyser.elapsed
+
+    parse((sources or [("", "")])[0][0], logh, options)  # warm up imports and caches
+    phases = {
+        "read": best_time(read, sources, repeat),
+        "quick_parse": best_time(lambda filename, source: QuickParse(source=source), sources, repeat),
+        "ast_parse": best_time(lambda filename, source, root: ast.parse(source), trees, repeat),
+        "annotate": best_time(lambda filename, source, root: _annotate_tree(root, ast), trees, repeat),
+        "quick_parse_ast": best_time(lambda filename, source, root: QuickParseAst(root, ast), trees, repeat),
+        "visit": best_time(visit, trees, repeat),
+        "rhs_analyser": min(rhs_analyser() for _ in range(repeat)),
+        "total": best_time(lambda filename: parse(filename, logh, options), [(f,) for f in files], repeat),
+    }
+
+    peak = 0
+    tracemalloc.start()
+    try:
+        for filename in files:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            parse(filename, logh, options)
+            peak = max(peak, tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "version": RESULTS_VERSION,
+        "python": platform.python_version(),
+        "mode": mode,
+        "repeat": repeat,
+        "corpus": {
+            "files": len(files),
+            "bytes": sum(len(source.encode("utf-8", "surrogatepass")) for _, source in sources),
+            "lines": sum(source.count("\n") for _, source in sources),
+            "syntax_errors": syntax_errors,
+        },
+        "files_per_sec": len(files) / phases["total"] if phases["total"] else 0.0,
+        "phases": phases,
+        "peak_memory_bytes": peak,
+    }
+
+
+def compare(results, baseline, tolerance=0.10, noise_floor=0.005):
+    """
+    Compare results to a baseline.  Returns a list of (metric, baseline value, value, change,
+    regressed) where change is the fractional change, positive meaning worse.  Phases which
+    got slower by less than 'noise_floor' seconds don't count as regressed, however large the
+    fraction - timings of the quickest phases are mostly noise.
+    """
+    rows = []
+
+    def add(metric, old, new, higher_is_better=False, floor=0):
+        if not old:
+            return
+        change = (new - old) / old
+        if higher_is_better:
+            change = -change
+        rows.append((metric, old, new, change, change > tolerance and abs(new - old) >= floor))
+
+    for phase in PHASES:
+        if phase in baseline["phases"] and phase in results["phases"]:
+            add(phase, baseline["phases"][phase], results["phases"][phase], floor=noise_floor)
+    add("files_per_sec", baseline["files_per_sec"], results["files_per_sec"], higher_is_better=True)
+    add("peak_memory_bytes", baseline["peak_memory_bytes"], results["peak_memory_bytes"])
+    return rows
+
+
+def report(results):
+    corpus = results["corpus"]
+    total = results["phases"]["total"]
+    print(
+        f"{corpus['files']} files, {corpus['lines']} lines, {corpus['bytes'] / 1024:.0f} KiB, "
+        f"{corpus['syntax_errors']} syntax errors in python {results['mode']} mode, best of {results['repeat']}"
+    )
+    for phase in PHASES:
+        seconds = results["phases"][phase]
+        print(f"  {phase:<16} {seconds * 1000:9.2f} ms {seconds / total:7.1%}")
+    print(f"  {results['files_per_sec']:.1f} files/sec, max peak memory per file {results['peak_memory_bytes'] / 1024:.1f} KiB")
+
+
+def report_comparison(rows, results, baseline, tolerance):
+    if results["corpus"] != baseline["corpus"] or results["mode"] != baseline["mode"]:
+        print("Warning: the corpus or mode differs from the baseline's, the comparison may not mean much")
+    print(f"Compared to baseline, + is worse (tolerance {tolerance:.0%}):")
+    for metric, old, new, change, regressed in rows:
+        print(f"  {metric:<18} {old:14.6g} -> {new:14.6g} {change:+8.1%} {'REGRESSION' if regressed else ''}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark each phase of parsing")
+    parser.add_argument("files", nargs="*", help="python files to parse instead of the default corpus")
+    parser.add_argument("--repeat", type=int, default=5, help="timing runs, best is reported")
+    parser.add_argument("--mode", type=int, default=3, help="python syntax mode 2 or 3")
+    parser.add_argument("--scale", type=int, default=1, help="size of the generated modules, 0 for none")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="fractional slow down allowed")
+    parser.add_argument("--noise-floor", type=float, default=0.005, help="phase slow downs under this many seconds are ignored")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        files = args.files or default_corpus()
+        if args.scale > 0 and not args.files:
+            files += synthetic_modules(directory, args.scale)
+        results = run(files, args.mode, args.repeat)
+    results["corpus"]["synthetic_scale"] = 0 if args.files else args.scale
+
+    report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows = compare(results, baseline, args.tolerance, args.noise_floor)
+        report_comparison(rows, results, baseline, args.tolerance)
+        if any(regressed for *_, regressed in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Watches a directory tree for changed python files, by polling.
+
+Changes are debounced and batched: poll() only reports once the tree has been quiet for
+'debounce' seconds, so e.g. a git checkout touching 500 files results in one batch of 500
+rather than 500 batches.  Polling needs no extra dependencies and works the same on every
+platform and from both the cli loop and a GUI timer.
+
+Usage:
+    watcher = FileWatcher("src")
+    while True:
+        batch = watcher.poll()
+        if batch:
+            print(batch.changed, batch.removed)
+        time.sleep(watcher.interval)
+"""
+
+import fnmatch
+import os
+import time
+from collections import namedtuple
+
+WatchBatch = namedtuple("WatchBatch", ["changed", "removed"])  # sorted lists of file paths
+
+IGNORE_DIRS = {".git", ".hg", ".svn", "__pycache__", ".tox", ".venv", "venv", "node_modules"}
+
+
+class FileWatcher:
+    def __init__(self, directory, pattern="*.py", debounce=0.5, interval=0.25):
+        """
+        Args:
+            directory: root of the tree to watch
+            pattern: glob of the file names to watch
+            debounce: seconds of quiet required before a batch of changes is reported
+            interval: suggested seconds between calls to poll()
+        """
+        self.directory = directory
+        self.pattern = pattern
+        self.debounce = debounce
+        self.interval = interval
+        self.snapshot = self.scan()
+        self._pending = {}  # path -> True if changed/added, False if removed
+        self._last_change = 0.0
+
+    @property
+    def files(self):
+        """Files currently in the tree, sorted"""
+        return sorted(self.snapshot)
+
+    def scan(self):
+        """Returns {path: (mtime_ns, size)} for every matching file in the tree"""
+        result = {}
+        for root, dirs, filenames in os.walk(self.directory):
+            dirs[:] = [d for d in dirs if d not in IGNORE_DIRS and not d.startswith(".")]
+            for filename in fnmatch.filter(filenames, self.pattern):
+                path = os.path.join(root, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # deleted whilst scanning
+                result[path] = (stat.st_mtime_ns, stat.st_size)
+        return result
+
+    def poll(self, now=None):
+        """
+        Scan the tree, returning a WatchBatch of everything that changed since the last batch once
+        things have settled down, otherwise None.
+        """
+        now = time.monotonic() if now is None else now
+        snapshot = self.scan()
+        for path, signature in snapshot.items():
+            if self.snapshot.get(path) != signature:
+                self._pending[path] = True
+        for path in self.snapshot.keys() - snapshot.keys():
+            self._pending[path] = False
+        if snapshot != self.snapshot:
+            self._last_change = now
+        self.snapshot = snapshot
+
+        if not self._pending or now - self._last_change < self.debounce:
+            return None
+        changed = sorted(path for path, present in self._pending.items() if present)
+        removed = sorted(path for path, present in self._pending.items() if not present)
+        self._pending = {}
+        return WatchBatch(changed, removed)
@@ -56,7 +56,9 @@ N1 .. HandleClasses
 package "parsing.core_parser_ast" {
     class "core_parser_ast" <<MODULE>> {
         parse (filename)
-        _ast_parse (filename)
+        parse_bytes (data, filename)
+        parse_text (source, filename)
+        _ast_parse (source)
         _convert_ast_to_old_parser()
     }
 
@@ -1,7 +1,7 @@
 # base class for output generators and for the cmdline wrappers for those generators
 
 import os, glob
-from parsing.api import old_parser, new_parser
+from parsing.api import old_parser, new_parser, parse_text
 from functools import cmp_to_key  # to still be able to use old style compare func in sort
 
 
@@ -31,7 +31,14 @@ class ReportGenerator(object):
         else:
             options = {"optionModuleAsClass": self.optionModuleAsClass}
             pmodel, debuginfo = old_parser(file, options)
+        self._use_pmodel(pmodel)
 
+    def ParseSource(self, source_code, filename="<string>"):
+        # in memory equivalent of Parse(), no temporary file needed - only the ast parser supports this
+        pmodel, debuginfo = parse_text(source_code, filename)
+        self._use_pmodel(pmodel)
+
+    def _use_pmodel(self, pmodel):
         self.pmodel = pmodel  # remember the parse model
 
         # break apart pmodel so that its attributes are on the report generator itself (legacy yukiness)
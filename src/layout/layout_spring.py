@@ -4,7 +4,7 @@
 #    http://search.cpan.org/~pasky/Graph-Layderer-0.02/
 #    https://gist.github.com/heckj/324039 - javascript version
 
-from view.graph import Graph, GraphNode
+from view.graph import Graph, GraphNode, NodeCoordinates
 import random
 import math
 
@@ -30,14 +30,23 @@ class GraphLayoutSpring:
         if self.gui:
             self.gui.kill_layout = False  # initialise
 
-        memento1 = self.graph.GetMementoOfLayoutPoints()
+        # The iterations run over struct of arrays copies of the node positions and forces,
+        # written back onto the nodes whenever the gui is about to look at them
+        coords, edges = self.layoutArrays()
+        ids = [node.id for node in self.graph.nodes]
+
+        def memento():  # same as self.graph.GetMementoOfLayoutPoints()
+            return dict(zip(ids, zip(coords.layoutPosX, coords.layoutPosY)))
+
+        memento1 = memento()
         break_pending = 0
 
         for i in range(0, self.iterations):
-            self.layoutIteration()
+            self.layoutIterationArrays(coords, edges)
 
             if i % 100 == 0:  # i%50==0:
                 if self.gui:
+                    coords.write_back()
                     self.layoutCalcBounds()  # this is the only time you need to call this explicitly since are in the MIDDLE of a layout and about to visualise
                     self.gui.mega_refresh(recalibrate=True, auto_resize_canvas=False)  # refresh gui
 
@@ -47,7 +56,7 @@ class GraphLayoutSpring:
 
             if i % 20 == 0:
                 if optimise:
-                    memento2 = self.graph.GetMementoOfLayoutPoints()
+                    memento2 = memento()
                     if Graph.MementosEqual(memento1, memento2, 0.01):
                         break_pending += 1
                         # print "!",
@@ -60,6 +69,7 @@ class GraphLayoutSpring:
                     memento1 = memento2
 
         # print
+        coords.write_back()
         self.layoutCalcBounds()
 
     def layoutPrepare(self):
@@ -93,23 +103,97 @@ class GraphLayoutSpring:
         self.graph.layoutMinY = miny
         self.graph.layoutMaxY = maxy
 
+    def layoutArrays(self):
+        """
+        NodeCoordinates of the positions and forces of the graph's nodes, followed by those of
+        any edge ends which aren't one of them (these feel forces but never move), and the
+        edges as (source position, target position, weight factor) in those arrays.
+        """
+        nodes = list(self.graph.nodes)
+        positions = {id(node): i for i, node in enumerate(nodes)}
+        edges = []
+        for edge in self.graph.edges:
+            ends = []
+            for node in (edge["source"], edge["target"]):
+                if id(node) not in positions:
+                    positions[id(node)] = len(nodes)
+                    nodes.append(node)
+                ends.append(positions[id(node)])
+            nodeweight = edge.get("weight", None)  # ANDY
+            if (not nodeweight) or (edge["weight"] < 1):
+                edge["weight"] = 1
+            ends.append(math.log(edge["weight"]) * 0.5 + 1)
+            edges.append(tuple(ends))
+        coords = NodeCoordinates(nodes, ("layoutPosX", "layoutPosY", "layoutForceX", "layoutForceY"))
+        return coords, edges
+
     def layoutIteration(self):
+        coords, edges = self.layoutArrays()
+        self.layoutIterationArrays(coords, edges)
+        coords.write_back()
+
+    def layoutIterationArrays(self, coords, edges):
+        x = coords.layoutPosX
+        y = coords.layoutPosY
+        fx = coords.layoutForceX
+        fy = coords.layoutForceY
+        num_nodes = len(self.graph.nodes)
+        randint = random.randint
+        sqrt = math.sqrt
+        k2 = self.k * self.k
+        maxd = self.maxRepulsiveForceDistance
+
         # Forces on nodes due to node-node repulsions
-        for i in range(0, len(self.graph.nodes)):
-            node1 = self.graph.nodes[i]
-            for j in range(i + 1, len(self.graph.nodes)):
-                node2 = self.graph.nodes[j]
-                self.layoutRepulsive(node1, node2)
+        for i in range(0, num_nodes):
+            x1 = x[i]
+            y1 = y[i]
+            for j in range(i + 1, num_nodes):
+                dx = x[j] - x1
+                dy = y[j] - y1
+                d2 = dx * dx + dy * dy
+                if d2 < 0.01:
+                    dx = 0.1 * randint(0, 1000) / 1000.0 + 0.1
+                    dy = 0.1 * randint(0, 1000) / 1000.0 + 0.1
+                    d2 = dx * dx + dy * dy
+                d = sqrt(d2)
+                if d < maxd:
+                    repulsiveForce = k2 / d
+                    ux = repulsiveForce * dx / d
+                    uy = repulsiveForce * dy / d
+                    fx[j] += ux
+                    fy[j] += uy
+                    fx[i] -= ux
+                    fy[i] -= uy
+
         # Forces on nodes due to edge attractions
-        for edge in self.graph.edges:
-            self.layoutAttractive(edge)
+        for i, j, weight_factor in edges:
+            dx = x[j] - x[i]
+            dy = y[j] - y[i]
+            d2 = dx * dx + dy * dy
+            if d2 < 0.01:
+                dx = 0.1 * randint(0, 1000) / 1000.0 + 0.1
+                dy = 0.1 * randint(0, 1000) / 1000.0 + 0.1
+                d2 = dx * dx + dy * dy
+            d = sqrt(d2)
+            if d > maxd:
+                d = maxd
+                d2 = d * d
+            attractiveForce = (d2 - k2) / self.k
+            attractiveForce *= weight_factor
+            ux = attractiveForce * dx / d
+            uy = attractiveForce * dy / d
+            fx[j] -= ux
+            fy[j] -= uy
+            fx[i] += ux
+            fy[i] += uy
 
         # Move by the given force
-        for node in self.graph.nodes:
-            xmove = self.c * node.layoutForceX
-            ymove = self.c * node.layoutForceY
+        max = self.maxVertexMovement
+        c = self.c
+        for i in range(0, num_nodes):
+            xmove = c * fx[i]
+            ymove = c * fy[i]
 
-            max = self.maxVertexMovement
             if xmove > max:
                 xmove = max
             if xmove < -max:
@@ -119,52 +203,10 @@ class GraphLayoutSpring:
             if ymove < -max:
                 ymove = -max
 
-            node.layoutPosX += xmove
-            node.layoutPosY += ymove
-            node.layoutForceX = 0
-            node.layoutForceY = 0
-
-    def layoutRepulsive(self, node1, node2):
-        dx = node2.layoutPosX - node1.layoutPosX
-        dy = node2.layoutPosY - node1.layoutPosY
-        d2 = dx * dx + dy * dy
-        if d2 < 0.01:
-            dx = 0.1 * random.randint(0, 1000) / 1000.0 + 0.1
-            dy = 0.1 * random.randint(0, 1000) / 1000.0 + 0.1
-            d2 = dx * dx + dy * dy
-        d = math.sqrt(d2)
-        if d < self.maxRepulsiveForceDistance:
-            repulsiveForce = self.k * self.k / d
-            node2.layoutForceX += repulsiveForce * dx / d
-            node2.layoutForceY += repulsiveForce * dy / d
-            node1.layoutForceX -= repulsiveForce * dx / d
-            node1.layoutForceY -= repulsiveForce * dy / d
-
-    def layoutAttractive(self, edge):
-        node1 = edge["source"]
-        node2 = edge["target"]
-
-        dx = node2.layoutPosX - node1.layoutPosX
-        dy = node2.layoutPosY - node1.layoutPosY
-        d2 = dx * dx + dy * dy
-        if d2 < 0.01:
-            dx = 0.1 * random.randint(0, 1000) / 1000.0 + 0.1
-            dy = 0.1 * random.randint(0, 1000) / 1000.0 + 0.1
-            d2 = dx * dx + dy * dy
-        d = math.sqrt(d2)
-        if d > self.maxRepulsiveForceDistance:
-            d = self.maxRepulsiveForceDistance
-            d2 = d * d
-        attractiveForce = (d2 - self.k * self.k) / self.k
-        nodeweight = edge.get("weight", None)  # ANDY
-        if (not nodeweight) or (edge["weight"] < 1):
-            edge["weight"] = 1
-        attractiveForce *= math.log(edge["weight"]) * 0.5 + 1
-
-        node2.layoutForceX -= attractiveForce * dx / d
-        node2.layoutForceY -= attractiveForce * dy / d
-        node1.layoutForceX += attractiveForce * dx / d
-        node1.layoutForceY += attractiveForce * dy / d
+            x[i] += xmove
+            y[i] += ymove
+            fx[i] = 0
+            fy[i] = 0
 
 
 if __name__ == "__main__":
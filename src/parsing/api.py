@@ -1,5 +1,10 @@
 from parsing.core_parser_old import PynsourcePythonParser
-from parsing.core_parser_ast import parse
+from parsing.core_parser_ast import parse, parse_text, parse_bytes, DEBUGINFO
+from parsing.parallel import iter_parse_files, iter_parse_sources, iter_parse_discovering, parse_files
+from parsing.archives import is_archive, iter_parse_archive, parse_archive
+from parsing.reachability import Reachable
+from parsing.incremental import IncrementalParser
+from parsing.symbol_index import SymbolIndex
 from common.logwriter import LogWriterNull
 
 
@@ -10,8 +15,44 @@ def old_parser(filename, options={}):
     return p, ""
 
 
-def new_parser(filename, log=None, options={}):
+def new_parser(filename, log=None, options={}, cache=None):
+    """
+    Parse a python file into a pmodel.  Pass a parse_cache.ParseCache as 'cache' to
+    skip re-parsing unchanged files - the cache is bypassed when debugging via 'log'.
+    """
+    if cache is not None and not log and not DEBUGINFO():
+        return cache.parse(filename, options)
     if not log:
         log = LogWriterNull()
     pmodel, debuginfo = parse(filename, log, options)
     return pmodel, debuginfo
+
+
+def new_parser_many(filenames, options={}, jobs=1, cache=None):
+    """
+    Parse many files, optionally in parallel using 'jobs' worker processes.
+    Returns a list of (pmodel, debuginfo) in the same order as 'filenames'.
+    """
+    return [(r.pmodel, r.debuginfo) for r in iter_parse_files(filenames, options, jobs, cache)]
+
+
+def new_parser_archive(archive, options={}, jobs=1, cache=None, include=("*.py",), exclude=()):
+    """
+    Parse the python files inside a .zip, .whl or .tar.gz archive without extracting it,
+    optionally in parallel.  'include' and 'exclude' are globs matched against each member's
+    path within the archive.  Returns a list of (pmodel, debuginfo) in archive order.
+    """
+    return [
+        (r.pmodel, r.debuginfo)
+        for r in iter_parse_archive(archive, options, jobs, cache, include=include, exclude=exclude)
+    ]
+
+
+def new_parser_reachable(entry_files, options={}, jobs=1, cache=None, source_roots=None, max_depth=None):
+    """
+    Parse the entry modules and the modules they transitively import, found under
+    'source_roots', no more than 'max_depth' imports away.  Modules are parsed in parallel
+    as they are discovered.  Returns a list of (pmodel, debuginfo) in the order parsed.
+    """
+    reachable = Reachable(entry_files, source_roots, max_depth)
+    return [(r.pmodel, r.debuginfo) for r in reachable.iter_parse(options, jobs, cache)]
@@ -0,0 +1,82 @@
+"""
+Parse the python files inside .zip, .whl and .tar.gz (sdist) archives, without extracting them.
+
+Members are read straight out of the archive into memory and handed to the parser as bytes,
+via parallel.iter_parse_sources(), so scanning a release artifact costs no temporary files
+or directories.  A .tar.gz is read as a stream, front to back, in a single pass.
+
+Members are reported as 'archive/member', e.g. 'dist/foo-1.0.whl/foo/bar.py', the same way
+that zipimport names the modules it imports from a zip file.  Which members get parsed is
+decided by fnmatch style 'include' and 'exclude' globs, matched against the member's path
+within the archive - '*' matches across '/' so '*.py' means every python file.
+
+Usage:
+    for result in iter_parse_archive("foo-1.0.whl", options={"mode": 3}, jobs=4, exclude=["*/tests/*"]):
+        displaymodel.build_graphmodel(result.pmodel)
+"""
+
+import os
+import tarfile
+import zipfile
+from fnmatch import fnmatchcase
+from parsing.parallel import iter_parse_sources
+
+ZIP_EXTENSIONS = (".zip", ".whl")
+TAR_EXTENSIONS = (".tar.gz", ".tgz")
+DEFAULT_INCLUDE = ("*.py",)
+
+
+def is_archive(path):
+    """True if 'path' looks like an archive we can parse the members of, judging by its extension"""
+    return path.lower().endswith(ZIP_EXTENSIONS + TAR_EXTENSIONS)
+
+
+def is_selected(name, include=DEFAULT_INCLUDE, exclude=()):
+    """True if member 'name' matches one of the 'include' globs and none of the 'exclude' globs"""
+    return any(fnmatchcase(name, pattern) for pattern in include) and not any(
+        fnmatchcase(name, pattern) for pattern in exclude
+    )
+
+
+def iter_members(archive, include=DEFAULT_INCLUDE, exclude=()):
+    """
+    Yields (filename, data) for each selected member of 'archive', in archive order, where
+    filename is 'archive/member' and data is the member's content as bytes.  Only one member
+    is read at a time.
+
+    Raises OSError, zipfile.BadZipFile or tarfile.TarError if the archive can't be read.
+    """
+    include = tuple(include or DEFAULT_INCLUDE)
+    exclude = tuple(exclude or ())
+    if archive.lower().endswith(ZIP_EXTENSIONS):
+        with zipfile.ZipFile(archive) as z:
+            for info in z.infolist():
+                if not info.is_dir() and is_selected(info.filename, include, exclude):
+                    yield _member_filename(archive, info.filename), z.read(info)
+    elif archive.lower().endswith(TAR_EXTENSIONS):
+        with tarfile.open(archive, mode="r|gz") as tar:  # stream, no seeking back and forth
+            for info in tar:
+                if info.isfile() and is_selected(info.name, include, exclude):
+                    yield _member_filename(archive, info.name), tar.extractfile(info).read()
+    else:
+        raise ValueError(f"Not a .zip, .whl or .tar.gz archive: {archive}")
+
+
+def _member_filename(archive, name):
+    return os.path.join(archive, *name.split("/"))
+
+
+def iter_parse_archive(archive, options=None, jobs=1, cache=None, ordered=True, include=DEFAULT_INCLUDE, exclude=()):
+    """
+    Parse the selected members of 'archive', yielding a parallel.ParseResult per member.
+    See parallel.iter_parse_files() for the other arguments.
+
+    Per member problems are reported in pmodel.errors, whereas an archive which can't be
+    read at all raises, as per iter_members().
+    """
+    return iter_parse_sources(iter_members(archive, include, exclude), options, jobs, cache, ordered)
+
+
+def parse_archive(archive, options=None, jobs=1, cache=None, include=DEFAULT_INCLUDE, exclude=()):
+    """Same as iter_parse_archive() but returns a list of all the ParseResults"""
+    return list(iter_parse_archive(archive, options, jobs, cache, True, include, exclude))
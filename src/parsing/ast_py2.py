@@ -0,0 +1,25 @@
+"""
+Optional Python 2 syntax support - the ast backend of "mode" 2.
+
+Python 3 code, in whichever minor version's syntax, is parsed with the standard library's
+ast (see ast_backend() and options["feature_version"]).  Only Python 2 syntax needs the
+third party typed_ast package, which is unmaintained and slow to import, so this is the
+one module which imports it - lazily, the first time a file is parsed in Python 2 mode.
+typed_ast is an optional dependency, without it Python 2 mode reports an error per file.
+"""
+
+
+class Python2SupportMissing(ImportError):
+    pass
+
+
+def load():
+    """Returns the typed_ast.ast27 module, raises Python2SupportMissing if typed_ast isn't installed"""
+    try:
+        from typed_ast import ast27
+    except ImportError as e:
+        raise Python2SupportMissing(
+            f"Parsing Python 2 syntax needs the optional package typed_ast (pip install typed_ast), "
+            f"which can't be imported: {e}"
+        ) from e
+    return ast27
@@ -1,6 +1,28 @@
+from sys import intern
+
+
 class ClassEntry:
+    """
+    Compact: attributes are in __slots__ and names are interned, since a large project has
+    many thousands of these.  Lookups are indexed - attrs by name, and membership of
+    classdependencytuples - so a class with hundreds of attributes doesn't take O(n^2) to build.
+
+    'attrs' and 'classdependencytuples' are still lists (assign plain lists to them if you like)
+    """
+
+    __slots__ = (
+        "name",
+        "name_long",
+        "stack_functions",
+        "defs",
+        "_attrs",
+        "_classdependencytuples",
+        "classesinheritsfrom",
+        "ismodulenotrealclass",
+    )
+
     def __init__(self, name=""):
-        self.name = name  # new and optional.
+        self.name = intern(name)  # new and optional.
         self.name_long = ""  # new and optional.
         self.stack_functions = [
             False
@@ -12,14 +34,30 @@ class ClassEntry:
         self.classesinheritsfrom = []
         self.ismodulenotrealclass = 0
 
+    @property
+    def attrs(self):
+        return self._attrs
+
+    @attrs.setter
+    def attrs(self, attrs):
+        self._attrs = AttributeList(attrs)
+
+    @property
+    def classdependencytuples(self):
+        return self._classdependencytuples
+
+    @classdependencytuples.setter
+    def classdependencytuples(self, tuples):
+        self._classdependencytuples = DependencyList(tuples)
+
     def FindAttribute(self, attrname):
         """
         Return
            boolean hit, index pos
         """
-        for attrobj in self.attrs:
-            if attrname == attrobj.attrname:
-                return 1, attrobj
+        attrobj = self._attrs.find(attrname)
+        if attrobj is not None:
+            return 1, attrobj
         return 0, None
 
     def AddAttribute(self, attrname, attrtype):
@@ -31,7 +69,7 @@ class ClassEntry:
         """
         haveEncounteredAttrBefore, attrobj = self.FindAttribute(attrname)
         if not haveEncounteredAttrBefore:
-            self.attrs.append(Attribute(attrname, attrtype))
+            self._attrs.append(Attribute(attrname, attrtype))
         else:
             # See if there is more info to add re this attr.
             if len(attrobj.attrtype) < len(attrtype):
@@ -47,8 +85,141 @@ class ClassEntry:
         else:
             return repr(self)
 
+    def __getstate__(self):
+        return (
+            self.name,
+            self.name_long,
+            self.stack_functions,
+            self.defs,
+            list(self._attrs),
+            list(self._classdependencytuples),
+            self.classesinheritsfrom,
+            self.ismodulenotrealclass,
+        )
+
+    def __setstate__(self, state):
+        (
+            name,
+            self.name_long,
+            self.stack_functions,
+            defs,
+            self.attrs,
+            self.classdependencytuples,
+            self.classesinheritsfrom,
+            self.ismodulenotrealclass,
+        ) = state
+        self.name = intern(name)
+        self.defs = [intern(d) for d in defs]
+
 
 class Attribute:
+    __slots__ = ("attrname", "attrtype")
+
     def __init__(self, attrname, attrtype="normal"):
-        self.attrname = attrname
+        self.attrname = intern(attrname)
         self.attrtype = attrtype
+
+    def __getstate__(self):
+        return self.attrname, self.attrtype
+
+    def __setstate__(self, state):
+        attrname, attrtype = state
+        self.attrname = intern(attrname)
+        self.attrtype = [intern(t) for t in attrtype] if isinstance(attrtype, list) else attrtype
+
+
+class _IndexedList(list):
+    """
+    A list with an index of its items for quick lookups.  append() keeps the index up to date,
+    any other change drops it, to be rebuilt by the next lookup.
+    """
+
+    __slots__ = ("_index",)
+
+    def __init__(self, items=()):
+        super().__init__(items)
+        self._index = None
+
+    def __setitem__(self, i, value):
+        self._index = None
+        super().__setitem__(i, value)
+
+    def __delitem__(self, i):
+        self._index = None
+        super().__delitem__(i)
+
+    def __iadd__(self, items):
+        self._index = None
+        return super().__iadd__(items)
+
+    def __imul__(self, n):
+        self._index = None
+        return super().__imul__(n)
+
+    def insert(self, i, item):
+        self._index = None
+        super().insert(i, item)
+
+    def extend(self, items):
+        self._index = None
+        super().extend(items)
+
+    def remove(self, item):
+        self._index = None
+        super().remove(item)
+
+    def pop(self, i=-1):
+        self._index = None
+        return super().pop(i)
+
+    def clear(self):
+        self._index = None
+        super().clear()
+
+    def __reduce__(self):
+        return self.__class__, (list(self),)
+
+
+class AttributeList(_IndexedList):
+    """List of Attribute, indexed by attrname"""
+
+    __slots__ = ()
+
+    def find(self, attrname):
+        """The first Attribute called attrname, or None"""
+        if self._index is None:
+            self._index = {}
+            for attrobj in reversed(self):  # first one wins, as in a linear search
+                self._index[attrobj.attrname] = attrobj
+        return self._index.get(attrname)
+
+    def append(self, attrobj):
+        super().append(attrobj)
+        if self._index is not None:
+            self._index.setdefault(attrobj.attrname, attrobj)
+
+
+class DependencyList(_IndexedList):
+    """
+    List of (attribute name, class name) tuples, in the order they were added, with set speed
+    membership tests.
+    """
+
+    __slots__ = ()
+
+    def __contains__(self, t):
+        if self._index is None:
+            self._index = set(self)
+        return t in self._index
+
+    def append(self, t):
+        super().append(t)
+        if self._index is not None:
+            self._index.add(t)
+
+    def add(self, t):
+        """Append t unless already present, returns True if it was added"""
+        if t in self:
+            return False
+        self.append(t)
+        return True
@@ -1,33 +1,28 @@
 import sys
 
-ast = None  # we dynamically assign either native ast, typed_ast.ast27 or typed_ast.ast3 to this in mode()
-
 # S
 from ast import *  # only used for all the symbols like '_ast.And' etc which are stored into our
 
 # lookup tables e.g. BOOLOP_SYMBOLS in a more general way e.g. 'And'
 import ast as ast_native  # native ast of the Python that is running
 
-if sys.version_info >= (3, 0):
-    import typed_ast.ast27  # py2 (requires Python 3 to be running)
-    import typed_ast.ast3  # py3 (requires Python 3 to be running)
-
 import inspect
 import logging
+import time
+from collections import deque
 from common.logger import config_log
 import traceback
 from os import path
 from textwrap import dedent
 
-import astpretty  # pip install astpretty
-
 from common.add_line_numbers import add_line_numbers
 from parsing.alsm_set_module import get_source_code_sample
 from common.architecture_support import whosdaddy, whosgranddaddy
 from parsing.class_entry import ClassEntry, Attribute
+from parsing import data_modules
 from parsing.keywords import pythonbuiltinfunctions
 from parsing.parse_rhs_analyser import RhsAnalyser
-from parsing.quick_parse import QuickParse
+from parsing.quick_parse import QuickParse, QuickParseAst
 from common.logwriter import LogWriter, LogWriterNull
 from common.logger import LOG_FILENAME
 
@@ -47,8 +42,13 @@ DEBUGINFO_IMMEDIATE_PRINT = False
 DEBUG_TO_LOG_PROPER = True
 DEBUG_TO_LOG_PROPER_FLUSH_STATE = False  # usually too verbose for log file
 DEBUG_TO_LOG_PROPER_PARSE_HISTORY = True  # very verbose and a little weird/hard to interpret
-
-last_python_mode = 0
+TRACE_PARSE = False  # full visit tracing even when not DEBUGINFO, slow - override via options["TRACE_PARSE"]
+PARSE_HISTORY_SIZE = 50  # recent nodes remembered for error reports when not tracing
+QUICK_PARSE = "ast"  # "ast" derives the quick parse from the ast tree, "regex" re-scans the source - override via options["QUICK_PARSE"]
+PRUNE_VISIT = True  # skip visiting subtrees which can't affect the model, off when tracing - override via options["PRUNE_VISIT"]
+DATA_MODULE_FAST_PATH = True  # only parse the top level classes and functions of big literal dominated modules - override via options["DATA_MODULE_FAST_PATH"]
+PARSE_SIZE_BUDGET = 8 * 1024 * 1024  # characters, bigger files are only scanned for top level classes and functions, None for no limit - override via options["PARSE_SIZE_BUDGET"]
+PARSE_TIME_BUDGET = 60  # seconds per file for visiting the ast, overruns give an incomplete model, None for no limit - override via options["PARSE_TIME_BUDGET"]
 
 if getattr(sys, 'frozen', False):
     # running in a bundle
@@ -115,21 +115,85 @@ ALL_SYMBOLS.update(UNARYOP_SYMBOLS)
 
 TREAT_PROPERTY_DECORATOR_AS_PROP = True
 
+PARSER_VERSION = 4  # bump whenever the parse model produced changes, invalidates any parse cache
+
 BUILT_IN_TYPES = ('int', 'float', 'bool', 'str', 'bytes', 'List', 'Set', 'Dict', 'Tuple', 'Optional',
     'Callable', 'Iterator', 'Union', 'Any', 'Mapping', 'MutableMapping', 'Sequence', 'Iterable', 'Set',
     'Match', 'AnyStr', 'IO', 'Callable', 'TypeVar')  # I think I identified them all!
 
+# Pruning - the field visited first, for expressions whose first recorded token is just that of one child
+_FIRST_VISITED_FIELD = {
+    "Call": "func",
+    "Attribute": "value",
+    "Subscript": "value",
+    "BinOp": "left",
+    "Compare": "left",
+    "UnaryOp": "operand",
+    "IfExp": "body",
+    "Starred": "value",
+    "Await": "value",
+    "Yield": "value",
+    "YieldFrom": "value",
+}
+
+
+def _first_token(node):
+    """
+    The first name or attribute visiting expression 'node' would record into lhs/rhs, e.g.
+    "foo" for foo.bar(self.x) - or None when that can't be told cheaply
+    """
+    while True:
+        name = node.__class__.__name__
+        if name == "Name":
+            return node.id
+        field = _FIRST_VISITED_FIELD.get(name)
+        if field:
+            node = getattr(node, field)
+        elif name in ("Tuple", "List") and node.elts:
+            node = node.elts[0]
+        elif name == "BoolOp":
+            node = node.values[0]
+        else:
+            return None
+
+
+TIME_BUDGET_EXCEEDED = "exceeded the parse time budget"  # in pmodel.errors of such a file
+
+
+class ParseBudgetExceeded(Exception):
+    pass
+
+
+def exceeded_time_budget(pmodel):
+    """Whether parsing was cut short, the pmodel depends on machine speed then so shouldn't be cached"""
+    return TIME_BUDGET_EXCEEDED in pmodel.errors
+
+
+PARSE_FAILED = ("Syntax error in parsing", "General exception in parsing", "error Pynsource couldn't handle traversing AST")  # how pmodel.errors of such a file starts
+
+
+def parse_failed(pmodel):
+    """Whether the file couldn't be read, parsed or fully visited - unlike e.g. 'had no classes.' in pmodel.errors"""
+    return pmodel.errors.startswith(PARSE_FAILED)
+
+
+_DISPATCH_TABLES = {}  # (Visitor class, ast backend) -> dispatch table, see Visitor.dispatch_table()
+
+
 class OldParseModel(object):
     def __init__(self):
         self.classlist = {}
         self.modulemethods = []
         self.errors = ""
         self.filename = ""  # new, 2020, way of getting module name
+        self.imported_modules = []  # dotted names, relative ones start with dots, see Visitor.record_import
+        self.symbol_lookups = {}  # name -> whether options["symbol_index"] knew it, what the parse depended on
 
 
 def parse(filename, log=None, options={}):
     """
-    This is the main entry point for parsing python and getting back a simplified parse model
+    This is the main entry point for parsing python and getting back a simplified parse model.
+    Reads the file once, then hands over to parse_bytes().
 
     Args:
         filename: python file to parse
@@ -139,50 +203,115 @@ def parse(filename, log=None, options={}):
     Returns:
 
     """
+    try:
+        with open(filename, "rb") as f:
+            data = f.read()
+    except Exception as e:
+        return _general_exception_pmodel(filename, options, e), ""
+    return parse_bytes(data, filename, log, options)
+
+
+def parse_bytes(data, filename="<string>", log=None, options={}):
+    """
+    Parse python source code supplied as utf-8 encoded bytes, see parse_text()
+    """
+    try:
+        source = _decode_source(data)
+    except Exception as e:
+        return _general_exception_pmodel(filename, options, e), ""
+    return parse_text(source, filename, log, options)
+
+
+def _decode_source(data):
+    source = data.decode("utf-8")
+    if "\r" in source:  # universal newlines, same as reading the file in text mode
+        source = source.replace("\r\n", "\n").replace("\r", "\n")
+    return source
+
+
+def parse_text(source, filename="<string>", log=None, options={}):
+    """
+    Parse python source code supplied as a string.  The source is shared between the
+    quick parse pre-scan, the ast parse and any diagnostic source line lookups, so no
+    file is ever read.
 
-    # OLD
-    # node = _ast_parse(filename)
-    # pmodel, debuginfo = _convert_ast_to_old_parser(node, filename, log, options)
-    # return pmodel, debuginfo
+    Args:
+        source: python source code
+        filename: name to report the source as, in pmodel.filename and in any errors
+        log: optional LogWriter for html debug output
+        options: dict e.g. {"mode": 3}
+
+    Returns: pmodel, debuginfo
+    """
+    return _parse_text(source, filename, log, options)
 
-    # NEW
+
+def _parse_text(source, filename="<string>", log=None, options={}, visit_module=None):
+    """
+    Same as parse_text(), with 'visit_module' passed through to _convert_ast_to_old_parser().
+    """
+    if not log:
+        log = LogWriterNull()
     _mode = options.get("mode", 2)
-    mode(_mode)
+    try:
+        ast = ast_backend(_mode)
+    except ImportError as e:  # python 2 mode without typed_ast
+        log_proper.error(str(e))
+        return _general_exception_pmodel(filename, options, e), ""
     pmodel = OldParseModel()
 
     log_proper.info(f"Parsing {filename}, syntax mode {_mode}")
     pmodel.filename = filename  # new, 2020
 
-    if _mode == 2:
-        generic_help = "If you are parsing Python 3 code, check the menu item 'File/Python 3."
-    else:
-        generic_help = "If you are parsing Python 2 code, uncheck the menu item 'File/Python 3."
-        generic_help += f"\n\nBe aware that Pynsource is running under Python {sys.version} and thus cannot handle syntax > than that version."
-    generic_help += "\n\nOr of course you may be dealing with a real syntax error :-)"
+    size_budget = options.get("PARSE_SIZE_BUDGET", PARSE_SIZE_BUDGET)
+    kind = data_modules.classify_source(
+        source, size_budget, options.get("DATA_MODULE_FAST_PATH", DATA_MODULE_FAST_PATH)
+    )
+    if kind == data_modules.OVERSIZED:
+        data_modules.scan_top_level(source, pmodel)
+        pmodel.errors = f"{path.basename(filename)} is {len(source)} characters, over the parse size budget of {size_budget} - only its top level classes and functions were scanned for."
+        log_proper.warning(pmodel.errors)
+        return pmodel, ""
+    if kind == data_modules.DATA:
+        log_proper.info(f"{filename} is mostly literals, only parsing its top level classes and functions")
 
     try:
-        node = _ast_parse(filename)
+        node = _ast_parse(
+            source, ast, top_level_only=kind == data_modules.DATA, feature_version=options.get("feature_version")
+        )
     except SyntaxError as e:
-        mode(0)  # reset
-        pmodel.errors = f"Syntax error in parsing\n'{filename}'\n\n{_format_syntax_error_nicely(e)}\n\nPynsource is in Python {_mode} syntax mode.\n{generic_help}"
+        pmodel.errors = f"Syntax error in parsing\n'{filename}'\n\n{_format_syntax_error_nicely(e)}\n\nPynsource is in Python {_mode} syntax mode.\n{_generic_help(_mode)}"
         # log_proper.error(" ".join(pmodel.errors.split()))  # remove multiple spaces
         log_proper.error(pmodel.errors)  # changed my mind, log again with newlines intact ;-)
         return pmodel, ""
     except Exception as e:
-        mode(0)  # reset
-        pmodel.errors = f"General exception in parsing\n'{filename}'\nassuming Python {_mode} syntax - exception is: {e}.\n\n{generic_help}"
-        return pmodel, ""
+        return _general_exception_pmodel(filename, options, e), ""
     else:
         msg = f"Ok parsing the file {filename} - no syntax errors encountered"
         log_proper.info(msg)
         log.out(msg)
 
-    pmodel, debuginfo = _convert_ast_to_old_parser(node, filename, log, options)  # guaranteed to return ok, any exception in pmodel.errors (string)
+    pmodel, debuginfo = _convert_ast_to_old_parser(node, filename, log, options, ast, visit_module)  # guaranteed to return ok, any exception in pmodel.errors (string)
     pmodel.filename = filename  # new, 2020
     warn_if_no_classes_found(pmodel)  # new, 2020
-    mode(0)  # reset
     return pmodel, debuginfo  # 'debuginfo' is string of html
 
+def _generic_help(_mode):
+    if _mode == 2:
+        generic_help = "If you are parsing Python 3 code, check the menu item 'File/Python 3."
+    else:
+        generic_help = "If you are parsing Python 2 code, uncheck the menu item 'File/Python 3."
+        generic_help += f"\n\nBe aware that Pynsource is running under Python {sys.version} and thus cannot handle syntax > than that version."
+    generic_help += "\n\nOr of course you may be dealing with a real syntax error :-)"
+    return generic_help
+
+def _general_exception_pmodel(filename, options, e):
+    _mode = options.get("mode", 2)
+    pmodel = OldParseModel()
+    pmodel.filename = filename
+    pmodel.errors = f"General exception in parsing\n'{filename}'\nassuming Python {_mode} syntax - exception is: {e}.\n\n{_generic_help(_mode)}"
+    return pmodel
+
 def warn_if_no_classes_found(pmodel):
     if len(pmodel.classlist) == 0:
         pmodel.errors += f"{path.basename(pmodel.filename)} had no classes."
@@ -193,21 +322,36 @@ def _format_syntax_error_nicely(e):
     except:
         return repr(e)
 
-def _ast_parse(filename):
+def _ast_parse(source, ast=ast_native, top_level_only=False, feature_version=None):
     """
     Does the actual ast parsing, by calling python's built in ``ast.parse(source)``.
 
     We also enhance the tree by adding parent and root attributes to each node, so that we can always get to the root
     and parent. Currently 'root' is only used once, when visting the Module, in order to pretty print the tree,
     and to store the original source code in 'root.source_code'. The attribute 'parent' is not yet used.
+    The names of all classes found on the way are stored in 'root.class_names', for QuickParseAst.
 
-    :param filename: python file to parse
+    :param source: python source code
+    :param ast: the ast backend module to parse with, see ast_backend()
+    :param top_level_only: only parse the top level classes, functions and imports, see data_modules
+    :param feature_version: python 3 minor version e.g. 7 or (3, 7), to parse in that version's
+                            syntax rather than that of the running python - native ast only
     :return: ast root tree node
     """
-    with open(filename, "r", encoding='utf-8') as f:
-        source = f.read()
-
-    node = ast.parse(source)
+    kwargs = {}
+    if feature_version is not None and ast is ast_native:
+        kwargs["feature_version"] = feature_version
+    if top_level_only:
+        trimmed = data_modules.top_level_source(source)
+        try:
+            node = ast.parse(trimmed, **kwargs) if trimmed is not None else None
+        except SyntaxError:
+            node = None  # fooled by a multi-line string, a real syntax error is reported below
+        if node is None:
+            node = ast.parse(source, **kwargs)
+            data_modules.top_level_only(node, ast)
+    else:
+        node = ast.parse(source, **kwargs)
     root = node
 
     root.source_code = source
@@ -217,15 +361,26 @@ def _ast_parse(filename):
     # print ast.dump(node, annotate_fields=False)
     # astpretty.pprint(node)
 
-    # Enhance tree by adding parent and root attributes to each node
+    _annotate_tree(root, ast)
+    return root
+
+
+def _annotate_tree(root, ast=ast_native):
+    """
+    Enhance tree by adding parent and root attributes to each node, noting class names
+    on the way for QuickParseAst
+    """
     root.parent = None
     root.root = root
+    class_names = set()
+    ClassDef = ast.ClassDef
     for node in ast.walk(root):
+        if node.__class__ is ClassDef:
+            class_names.add(node.name)
         for child in ast.iter_child_nodes(node):
             child.parent = node
             child.root = root
-
-    return root
+    root.class_names = class_names
 
 def _remove_html_tags(text):
     """Remove html tags from a string"""
@@ -242,23 +397,24 @@ def _remove_html_tags(text):
             new_s += line.strip() + " "
     return new_s
 
-def _extract_source_code_line(filename, lineno):
+def _extract_source_code_line(our_lines, lineno):
     if lineno == 0:
         return f"UNKNOWN source code since line number is 0 ?"
-    with open(filename, encoding='utf-8') as f:
-        our_lines = f.readlines()
-        if lineno < len(our_lines):
-            return our_lines[lineno - 1].strip()
-        else:
-            return f"?line {lineno} exceeds num lines in file {len(our_lines)}, last source code line is {our_lines[-1].strip()}"
+    if lineno < len(our_lines):
+        return our_lines[lineno - 1].strip()
+    else:
+        return f"?line {lineno} exceeds num lines in file {len(our_lines)}, last source code line is {our_lines[-1].strip()}"
 
-def _convert_ast_to_old_parser(node, filename, log, options={}):
+def _convert_ast_to_old_parser(node, filename, log, options={}, ast=ast_native, visit_module=None):
     """
     Args:
         node: ast node after parsing by python's ast library
         filename:
         _log:
         options:
+        ast: the ast backend module that produced 'node'
+        visit_module: optional callable(visitor, node) which does the visiting instead of
+                      visitor.visit(node) - see incremental.IncrementalParser
 
     Returns:
 
@@ -267,19 +423,27 @@ def _convert_ast_to_old_parser(node, filename, log, options={}):
     if not logh:
         logh = LogWriterNull()
 
-    qp = QuickParse(filename, logh)
-    v = Visitor(qp, logh, options)
+    if options.get("QUICK_PARSE", QUICK_PARSE) == "regex":
+        qp = QuickParse(filename, logh, source=node.source_code)
+    else:
+        qp = QuickParseAst(node, ast, logh)
+    v = Visitor(qp, logh, options, ast)
 
     # Give visitor access to source code, for diagnostic purposes
-    with open(filename, encoding='utf-8') as f:
-        v.source_code_lines = f.readlines()
+    v.source_code_lines = node.source_code.splitlines(keepends=True)
 
     try:
-        v.visit(node)
+        if visit_module:
+            visit_module(v, node)
+        else:
+            v.visit(node)
+    except ParseBudgetExceeded as err:
+        v.model.errors += f"Parsing {filename} {TIME_BUDGET_EXCEEDED} of {err} seconds at approx. lineno {v.latest_lineno}, the model is incomplete."
+        log_proper.warning(v.model.errors)
     except Exception as err:
         # traceback.print_exception(type(ex), ex, ex.__traceback__)
 
-        source_code_line = _extract_source_code_line(filename, v.latest_lineno)
+        source_code_line = _extract_source_code_line(v.source_code_lines, v.latest_lineno)
         v.model.errors += f"error Pynsource couldn't handle traversing AST in file {filename} corresponding to approx. lineno {v.latest_lineno} coloffset {v.latest_col_offset} - source code:\n\n {source_code_line}"
         v.model.errors += f"\n\nPlease report this to https://github.com/abulka/pynsource/issues"
         v.model.errors += f"\n\nLog file location:\n{LOG_FILENAME}"
@@ -318,14 +482,17 @@ def _convert_ast_to_old_parser(node, filename, log, options={}):
     return v.model, debuginfo
 
 
-class T:
-    pass  # fake base class, so can dynamically switch - https://stackoverflow.com/questions/9539052/how-to-dynamically-change-base-class-of-instances-at-runtime
-
+class Visitor(ast_native.NodeVisitor):
+    """
+    Walks the ast tree building up a pmodel.
 
-# class Visitor(ast.NodeVisitor):
-class Visitor(T):
-    def __init__(self, quick_parse, logh, options={}):
+    Each instance carries its own ast backend module in 'self.ast' (native ast, or
+    typed_ast.ast27 for python 2) and there is no shared mutable state, so
+    many visitors can run concurrently in different threads, each in any mode.
+    """
+    def __init__(self, quick_parse, logh, options={}, ast=ast_native):
 
+        self.ast = ast
         self.model = OldParseModel()
         self.source_code_lines = []  # new for 2020, helps with diagnostics only
         self.logh = logh
@@ -334,7 +501,20 @@ class Visitor(T):
         self.quick_parse = quick_parse
         self.init_lhs_rhs()
         self.imports_encountered = []
+        self.symbol_index = options.get("symbol_index")  # optional symbol_index.SymbolIndex of the whole project
+
+        # When not tracing (production) no debug strings are built or accumulated, only the
+        # last few visited nodes are remembered in 'history', for error reports.
+        self.tracing = DEBUGINFO() or options.get("TRACE_PARSE", TRACE_PARSE)
+
+        # Pruning skips visiting expressions which can't affect the model - the model only
+        # depends on the tokens of a statement when the first of them is "self", or when it is
+        # an assignment, see flush().  The debug trace of a pruned visit would be incomplete.
+        self.pruning = options.get("PRUNE_VISIT", PRUNE_VISIT) and not self.tracing
 
+        self.time_budget = options.get("PARSE_TIME_BUDGET", PARSE_TIME_BUDGET)
+        self.deadline = time.perf_counter() + self.time_budget if self.time_budget else None
+        self.history = deque(maxlen=PARSE_HISTORY_SIZE)
         self.result = []                 # accumulated visitor debug info with html
         self.result_for_log_proper = []  # accumulated visitor debug info without html
         self.indent_with = " " * 4
@@ -344,6 +524,8 @@ class Visitor(T):
         self.latest_lineno = 0
         self.latest_col_offset = 0
 
+        self._dispatch_table = self.dispatch_table(ast)
+
         self.treat_property_decorator_as_prop = options.get(
             "TREAT_PROPERTY_DECORATOR_AS_PROP", TREAT_PROPERTY_DECORATOR_AS_PROP
         )
@@ -362,20 +544,45 @@ class Visitor(T):
     def record_lhs_rhs(self, s):
         if self.lhs_recording:
             self.lhs.append(s)
-            self.write("\nLHS %d %s\n" % (len(self.lhs), self.lhs), mynote=2)
+            if self.tracing:
+                self.write("\nLHS %d %s\n" % (len(self.lhs), self.lhs), mynote=2)
         else:
             if (
                 self.stop_recording_rhs_inside_first_bracket != None
                 and self.stop_recording_rhs_inside_first_bracket > 1
             ):
-                self.write(
-                    "\nPrevented RHS %d %s due to stop_recording_rhs_inside_first_bracket\n"
-                    % (len(self.rhs), self.rhs),
-                    mynote=2,
-                )
+                if self.tracing:
+                    self.write(
+                        "\nPrevented RHS %d %s due to stop_recording_rhs_inside_first_bracket\n"
+                        % (len(self.rhs), self.rhs),
+                        mynote=2,
+                    )
             else:
                 self.rhs.append(s)
-                self.write("\nRHS %d %s\n" % (len(self.rhs), self.rhs), mynote=2)
+                if self.tracing:
+                    self.write("\nRHS %d %s\n" % (len(self.rhs), self.rhs), mynote=2)
+
+    def skip_expression(self, node):
+        """
+        Pruning.  Call at the start of a statement, before visiting its first expression 'node'.
+        If the tokens of the statement can't affect the model, just records the first of them
+        (keeping lhs[0] as a full visit would have it) and returns True - the caller then skips
+        visiting the statement's expressions.  Any nested statements are still visited.
+        """
+        if not self.pruning:
+            return False
+        token = _first_token(node)
+        if token is None or token == "self":
+            return False
+        self.record_lhs_rhs(token)
+        return True
+
+    def skip_rhs(self):
+        """
+        Pruning.  Call once the lhs of an assignment has been visited - the rhs only matters to
+        the model when the lhs starts with "self", see flush()
+        """
+        return self.pruning and self.lhs and self.lhs[0] != "self"
 
     def am_inside_module_function(self):
         return self.stack_module_functions[-1]
@@ -390,18 +597,22 @@ class Visitor(T):
     def pop_a_function_or_method(self):
         if self.current_class():
             self.current_class().stack_functions.pop()
-            self.write("  (POP method) %s " % self.current_class().stack_functions, mynote=3)
+            if self.tracing:
+                self.write("  (POP method) %s " % self.current_class().stack_functions, mynote=3)
         else:
             self.stack_module_functions.pop()
-            self.write("  (POP module function) %s " % self.stack_module_functions, mynote=3)
+            if self.tracing:
+                self.write("  (POP module function) %s " % self.stack_module_functions, mynote=3)
 
     def push_a_function_or_method(self):
         if self.current_class():
             self.current_class().stack_functions.append(True)
-            self.write("  (PUSH method) %s " % self.current_class().stack_functions, mynote=3)
+            if self.tracing:
+                self.write("  (PUSH method) %s " % self.current_class().stack_functions, mynote=3)
         else:
             self.stack_module_functions.append(True)
-            self.write("  (PUSH module function) %s " % self.stack_module_functions, mynote=3)
+            if self.tracing:
+                self.write("  (PUSH module function) %s " % self.stack_module_functions, mynote=3)
 
     def in_class_static_area(self):
         return self.current_class() and not self.current_class().stack_functions[-1]
@@ -414,9 +625,10 @@ class Visitor(T):
         self.model.classlist[name] = c
         self.stack_classes.append(c)
         c.name_long = "_".join([str(c) for c in self.stack_classes])
-        self.write(
-            "  (inside class %s) %s " % (c.name, [str(c) for c in self.stack_classes]), mynote=3
-        )
+        if self.tracing:
+            self.write(
+                "  (inside class %s) %s " % (c.name, [str(c) for c in self.stack_classes]), mynote=3
+            )
         return c
 
     def add_composite_dependency(self, t):
@@ -488,6 +700,8 @@ class Visitor(T):
 
     @property
     def result_for_log_proper_cleaned(self):
+        if not self.tracing:
+            return "Parse History (most recent nodes): " + self.history_cleaned
         s = " ".join(self.result_for_log_proper)
         s = _remove_html_tags(s)
         # s = s.replace("<br>", " ")
@@ -496,6 +710,17 @@ class Visitor(T):
         # s = " ".join(s.split())  # remove multiple spaces
         return "Parse History: " + s
 
+    @property
+    def history_cleaned(self):
+        entries = []
+        for node in self.history:
+            lineno = getattr(node, "lineno", None)
+            if lineno is None:
+                entries.append(node.__class__.__name__)
+            else:
+                entries.append(f"{node.__class__.__name__} line {lineno} col {node.col_offset}")
+        return "\n\t".join(entries)
+
     def flush(self):
         """
             Flush is called after:
@@ -511,7 +736,7 @@ class Visitor(T):
         if DEBUGINFO():
             # this is cripplingly slow when bundled in pyinstaller
             self.flush_state(whosgranddaddy())
-        else:
+        elif self.tracing:
             self.flush_state("")
 
         # At this point we have both lhs and rhs plus three flags and can
@@ -569,7 +794,69 @@ class Visitor(T):
 
     # MAIN VISIT METHODS
 
+    @classmethod
+    def dispatch_table(cls, ast):
+        """
+        node class -> visit method, for every node class of the ast backend.  Built once per
+        backend (and Visitor subclass), instead of a getattr of "visit_" + class name per node.
+        """
+        key = (cls, ast)
+        table = _DISPATCH_TABLES.get(key)
+        if table is None:
+            table = {}
+            for name in dir(ast):
+                node_class = getattr(ast, name)
+                if isinstance(node_class, type) and issubclass(node_class, ast.AST):
+                    table[node_class] = getattr(cls, "visit_" + node_class.__name__, cls.generic_visit)
+            _DISPATCH_TABLES[key] = table
+        return table
+
+    def visit(self, node):
+        """
+        Visit node and everything under it.
+
+        The visit_ methods don't recurse, they 'yield' each child node to visit, in order, and
+        carry on once it has been completely visited - so the code before and after a child
+        (flush(), newline(), the lhs/rhs recording) runs exactly as in a recursive visit.
+        This loop drives them with an explicit stack of the visit_ generators in progress,
+        thus very deep trees can't hit the recursion limit.  visit_ methods with no children
+        to visit, e.g. of names and constants, are plain methods.
+        """
+        children = self.dispatch(node)
+        if children is None:
+            return
+        table = self._dispatch_table
+        remember = self.history.append
+        stack = []
+        while True:
+            for child in children:  # resumes where it left off, after a break
+                remember(child)
+                method = table.get(child.__class__)
+                if method is None:
+                    method = self.lookup_visit_method(child)
+                grandchildren = method(self, child)
+                if grandchildren is not None:
+                    stack.append(children)
+                    children = grandchildren
+                    break
+            else:  # children exhausted
+                if not stack:
+                    return
+                children = stack.pop()
+
+    def dispatch(self, node):
+        """Start visiting just node, returns a generator of its children to visit, or None"""
+        self.history.append(node)
+        method = self._dispatch_table.get(node.__class__) or self.lookup_visit_method(node)
+        return method(self, node)
+
+    def lookup_visit_method(self, node):
+        """For nodes which aren't of a node class of our ast backend"""
+        return getattr(type(self), "visit_" + node.__class__.__name__, type(self).generic_visit)
+
     def write(self, x, mynote=0):
+        if not self.tracing:
+            return
         if DEBUG_TO_LOG_PROPER:
             self.result_for_log_proper.append(x)
         if not DEBUGINFO():
@@ -587,14 +874,15 @@ class Visitor(T):
 
     def _record_line_number(self, node):
         if node:
-            msg = f"Line: {node.lineno} col_offset: {node.col_offset}"
-            self.write(msg, mynote=2)  # 2 means red colour
             self.latest_lineno = node.lineno
             self.latest_col_offset = node.col_offset
+            if not self.tracing:
+                return
 
-            # 
-            # Heavy debug point - comment out in production
-            # 
+            msg = f"Line: {node.lineno} col_offset: {node.col_offset}"
+            self.write(msg, mynote=2)  # 2 means red colour
+
+            # Heavy debug point - only when tracing
             def get_source_code_line(lineno):
                 return self.source_code_lines[lineno - 1].rstrip()
             def get_source_code_line_caret(col_offset):
@@ -603,6 +891,8 @@ class Visitor(T):
             log_proper.debug(get_source_code_line_caret(node.col_offset))
 
     def newline(self, node=None, extra=0):
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise ParseBudgetExceeded(self.time_budget)
         self._record_line_number(node)
         self.new_lines = max(self.new_lines, 1 + extra)
 
@@ -613,16 +903,28 @@ class Visitor(T):
         self.new_line = True
         self.indentation += 1
         for stmt in statements:
-            self.visit(stmt)
+            yield stmt
         self.indentation -= 1
 
+    def generic_visit(self, node):
+        # Same as ast.NodeVisitor.generic_visit but recognises the nodes of our ast backend,
+        # which may be typed_ast nodes rather than native ast nodes.
+        AST = self.ast.AST
+        for field, value in self.ast.iter_fields(node):
+            if isinstance(value, list):
+                for item in value:
+                    if isinstance(item, AST):
+                        yield item
+            elif isinstance(value, AST):
+                yield value
+
     # S
     def body_or_else(self, node):
-        self.body(node.body)
+        yield from self.body(node.body)
         if node.orelse:
             self.newline()
             self.write("else:")
-            self.body(node.orelse)
+            yield from self.body(node.orelse)
 
     # S
     def signature(self, node):
@@ -637,23 +939,25 @@ class Visitor(T):
         padding = [None] * (len(node.args) - len(node.defaults))
         for arg, default in zip(node.args, padding + node.defaults):
             write_comma()
-            self.visit(arg)
+            yield arg
             if default is not None:
                 self.write("=")
-                self.visit(default)
+                yield default
         if node.vararg is not None:
             write_comma()
-            self.write("*" + node.vararg)
+            if self.tracing:
+                self.write("*" + node.vararg)
         if node.kwarg is not None:
             write_comma()
-            self.write("**" + node.kwarg)
+            if self.tracing:
+                self.write("**" + node.kwarg)
 
     # S
     def decorators(self, node):
         for decorator in node.decorator_list:
             self.newline(decorator)
             self.write("@")
-            self.visit(decorator)
+            yield decorator
 
     # Statements
 
@@ -661,22 +965,27 @@ class Visitor(T):
     def visit_Module(self, node):
         self.write("\nvisit_Module ", mynote=1)
 
-        # Dump source code to logh file
-        self.logh.out_wrap_in_html(
-            add_line_numbers(node.root.source_code),
-            style_class="dump1",
-            heading="Module Source Code...",
-        )
+        if not isinstance(self.logh, LogWriterNull):  # dumps are expensive, skip if going nowhere
+            # Dump source code to logh file
+            self.logh.out_wrap_in_html(
+                add_line_numbers(node.root.source_code),
+                style_class="dump1",
+                heading="Module Source Code...",
+            )
 
-        # Dump ast structure to logh file
-        s = astpretty.pformat(node.root)  # .root is a property I added to each node of the ast tree
-        if sys.version_info < (3, 0):
-            s = s.encode("utf-8")  # unicode to str
-        self.logh.out_wrap_in_html(
-            s, style_class="dump_ast", heading="AST..."
-        )  # better than self.write(s, mynote=1)
+            # Dump ast structure to logh file
+            if isinstance(node.root, ast_native.AST):
+                import astpretty  # pip install astpretty, only needed for this debug dump
+                s = astpretty.pformat(node.root)  # .root is a property I added to each node of the ast tree
+            else:
+                s = self.ast.dump(node.root)  # typed_ast nodes are not understood by astpretty
+            if sys.version_info < (3, 0):
+                s = s.encode("utf-8")  # unicode to str
+            self.logh.out_wrap_in_html(
+                s, style_class="dump_ast", heading="AST..."
+            )  # better than self.write(s, mynote=1)
 
-        self.generic_visit(node)  # need this to keep the visiting going...
+        yield from self.generic_visit(node)  # need this to keep the visiting going...
 
         # After whole module is done...
         self.write("visit_Module complete", mynote=1)
@@ -688,14 +997,15 @@ class Visitor(T):
         for idx, target in enumerate(node.targets):
             if idx:
                 self.write(", ")
-            self.visit(target)
+            yield target
 
         self.write(" = ")
 
         # A
         self.lhs_recording = False  # are parsing the rhs now
 
-        self.visit(node.value)  # node.value is an ast obj, can't print it
+        if not self.skip_rhs():
+            yield node.value  # node.value is an ast obj, can't print it
 
         # A
         self.made_assignment = True
@@ -703,22 +1013,43 @@ class Visitor(T):
     # S
     def visit_AugAssign(self, node):
         self.newline(node)
-        self.visit(node.target)
-        self.write(" " + BINOP_SYMBOLS[as_str(type(node.op))].replace("<", "&lt;") + "= ")
-        self.visit(node.value)
+        if self.skip_expression(node.target):
+            return
+        yield node.target
+        if self.tracing:
+            self.write(" " + BINOP_SYMBOLS[as_str(type(node.op))].replace("<", "&lt;") + "= ")
+        yield node.value
+
+    def record_import(self, node):
+        """
+        Record the modules an import statement may import, in model.imported_modules.  'import a.b'
+        gives 'a.b', 'from .a import b, c' gives '.a', '.a.b' and '.a.c' since b and c may be
+        submodules rather than names - resolving them against the source tree is up to the caller.
+        """
+        if isinstance(node, self.ast.Import):
+            self.model.imported_modules.extend(item.name for item in node.names)
+            return
+        prefix = "." * (node.level or 0)
+        if node.module:
+            self.model.imported_modules.append(prefix + node.module)
+            prefix += node.module + "."
+        self.model.imported_modules.extend(prefix + item.name for item in node.names if item.name != "*")
 
     # S
     def visit_ImportFrom(self, node):
         self.newline(node)
-        self.write("from %s%s import " % ("." * node.level, node.module))
+        self.record_import(node)
+        if self.tracing:
+            self.write("from %s%s import " % ("." * node.level, node.module))
         for idx, item in enumerate(node.names):
             if idx:
                 self.write(", ")
-            self.visit(item)
+            yield item
 
     # S
     def visit_Import(self, node):
         self.newline(node)
+        self.record_import(node)
 
         # A
         self.made_import = True
@@ -726,19 +1057,22 @@ class Visitor(T):
 
         for item in node.names:
             self.write("import ")
-            self.visit(item)
+            yield item
 
     def visit_Expr(self, node):
         # self.write("visit_Expr")
         self.detect_attribute_when_no_assignment(node)  # NEW July 2020
         self.newline(node)
-        self.generic_visit(node)
+        if self.skip_expression(node.value):
+            return
+        yield from self.generic_visit(node)
 
     def visit_FunctionDef(self, node):
         self.newline(extra=1)
         self.newline(node)
         self.write("\nvisit_FunctionDef\n", mynote=1)
-        self.write("def %s(" % node.name)
+        if self.tracing:
+            self.write("def %s(" % node.name)
 
         def has_property_decorator(node):
             """
@@ -773,11 +1107,13 @@ class Visitor(T):
             method_name = node.name
             for decorator in node.decorator_list:
                 if hasattr(decorator, "id"):  # its a Name, look for getter
-                    self.write(f" found decorator {decorator.id}", mynote=1)
+                    if self.tracing:
+                        self.write(f" found decorator {decorator.id}", mynote=1)
                     if decorator.id == "property":
                         return True  # found the getter
                 elif hasattr(decorator, "attr") and decorator.attr == 'setter':  # its an Attribute, setter, look for method_name
-                    self.write(f" found decorator {decorator.attr}", mynote=1)
+                    if self.tracing:
+                        self.write(f" found decorator {decorator.attr}", mynote=1)
                     if hasattr(decorator, "value"):  # the inner Name
                         # ensure the Name object contains the same name as the method, just being cautious
                         name_obj = decorator.value
@@ -809,7 +1145,7 @@ class Visitor(T):
         self.push_a_function_or_method()
 
         self.write("):")
-        self.body(node.body)
+        yield from self.body(node.body)
 
         # A
         self.flush()
@@ -818,7 +1154,7 @@ class Visitor(T):
     # A - python 3.6
     def visit_AsyncFunctionDef(self, node):
         self.write("\nvisit_AsyncFunctionDef\n", mynote=1)
-        self.visit_FunctionDef(node)  # just call the normal def
+        yield from self.visit_FunctionDef(node)  # just call the normal def
 
     def visit_ClassDef(self, node):
         self.newline(extra=2)
@@ -826,70 +1162,77 @@ class Visitor(T):
         self.newline(node)
 
         self.write("\nvisit_ClassDef\n", mynote=1)
-        self.write("class %s" % node.name)
+        if self.tracing:
+            self.write("class %s" % node.name)
 
         # A
         c = self.build_class_entry(node.name)
 
         for base in node.bases:
-            self.visit(base)
+            yield base
 
             # A
             c.classesinheritsfrom.append(".".join(self.lhs))
-            self.write(
-                "classesinheritsfrom append %s cos lhs is %s" % (".".join(self.lhs), self.lhs)
-            )
+            if self.tracing:
+                self.write(
+                    "classesinheritsfrom append %s cos lhs is %s" % (".".join(self.lhs), self.lhs)
+                )
             self.lhs = []
 
-        self.body(node.body)
+        yield from self.body(node.body)
 
         # A
         self.flush()
         self.stack_classes.pop()
-        self.write(
-            "  (pop a class) stack now: %s " % [str(c) for c in self.stack_classes], mynote=3
-        )
+        if self.tracing:
+            self.write(
+                "  (pop a class) stack now: %s " % [str(c) for c in self.stack_classes], mynote=3
+            )
 
     # S
     def visit_If(self, node):
         self.newline(node)
         self.write("if ")
-        self.visit(node.test)
+        if not self.skip_expression(node.test):
+            yield node.test
         self.write(":")
-        self.body(node.body)
+        yield from self.body(node.body)
         while True:
             else_ = node.orelse
-            if len(else_) == 1 and isinstance(else_[0], If):
+            if len(else_) == 1 and isinstance(else_[0], self.ast.If):
                 node = else_[0]
                 self.newline()
                 self.write("elif ")
-                self.visit(node.test)
+                if not self.skip_expression(node.test):
+                    yield node.test
                 self.write(":")
-                self.body(node.body)
+                yield from self.body(node.body)
             else:
                 if len(else_) > 0:
                     self.newline()
                     self.write("else:")
-                    self.body(else_)
+                    yield from self.body(else_)
                 break
 
     # S
     def visit_For(self, node):
         self.newline(node)
         self.write("for ")
-        self.visit(node.target)
-        self.write(" in ")
-        self.visit(node.iter)
+        if not self.skip_expression(node.target):
+            yield node.target
+            self.write(" in ")
+            yield node.iter
         self.write(":")
-        self.body_or_else(node)
+        yield from self.body_or_else(node)
 
     # S
     def visit_While(self, node):
         self.newline(node)
         self.write("while ")
-        self.visit(node.test)
+        if not self.skip_expression(node.test):
+            yield node.test
         self.write(":")
-        self.body_or_else(node)
+        yield from self.body_or_else(node)
 
     # S
     def visit_With(self, node):
@@ -897,19 +1240,22 @@ class Visitor(T):
         self.write("with ")
 
         if hasattr(node, "items"):  # must be a python 3 ast
-            for withitem in node.items:
+            items = [withitem for withitem in node.items if withitem.optional_vars]
+            if items and self.skip_expression(items[0].context_expr):
+                items = []
+            for withitem in items:
                 if withitem.optional_vars:
-                    self.visit(withitem.context_expr)
+                    yield withitem.context_expr
                     self.write(" as ")
-                    self.visit(withitem.optional_vars)
+                    yield withitem.optional_vars
         else:
-            self.visit(node.context_expr)
+            yield node.context_expr
             if node.optional_vars:
                 self.write(" as ")
-                self.visit(node.optional_vars)
+                yield node.optional_vars
 
         self.write(":")
-        self.body(node.body)
+        yield from self.body(node.body)
 
     # S
     def visit_Pass(self, node):
@@ -925,12 +1271,12 @@ class Visitor(T):
         want_comma = False
         if node.dest is not None:
             self.write(" >> ")
-            self.visit(node.dest)
+            yield node.dest
             want_comma = True
         for value in node.values:
             if want_comma:
                 self.write(", ")
-            self.visit(value)
+            yield value
             want_comma = True
         if not node.nl:
             self.write(",")
@@ -939,53 +1285,58 @@ class Visitor(T):
     def visit_Delete(self, node):
         self.newline(node)
         self.write("del ")
+        if self.skip_expression(node.targets[0]):
+            return
         for idx, target in enumerate(node.targets):
             if idx:
                 self.write(", ")
-            self.visit(target)
+            yield target
 
     # S
     def visit_TryExcept(self, node):
         self.newline(node)
         self.write("try:")
-        self.body(node.body)
+        yield from self.body(node.body)
         for handler in node.handlers:
-            self.visit(handler)
+            yield handler
 
     # S
     def visit_TryFinally(self, node):
         self.newline(node)
         self.write("try:")
-        self.body(node.body)
+        yield from self.body(node.body)
         self.newline(node)
         self.write("finally:")
-        self.body(node.finalbody)
+        yield from self.body(node.finalbody)
 
     if sys.version_info >= (3, 5):  # A
 
         def visit_Try(self, node):
             self.newline(node)
             self.write("try:")
-            self.body(node.body)
+            yield from self.body(node.body)
             for handler in node.handlers:
-                self.visit(handler)
+                yield handler
 
     # S
     def visit_Global(self, node):
         self.newline(node)
-        self.write("global " + ", ".join(node.names))
+        if self.tracing:
+            self.write("global " + ", ".join(node.names))
 
     # S
     def visit_Nonlocal(self, node):
         self.newline(node)
-        self.write("nonlocal " + ", ".join(node.names))
+        if self.tracing:
+            self.write("nonlocal " + ", ".join(node.names))
 
     # S
     def visit_Return(self, node):
         self.newline(node)
         if node.value is not None:
             self.write("return ")
-            self.visit(node.value)
+            if not self.skip_expression(node.value):
+                yield node.value
         else:
             self.write("return")
 
@@ -1006,18 +1357,20 @@ class Visitor(T):
         self.write("raise")
         if hasattr(node, "exc") and node.exc is not None:
             self.write(" ")
-            self.visit(node.exc)
+            if self.skip_expression(node.exc):
+                return
+            yield node.exc
             if node.cause is not None:
                 self.write(" from ")
-                self.visit(node.cause)
+                yield node.cause
         elif hasattr(node, "type") and node.type is not None:
-            self.visit(node.type)
+            yield node.type
             if node.inst is not None:
                 self.write(", ")
-                self.visit(node.inst)
+                yield node.inst
             if node.tback is not None:
                 self.write(", ")
-                self.visit(node.tback)
+                yield node.tback
 
     # Expressions
 
@@ -1041,7 +1394,8 @@ class Visitor(T):
                             if hasattr(node.annotation.slice, 'id'): # >= python 3.9 
                                 annotation_id = node.annotation.slice.id
 
-                self.write(f" found type annotation '{annotation_id}' on assignment to {_to_full_var}", mynote=2)
+                if self.tracing:
+                    self.write(f" found type annotation '{annotation_id}' on assignment to {_to_full_var}", mynote=2)
                 if self.current_class():
                     self.add_composite_dependency((_to, annotation_id))
                 else:
@@ -1050,9 +1404,9 @@ class Visitor(T):
         def nice_target_name(target) -> str:
             # target typically has .value.id and .attr
             try:
-                if isinstance(target, ast.Attribute):
+                if isinstance(target, self.ast.Attribute):
                     return f"{target.value.id}.{target.attr}"
-                elif isinstance(target, ast.Name):
+                elif isinstance(target, self.ast.Name):
                     return f"{target.id}"
                 else:
                     return "self.pynsource_parse_error_var"  # hack to avoid parse failures
@@ -1061,14 +1415,15 @@ class Visitor(T):
         _to_full_var = nice_target_name(node.target)
         _to = _to_full_var.split('.')[-1]
 
-        self.write(f"\nvisit_AnnAssign {_to_full_var}\n", mynote=1)
+        if self.tracing:
+            self.write(f"\nvisit_AnnAssign {_to_full_var}\n", mynote=1)
         self.newline(node)
 
         scan_assignment_for_type_annotations(node)
 
         # The following logic directly copied from 'visit_Assign' - but adjusted since can't have
         # multiple lhs when using type annotations. Also have to guard against None (see explanation).
-        self.visit(node.target)
+        yield node.target
 
         self.write(" = ")
 
@@ -1097,21 +1452,23 @@ class Visitor(T):
             self.fred = None            NameConstant(value=None)
             
         """
-        if node.value:  # have to guard against None here but not in visit_Assign (see explanation above)
-            self.visit(node.value)  # node.value is an ast obj, can't print it
+        if node.value and not self.skip_rhs():  # have to guard against None here but not in visit_Assign (see explanation above)
+            yield node.value  # node.value is an ast obj, can't print it
 
         # A
         self.made_assignment = True
         self.flush()  # this fixes the old bug where x = 100 on a line by itself in a module didn't get a variable created unless there was a statement following it
 
     def visit_Attribute(self, node):
-        self.visit(node.value)
+        yield node.value
 
         # A
-        self.write("\nvisit_Attribute %s\n" % node.attr, mynote=1)
+        if self.tracing:
+            self.write("\nvisit_Attribute %s\n" % node.attr, mynote=1)
         self.record_lhs_rhs(node.attr)
 
-        self.write("." + node.attr)
+        if self.tracing:
+            self.write("." + node.attr)
 
     def visit_Call(self, node):
         """
@@ -1121,29 +1478,41 @@ class Visitor(T):
             Update: In Python 3.5 Instead of starargs, Starred nodes can now appear in args, and kwargs is replaced by
             keyword nodes in keywords for which arg is None.
             """
-        self.visit(node.func)
-        self.write("\nvisit_Call %s" % self.rhs, mynote=1)
+        yield node.func
+        if self.tracing:
+            self.write("\nvisit_Call %s" % self.rhs, mynote=1)
 
         # A
         self.detect_append_or_rhs_call()
         if self.stop_recording_rhs_inside_first_bracket != None:
             self.stop_recording_rhs_inside_first_bracket += 1
-            self.write(
-                "stop_recording_rhs_inside_first_bracket INCREMENTED %s"
-                % self.stop_recording_rhs_inside_first_bracket,
-                mynote=1,
-            )
+            if self.tracing:
+                self.write(
+                    "stop_recording_rhs_inside_first_bracket INCREMENTED %s"
+                    % self.stop_recording_rhs_inside_first_bracket,
+                    mynote=1,
+                )
 
         self.write("(")
-        for arg in node.args:
+
+        # Pruning - tokens inside the first bracket of a rhs call aren't recorded, nor can
+        # anything in there change the state of the statement
+        skip_args = (
+            self.pruning
+            and not self.lhs_recording
+            and self.stop_recording_rhs_inside_first_bracket != None
+            and self.stop_recording_rhs_inside_first_bracket > 1
+        )
+        for arg in [] if skip_args else node.args:
             # write_comma()
-            self.visit(arg)
-        for keyword in node.keywords:
+            yield arg
+        for keyword in [] if skip_args else node.keywords:
             # write_comma()
-            self.write(
-                (keyword.arg if keyword.arg else "None (no keyword arg)") + "="
-            )  # TODO is this if/else fix related to python 3 node.kwargs handling? Only get None when parsing with python3 - see test 'test_star_star_params_pyth3'
-            self.visit(keyword.value)
+            if self.tracing:
+                self.write(
+                    (keyword.arg if keyword.arg else "None (no keyword arg)") + "="
+                )  # TODO is this if/else fix related to python 3 node.kwargs handling? Only get None when parsing with python3 - see test 'test_star_star_params_pyth3'
+            yield keyword.value
 
         if sys.version_info >= (3, 5):  # A
             # A
@@ -1152,21 +1521,22 @@ class Visitor(T):
             if node.starargs is not None:
                 # write_comma()
                 self.write("*")
-                self.visit(node.starargs)
+                yield node.starargs
             if node.kwargs is not None:
                 # write_comma()
                 self.write("**")
-                self.visit(node.kwargs)
+                yield node.kwargs
         self.write(")")
 
         # A
         if self.stop_recording_rhs_inside_first_bracket != None:
             self.stop_recording_rhs_inside_first_bracket -= 1
-            self.write(
-                "stop_recording_rhs_inside_first_bracket decremented %s"
-                % self.stop_recording_rhs_inside_first_bracket,
-                mynote=1,
-            )
+            if self.tracing:
+                self.write(
+                    "stop_recording_rhs_inside_first_bracket decremented %s"
+                    % self.stop_recording_rhs_inside_first_bracket,
+                    mynote=1,
+                )
 
     # A
     def detect_append_or_rhs_call(self):
@@ -1206,7 +1576,8 @@ class Visitor(T):
         # Detect normal rhs call
         elif len(self.rhs) > 0:
             if not self.made_rhs_call:
-                self.write("FIRST BRACKET %s len is %d" % (self.rhs, len(self.rhs)), mynote=1)
+                if self.tracing:
+                    self.write("FIRST BRACKET %s len is %d" % (self.rhs, len(self.rhs)), mynote=1)
                 self.pos_rhs_call_pre_first_bracket = (
                     len(self.rhs) - 1
                 )  # remember which is the token before the first bracket
@@ -1217,7 +1588,8 @@ class Visitor(T):
             self.made_rhs_call = True
 
     def visit_Name(self, node):
-        self.write("\nvisit_Name %s\n" % node.id, mynote=1)
+        if self.tracing:
+            self.write("\nvisit_Name %s\n" % node.id, mynote=1)
         self.write(node.id)
 
         # A
@@ -1226,17 +1598,21 @@ class Visitor(T):
     # Cos Python 3.8 reports: PendingDeprecationWarning: visit_Str is deprecated; add visit_Constant
     if sys.version_info.minor >= 8:
         def visit_Constant(self, node):
-            self.write(repr(node.s))
+            if self.tracing:
+                self.write(repr(node.s))
     else:
         def visit_Str(self, node):
-            self.write(repr(node.s))
+            if self.tracing:
+                self.write(repr(node.s))
 
     # S
     def visit_Bytes(self, node):
-        self.write(repr(node.s))
+        if self.tracing:
+            self.write(repr(node.s))
 
     def visit_Num(self, node):
-        self.write(repr(node.n))
+        if self.tracing:
+            self.write(repr(node.n))
 
     # S
     def visit_Tuple(self, node):
@@ -1245,7 +1621,7 @@ class Visitor(T):
         for idx, item in enumerate(node.elts):
             if idx:
                 self.write(", ")
-            self.visit(item)
+            yield item
         self.write(idx and ")" or ",)")
 
     # S
@@ -1255,7 +1631,7 @@ class Visitor(T):
             for idx, item in enumerate(node.elts):
                 if idx:
                     self.write(", ")
-                self.visit(item)
+                yield item
             self.write(right)
 
         return visit
@@ -1284,26 +1660,29 @@ class Visitor(T):
 
     # S
     def visit_BinOp(self, node):
-        self.visit(node.left)
-        self.write(" %s " % BINOP_SYMBOLS[as_str(type(node.op))].replace("<", "&lt;"))
-        self.visit(node.right)
+        yield node.left
+        if self.tracing:
+            self.write(" %s " % BINOP_SYMBOLS[as_str(type(node.op))].replace("<", "&lt;"))
+        yield node.right
 
     # S
     def visit_BoolOp(self, node):
         self.write("(")
         for idx, value in enumerate(node.values):
             if idx:
-                self.write(" %s " % BOOLOP_SYMBOLS[as_str(type(node.op))])
-            self.visit(value)
+                if self.tracing:
+                    self.write(" %s " % BOOLOP_SYMBOLS[as_str(type(node.op))])
+            yield value
         self.write(")")
 
     # S
     def visit_Compare(self, node):
         self.write("(")
-        self.visit(node.left)
+        yield node.left
         for op, right in zip(node.ops, node.comparators):
-            self.write(" %s " % CMPOP_SYMBOLS[as_str(type(op))].replace("<", "&lt;"))
-            self.visit(right)
+            if self.tracing:
+                self.write(" %s " % CMPOP_SYMBOLS[as_str(type(op))].replace("<", "&lt;"))
+            yield right
         self.write(")")
 
     # S
@@ -1313,47 +1692,47 @@ class Visitor(T):
         self.write(op)
         if op == "not":
             self.write(" ")
-        self.visit(node.operand)
+        yield node.operand
         self.write(")")
 
     # S
     def visit_Subscript(self, node):
-        self.visit(node.value)
+        yield node.value
         self.write("[")
-        self.visit(node.slice)
+        yield node.slice
         self.write("]")
 
     # S
     def visit_Slice(self, node):
         if node.lower is not None:
-            self.visit(node.lower)
+            yield node.lower
         self.write(":")
         if node.upper is not None:
-            self.visit(node.upper)
+            yield node.upper
         if node.step is not None:
             self.write(":")
-            if not (isinstance(node.step, Name) and node.step.id == "None"):
-                self.visit(node.step)
+            if not (isinstance(node.step, self.ast.Name) and node.step.id == "None"):
+                yield node.step
 
     # S
     def visit_ExtSlice(self, node):
         for idx, item in enumerate(node.dims):  # ANDY added enumerate
             if idx:
                 self.write(", ")
-            self.visit(item)
+            yield item
 
     # S
     def visit_Yield(self, node):
         self.write("yield ")
         if node.value:  # may not be returning a value from yield
-            self.visit(node.value)
+            yield node.value
 
     # S
     def visit_Lambda(self, node):
         self.write("lambda ")
-        self.signature(node.args)
+        yield from self.signature(node.args)
         self.write(": ")
-        self.visit(node.body)
+        yield node.body
 
     # S
     def visit_Ellipsis(self, node):
@@ -1363,9 +1742,9 @@ class Visitor(T):
     def generator_visit(left, right):
         def visit(self, node):
             self.write(left)
-            self.visit(node.elt)
+            yield node.elt
             for comprehension in node.generators:
-                self.visit(comprehension)
+                yield comprehension
             self.write(right)
 
         return visit
@@ -1379,25 +1758,25 @@ class Visitor(T):
     # S
     def visit_DictComp(self, node):
         self.write("{")
-        self.visit(node.key)
+        yield node.key
         self.write(": ")
-        self.visit(node.value)
+        yield node.value
         for comprehension in node.generators:
-            self.visit(comprehension)
+            yield comprehension
         self.write("}")
 
     # S
     def visit_IfExp(self, node):
-        self.visit(node.body)
+        yield node.body
         self.write(" if ")
-        self.visit(node.test)
+        yield node.test
         self.write(" else ")
-        self.visit(node.orelse)
+        yield node.orelse
 
     # S
     def visit_Starred(self, node):
         self.write("*")
-        self.visit(node.value)
+        yield node.value
 
     # S
     def visit_Repr(self, node):
@@ -1414,7 +1793,8 @@ class Visitor(T):
     def visit_alias(self, node):
         self.write(node.name)
         if node.asname is not None:
-            self.write(" as " + node.asname)
+            if self.tracing:
+                self.write(" as " + node.asname)
 
         # A
         if self.made_import:
@@ -1426,13 +1806,13 @@ class Visitor(T):
     # S
     def visit_comprehension(self, node):
         self.write(" for ")
-        self.visit(node.target)
+        yield node.target
         self.write(" in ")
-        self.visit(node.iter)
+        yield node.iter
         if node.ifs:
             for if_ in node.ifs:
                 self.write(" if ")
-                self.visit(if_)
+                yield if_
 
     # S
     def visit_ExceptHandler(self, node):
@@ -1440,9 +1820,10 @@ class Visitor(T):
         self.write("except")
         if node.type is not None:
             self.write(" ")
-            self.visit(node.type)
+            yield node.type
             if node.name is not None:
-                self.write(f" as {node.name}")  # no need to  self.visit(node.name)
+                if self.tracing:
+                    self.write(f" as {node.name}")  # no need to  self.visit(node.name)
                 # This code breaks with python >= 3.8 which uses regular built in ast
                 # s = repr(type(node)).replace("typed_ast.", "")
                 # if "_ast27." in s or "_ast." in s:
@@ -1452,7 +1833,7 @@ class Visitor(T):
                 #         node.name
                 #     )  # Name is a str in Python 3, don't visit the 'as xxxx' tree if python3, cos haven't figured out the new tree yet, plus no reason to?
         self.write(":")
-        self.body(node.body)
+        yield from self.body(node.body)
 
     # Util methods re assignment and type annotation - July 2020, Dec 2021
 
@@ -1473,7 +1854,8 @@ class Visitor(T):
                 except AttributeError as e:
                     log_proper.exception(f"Error parsing type annotation for parameter {arg.arg}")
                     _type = 'UnknownType'
-                self.write(f" found type annotation '{_type}' on method parameter {arg.arg}", mynote=1)
+                if self.tracing:
+                    self.write(f" found type annotation '{_type}' on method parameter {arg.arg}", mynote=1)
 
                 if self.current_class():
                     self.add_composite_dependency((arg.arg, _type))
@@ -1484,10 +1866,10 @@ class Visitor(T):
         # Generalised, recursive drilling down to construct and return annotation string
         # should handle any type of nested string annotation e.g. "A" or "A.B" or "A.B.C" etc.
         assert annotation is not None
-        assert isinstance(annotation, ast.Name) or isinstance(annotation, ast.Attribute)
-        if isinstance(annotation, ast.Name):
+        assert isinstance(annotation, self.ast.Name) or isinstance(annotation, self.ast.Attribute)
+        if isinstance(annotation, self.ast.Name):
             return annotation.id
-        elif isinstance(annotation, ast.Attribute):
+        elif isinstance(annotation, self.ast.Attribute):
             result = self.annotation_to_string(annotation.value)  # recurse
             return f"{result}.{annotation.attr}"
 
@@ -1509,10 +1891,11 @@ class Visitor(T):
                 ),
             ),
         """
-        if hasattr(node, "value") and isinstance(node.value, ast.Attribute) and hasattr(node.value, 'attr'):
+        if hasattr(node, "value") and isinstance(node.value, self.ast.Attribute) and hasattr(node.value, 'attr'):
             attr_name = node.value.attr
             if self.current_class():
-                self.write(f" attribute '{attr_name}' without assignment - created!", mynote=2)
+                if self.tracing:
+                    self.write(f" attribute '{attr_name}' without assignment - created!", mynote=2)
                 # TODO AddAttribute() won't create duplicates, will add extra attrtypes, but unfortunately won't update an 
                 # existing attrtype - which may mean that a "many" detected later via .append() won't replace a "normal" -  fix
                 self.current_class().AddAttribute(attrname=attr_name, attrtype=["normal"])
@@ -1527,42 +1910,21 @@ class Visitor(T):
     # A means Andy's extra bits of code
 
 
-def mode(python=0):
+def ast_backend(python=0):
     """
-    Switch parser mode to deal with python 2 or 3 syntax.
+    Returns the ast module to parse python 2 or 3 syntax with.  Nothing global is
+    changed, the module is passed around explicitly, which keeps parsing re-entrant.
 
+    Python 3 syntax is parsed by the native ast, older python 3 versions' syntax too, via
+    options["feature_version"].  Python 2 syntax needs the optional typed_ast package,
+    imported on first use - see ast_py2.
 
-    :param python: 0 means use native Python ast, 2 or 3 means use typed_ast (which only works in Python 3)
-    :return: -
+    :param python: 0 or 3 means native Python ast, 2 means typed_ast.ast27
+    :return: ast module - native ast or typed_ast.ast27
+    :raises ast_py2.Python2SupportMissing: python 2 asked for but typed_ast isn't installed
     """
-    global ast, last_python_mode
-    if python == 3:
-        assert sys.version_info >= (3, 0)
-        # print('mode 3')
-        ast = typed_ast.ast3
-
-        # Fix the fact that typed ast can't parse fstring variables and other 3.8 syntax
-        # We revert to the built in ast which is ok.
-        # NOTE: The official word on this is: https://github.com/python/typed_ast
-        # typed_ast will not be updated to support parsing Python 3.8 and newer.
-        # Instead, it is recommended to use the stdlib ast module there, which
-        # has been augmented to support extracting type comments and has limited
-        # support for parsing older versions of Python 3.
-        if sys.version_info[1] >= 8:
-            log_proper.debug(f"using native ast cos python 3.8 or above")
-            ast = ast_native
-
-    elif python == 2:
-        assert sys.version_info >= (3, 0)
-        # print('mode 2')
-        ast = typed_ast.ast27
-    else:
-        # print('Warning - running in python native mode')
-        ast = ast_native
-
-    Visitor.__bases__ = (ast.NodeVisitor,)
-    astpretty.ast = ast  # monkey patch the ast away from built in python to typed_ast
-    last_python_mode = python
-
+    if python == 2:
+        from parsing import ast_py2
 
-mode(0)
+        return ast_py2.load()
+    return ast_native
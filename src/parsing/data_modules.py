@@ -0,0 +1,113 @@
+"""
+Cheap recognition of modules which aren't worth a full parse, and the fast paths taken instead.
+
+Generated modules like media/images.py are mostly string or bytes literals - embedded
+bitmaps, base64 blobs, tables of numbers - with hardly any classes.  Fully parsing them
+means the ast parse, annotating and visiting every literal, for nothing.  Before parsing,
+classify_source() looks at the source text only:
+
+    DATA        big and literal dominated - only the top level classes, functions and imports
+                are parsed, annotated and visited, see top_level_source()
+    OVERSIZED   bigger than the size budget - not ast parsed at all, the top level classes
+                and functions are picked out by regex (see scan_top_level) and the overrun
+                is reported in pmodel.errors
+    None        parse as usual
+
+The literal fraction is the share of the source's tokens, by length, which are string or
+number literals rather than names, found by a couple of regex passes - much quicker than
+tokenizing.
+"""
+
+import re
+
+DATA = "data"
+OVERSIZED = "oversized"
+
+DATA_MODULE_MIN_SIZE = 64 * 1024  # characters, smaller modules aren't worth classifying
+DATA_MODULE_LITERAL_FRACTION = 0.8
+
+_LITERAL = re.compile(
+    r"""[bBrRuU]{0,2}(?:'[^'\\\n]*(?:\\.[^'\\\n]*)*'|"[^"\\\n]*(?:\\.[^"\\\n]*)*")"""
+    r"""|\b\d[\w.]*"""
+)
+_NAME = re.compile(r"[A-Za-z_]\w*")
+_TOP_LEVEL_CLASS = re.compile(r"^class[ \t]+(\w+)[ \t]*(?:\(([^)]*)\))?[ \t]*:", re.MULTILINE)
+_TOP_LEVEL_DEF = re.compile(r"^(?:async[ \t]+)?def[ \t]+(\w+)[ \t]*\(", re.MULTILINE)
+
+_KEEP_STATEMENTS = ("class ", "class\t", "def ", "def\t", "async ", "import ", "from ", "@")
+_CONTINUATION = " \t#)]}\n"  # first characters of lines which don't start a top level statement
+
+
+def literal_fraction(source):
+    """Fraction of the source's literal and name characters which are literals"""
+    code = _LITERAL.sub("", source)
+    literals = len(source) - len(code)
+    names = len("".join(_NAME.findall(code)))
+    return literals / (literals + names) if literals else 0.0
+
+
+def classify_source(source, size_budget=None, data_modules=True):
+    """
+    Returns DATA, OVERSIZED or None, see the module docstring.
+
+    Args:
+        source: python source code
+        size_budget: characters, bigger sources are OVERSIZED.  None for no limit
+        data_modules: whether to look for DATA modules at all
+    """
+    if size_budget and len(source) > size_budget:
+        return OVERSIZED
+    if data_modules and len(source) >= DATA_MODULE_MIN_SIZE:
+        if literal_fraction(source) >= DATA_MODULE_LITERAL_FRACTION:
+            return DATA
+    return None
+
+
+def top_level_source(source):
+    """
+    The source with every line blanked except those of the top level classes, functions and
+    imports, so that only they need parsing - line numbers stay the same.  A top level
+    statement is taken to run from a line starting in column 0 up to the next such line.
+
+    Returns None if a multi-line string outside those statements makes that unreliable.  A
+    multi-line string inside them may still fool it, the result then won't parse - in either
+    case parse the whole source and use top_level_only() instead.
+    """
+    lines = source.splitlines(keepends=True)
+    keeping = False
+    for i, line in enumerate(lines):
+        if line[0] not in _CONTINUATION:
+            keeping = line.startswith(_KEEP_STATEMENTS)
+        if not keeping:
+            if (line.count('"""') + line.count("'''")) % 2:
+                return None
+            lines[i] = "\n"
+    return "".join(lines)
+
+
+def top_level_only(root, ast):
+    """Drop all but the top level classes, functions and imports from the module 'root'"""
+    keep = tuple(
+        getattr(ast, name)
+        for name in ("ClassDef", "FunctionDef", "AsyncFunctionDef", "Import", "ImportFrom")
+        if hasattr(ast, name)
+    )
+    root.body = [stmt for stmt in root.body if isinstance(stmt, keep)]
+
+
+def scan_top_level(source, pmodel):
+    """
+    Fill in the pmodel with the top level classes (with their bases, but no methods or
+    attributes) and module functions found by regex, without parsing.  Returns the pmodel.
+    """
+    from parsing.class_entry import ClassEntry
+
+    for m in _TOP_LEVEL_CLASS.finditer(source):
+        c = pmodel.classlist[m.group(1)] = ClassEntry(m.group(1))  # a redefinition wins, as when parsing
+        c.name_long = c.name
+        for base in (m.group(2) or "").split(","):
+            base = base.strip()
+            if base and "=" not in base:  # not metaclass=...
+                c.classesinheritsfrom.append(base)
+    pmodel.modulemethods.extend(m.group(1) for m in _TOP_LEVEL_DEF.finditer(source))
+    return pmodel
@@ -23,6 +23,8 @@ where
         
     .modulemethods = [method, ...]
 
+    .imported_modules = [dotted module name, ...]  # what import statements may import, relative ones start with dots
+
 @startuml
 
 class OldParseModel #AntiqueWhite/Gold {
@@ -112,6 +114,7 @@ N1 .. ClassDependency
 
 from beautifultable import BeautifulTable
 from termcolor import colored  # also install colorama to make this work on windows
+import json
 import os
 
 
@@ -283,3 +286,63 @@ def dump_pmodel_methods(pmodel):
             res += "\n"
 
     return res
+
+
+# JSON, e.g. one compact record per line (ndjson) via pynsource-cli --format ndjson
+
+def pmodel_to_dict(pmodel, elapsed=None):
+    """
+    Convert pmodel into plain dicts and lists, ready for json.dumps().  Keys follow the
+    pmodel attribute names.  Optionally record the parse time in seconds as 'elapsed'.
+    """
+    result = {
+        "filename": pmodel.filename,
+        "errors": pmodel.errors,
+        "modulemethods": list(pmodel.modulemethods),
+        "imported_modules": list(pmodel.imported_modules),
+        "classlist": {
+            classname: {
+                "name": classentry.name,
+                "name_long": classentry.name_long,
+                "ismodulenotrealclass": classentry.ismodulenotrealclass,
+                "classesinheritsfrom": list(classentry.classesinheritsfrom),
+                "classdependencytuples": [list(t) for t in classentry.classdependencytuples],
+                "attrs": [
+                    {"attrname": attrobj.attrname, "attrtype": list(attrobj.attrtype)}
+                    for attrobj in classentry.attrs
+                ],
+                "defs": list(classentry.defs),
+            }
+            for classname, classentry in pmodel.classlist.items()
+        },
+    }
+    if elapsed is not None:
+        result["elapsed"] = round(elapsed, 6)
+    return result
+
+
+def pmodel_from_dict(data):
+    """Inverse of pmodel_to_dict()"""
+    from parsing.core_parser_ast import OldParseModel
+    from parsing.class_entry import ClassEntry, Attribute
+
+    pmodel = OldParseModel()
+    pmodel.filename = data["filename"]
+    pmodel.errors = data["errors"]
+    pmodel.modulemethods = list(data["modulemethods"])
+    pmodel.imported_modules = list(data.get("imported_modules", []))  # not in older records
+    for classname, c in data["classlist"].items():
+        classentry = ClassEntry(c["name"])
+        classentry.name_long = c["name_long"]
+        classentry.ismodulenotrealclass = c["ismodulenotrealclass"]
+        classentry.classesinheritsfrom = list(c["classesinheritsfrom"])
+        classentry.classdependencytuples = [tuple(t) for t in c["classdependencytuples"]]
+        classentry.attrs = [Attribute(a["attrname"], list(a["attrtype"])) for a in c["attrs"]]
+        classentry.defs = list(c["defs"])
+        pmodel.classlist[classname] = classentry
+    return pmodel
+
+
+def dump_pmodel_ndjson(pmodel, elapsed=None):
+    """Single line of compact json representing the pmodel"""
+    return json.dumps(pmodel_to_dict(pmodel, elapsed), separators=(",", ":"))
@@ -0,0 +1,166 @@
+"""
+Git aware incremental parsing - re-parse just the python files changed between two revisions
+of a local git repository, and apply the results onto a previously saved model.
+
+The saved model is the ndjson that 'pynsource-cli.py --format ndjson' outputs, one record per
+file.  The changed files are listed by 'git diff --name-only' and their content at the new
+revision is read straight out of the repository by a single 'git cat-file --batch', so nothing
+is checked out.  Leave the new revision out to use the working tree instead.  Records of
+unchanged files are copied over verbatim, without decoding them, so regenerating the model for a
+commit costs in proportion to the size of its diff rather than the size of the repo.
+
+'repo' is any directory in a git working tree, only the files under it are considered.  Files
+are named as their path relative to 'repo' joined onto 'repo', e.g. with repo '.' the model
+built by running 'pynsource-cli.py --format ndjson $(git ls-files "*.py") > model.ndjson' in
+that same directory.
+
+Usage:
+    model = read_model("model.ndjson")
+    changes = GitChanges(".", "HEAD~1", "HEAD")
+    results = changes.update_model(model, options={"mode": 3}, jobs=0)
+    write_model("model.ndjson", model)
+    print(len(results), "files re-parsed", len(changes.removed), "removed")
+"""
+
+import json
+import os
+import subprocess
+import tempfile
+from parsing.archives import is_selected
+from parsing.dump_pmodel import dump_pmodel_ndjson
+from parsing.parallel import iter_parse_sources
+
+DEFAULT_INCLUDE = ("*.py",)
+
+
+class GitError(Exception):
+    """A git command failed, or git isn't installed"""
+
+
+def git(repo, *args, input=None):
+    """Runs git in 'repo', returns its stdout as bytes"""
+    try:
+        completed = subprocess.run(["git", "-C", repo, *args], input=input, capture_output=True)
+    except OSError as e:
+        raise GitError(f"Cannot run git: {e}") from e
+    if completed.returncode:
+        raise GitError(f"git {' '.join(args)} failed: {completed.stderr.decode('utf-8', 'replace').strip()}")
+    return completed.stdout
+
+
+def changed_paths(repo, old_rev, new_rev=None, include=DEFAULT_INCLUDE, exclude=()):
+    """
+    Paths, relative to directory 'repo', of the files under it changed between 'old_rev' and
+    'new_rev' (None for the working tree, where untracked files don't count) matching the
+    'include' and 'exclude' globs.  Renames are listed as the old and the new path.
+    """
+    revisions = [old_rev] if new_rev is None else [old_rev, new_rev]
+    output = git(repo, "diff", "--name-only", "--no-renames", "--relative", "-z", *revisions, "--")
+    paths = [path for path in os.fsdecode(output).split("\0") if path]
+    return [path for path in paths if is_selected(path, include, exclude)]
+
+
+def iter_contents(repo, rev, paths):
+    """
+    Yields (path, data) for each path relative to 'repo', where data is the file content at revision 'rev'
+    (None for the working tree) as bytes, or None if the file doesn't exist there.
+    """
+    if rev is None:
+        for path in paths:
+            try:
+                with open(os.path.join(repo, path), "rb") as f:
+                    yield path, f.read()
+            except FileNotFoundError:
+                yield path, None
+        return
+
+    # All in one go - worker processes forked while a 'git cat-file' was still reading its stdin
+    # would hold that pipe open, so it would never see the end of its input.
+    request = "".join(f"{rev}:./{path}\n" for path in paths).encode("utf-8")
+    output = git(repo, "cat-file", "--batch", input=request)
+    pos = 0
+    for path in paths:
+        end = output.index(b"\n", pos)
+        header = output[pos:end].split()
+        pos = end + 1
+        if header[-1] == b"missing":  # '<object> missing', the object name may hold spaces
+            yield path, None
+            continue
+        size = int(header[2])
+        data = output[pos : pos + size]
+        pos += size + 1  # and the newline after the content
+        yield path, data if header[1] == b"blob" else None
+
+
+def read_model(path):
+    """Reads a saved ndjson model, returns {filename: json record line}"""
+    model = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                model[json.loads(line)["filename"]] = line.rstrip("\n")
+    return model
+
+
+def write_model(path, model):
+    """Writes {filename: json record line} as ndjson, replacing 'path' only once complete"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for line in model.values():
+                f.write(line + "\n")
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+class GitChanges:
+    """
+    The python files changed between revisions 'old_rev' and 'new_rev' (None for the working
+    tree) of the git repository in directory 'repo', selected by the 'include' and 'exclude' globs.
+    """
+
+    def __init__(self, repo, old_rev, new_rev=None, include=DEFAULT_INCLUDE, exclude=()):
+        self.repo = repo
+        self.old_rev = old_rev
+        self.new_rev = new_rev
+        self.include = include
+        self.exclude = exclude
+        self.removed = []  # filenames of the files deleted, complete once iter_parse() is exhausted
+
+    def filename(self, path):
+        return os.path.normpath(os.path.join(self.repo, path))
+
+    def iter_parse(self, options=None, jobs=1, cache=None):
+        """
+        Parse the changed files which exist at the new revision, yielding a parallel.ParseResult
+        for each, collecting the rest in 'removed'.  See parallel.iter_parse_files() for the arguments.
+        Raises GitError if git fails, e.g. because of an unknown revision.
+        """
+        self.removed = []
+        paths = changed_paths(self.repo, self.old_rev, self.new_rev, self.include, self.exclude)
+        return iter_parse_sources(self._sources(paths), options, jobs, cache)
+
+    def _sources(self, paths):
+        for path, data in iter_contents(self.repo, self.new_rev, paths):
+            if data is None:
+                self.removed.append(self.filename(path))
+            else:
+                yield self.filename(path), data
+
+    def apply(self, model, results):
+        """
+        Apply ParseResults from iter_parse() onto 'model', a {filename: json record line} as
+        returned by read_model(), as each goes by, and the removals once they are all done.
+        """
+        for result in results:
+            model[result.filename] = dump_pmodel_ndjson(result.pmodel, result.elapsed)
+            yield result
+        for filename in self.removed:
+            model.pop(filename, None)
+
+    def update_model(self, model, options=None, jobs=1, cache=None):
+        """Re-parse the changed files into 'model', returns the list of ParseResults"""
+        return list(self.apply(model, self.iter_parse(options, jobs, cache)))
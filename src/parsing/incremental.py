@@ -0,0 +1,189 @@
+"""
+Incremental re-parsing of a python module that is being edited.
+
+Each top level class and function (a 'block') is fingerprinted by its source code.  On
+re-parse, only blocks whose source changed are re-visited, the pmodel contributions of
+unchanged blocks - including their ClassEntry objects - are reused from the previous parse.
+Other top level statements (imports, module level code) are cheap and always re-visited.
+
+Visiting a block also depends on the module wide quick parse (names of all classes and module
+functions), on any project symbol index and on the imports encountered before the block.  The
+quick parse findings are the 'context' of all the fingerprints - if they change, every block
+is re-visited - and the imports so far are part of each block's key.  A block is only reused if
+the index still gives the same answers for the names its visit looked up, so a change to the
+index only re-visits the blocks which depended on it.
+
+Usage:
+    parser = IncrementalParser("fred.py", options={"mode": 3})
+    pmodel, debuginfo = parser.parse(source)
+    ...edit source...
+    pmodel, debuginfo = parser.parse(source)
+    print(parser.added_classes, parser.removed_classes, parser.changed_classes)
+"""
+
+import hashlib
+from parsing.core_parser_ast import _parse_text, _decode_source, _general_exception_pmodel
+
+
+class _Block:
+    """The pmodel contribution of visiting one top level class or function"""
+
+    def __init__(self):
+        self.classes = []  # (name, ClassEntry) in classlist order
+        self.modulemethods = []
+        self.imported_modules = []
+        self.imports = []  # added to the visitor's imports_encountered
+        self.symbol_lookups = {}  # name -> found, the symbol index lookups of the visit
+
+
+def _class_signature(c):
+    return (
+        c.name,
+        c.name_long,
+        c.defs,
+        [(attr.attrname, attr.attrtype) for attr in c.attrs],
+        c.classdependencytuples,
+        c.classesinheritsfrom,
+        c.ismodulenotrealclass,
+    )
+
+
+class IncrementalParser:
+    """
+    Parses successive versions of the same module, re-visiting only what changed.
+
+    After each parse these report the difference to the previous pmodel, by class name:
+        added_classes, removed_classes, changed_classes
+    Classes not mentioned keep the very same ClassEntry object as in the previous pmodel.
+    'parsed_ok' is False if the source could not be read, parsed or fully visited.
+    """
+
+    def __init__(self, filename="<string>", options={}):
+        self.filename = filename
+        self.options = options
+        self.pmodel = None
+        self.parsed_ok = False
+        self._blocks = {}  # (fingerprint, imports so far) -> _Block
+        self._context = None
+        self._new_blocks = None
+        self._reset_report()
+
+    def _reset_report(self):
+        self.added_classes = []
+        self.removed_classes = []
+        self.changed_classes = []
+        self.blocks_reused = 0
+        self.blocks_visited = 0
+
+    def parse_file(self, log=None):
+        """Re-reads and parses self.filename, see parse()"""
+        try:
+            with open(self.filename, "rb") as f:
+                source = _decode_source(f.read())
+        except Exception as e:
+            self._reset_report()
+            return self._finish(_general_exception_pmodel(self.filename, self.options, e), "")
+        return self.parse(source, log)
+
+    def parse(self, source, log=None):
+        """
+        Parse the latest version of the module's source code.
+
+        Returns: pmodel, debuginfo - exactly as parse_text() would
+        """
+        self._reset_report()
+        self._new_blocks = None
+        pmodel, debuginfo = _parse_text(
+            source, self.filename, log, self.options, visit_module=self._visit_module
+        )
+        return self._finish(pmodel, debuginfo)
+
+    def _finish(self, pmodel, debuginfo):
+        old = self.pmodel.classlist if self.pmodel else {}
+        new = pmodel.classlist
+        self.added_classes = [name for name in new if name not in old]
+        self.removed_classes = [name for name in old if name not in new]
+        self.changed_classes = [name for name in new if name in old and new[name] is not old[name]]
+
+        # Only a completed visit replaces the blocks, so they survive e.g. syntax errors whilst typing
+        self.parsed_ok = self._new_blocks is not None
+        if self.parsed_ok:
+            self._blocks, self._context = self._new_blocks, self._new_context
+        self._new_blocks = None
+        self.pmodel = pmodel
+        return pmodel, debuginfo
+
+    def _visit_module(self, v, node):
+        """Used by _convert_ast_to_old_parser() instead of v.visit(node)"""
+        ast = v.ast
+        if not all(hasattr(stmt, "end_lineno") for stmt in node.body):
+            v.visit(node)  # e.g. python 2 mode, can't extract the source of a block
+            self._new_blocks, self._new_context = {}, None
+            return
+
+        qp = v.quick_parse
+        context = (
+            frozenset(qp.quick_found_classes),
+            frozenset(qp.quick_found_module_defs),
+            v.symbol_index is not None,
+        )
+        known_blocks = self._blocks if context == self._context else {}
+        blocks = {}
+
+        v.history.append(node)
+        for stmt in node.body:
+            if not isinstance(stmt, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                v.visit(stmt)
+                continue
+            key = (self._fingerprint(v.source_code_lines, stmt), tuple(v.imports_encountered))
+            block = known_blocks.get(key)
+            if block and (v.symbol_index is None or v.symbol_index.agrees_with(block.symbol_lookups)):
+                v.flush()  # visiting the block would have flushed any pending state first
+                self._replay(v, block)
+                self.blocks_reused += 1
+            else:
+                block = self._visit_block(v, stmt)
+                self.blocks_visited += 1
+            blocks[key] = block
+
+        self._new_blocks, self._new_context = blocks, context
+
+    def _fingerprint(self, lines, stmt):
+        first = min([stmt.lineno] + [decorator.lineno for decorator in stmt.decorator_list])
+        text = "".join(lines[first - 1 : stmt.end_lineno])
+        return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    def _visit_block(self, v, stmt):
+        classlist = v.model.classlist
+        before = dict(classlist)
+        num_modulemethods = len(v.model.modulemethods)
+        num_imported_modules = len(v.model.imported_modules)
+        num_imports = len(v.imports_encountered)
+        symbol_lookups, v.model.symbol_lookups = v.model.symbol_lookups, {}
+        try:
+            v.visit(stmt)
+        finally:
+            block_symbol_lookups, v.model.symbol_lookups = v.model.symbol_lookups, symbol_lookups
+            symbol_lookups.update(block_symbol_lookups)
+
+        block = _Block()
+        previous = self.pmodel.classlist if self.pmodel else {}
+        for name, entry in list(classlist.items()):
+            if before.get(name) is entry:
+                continue
+            if name in previous and _class_signature(previous[name]) == _class_signature(entry):
+                entry = classlist[name] = previous[name]  # unchanged, keep the old ClassEntry
+            block.classes.append((name, entry))
+        block.modulemethods = v.model.modulemethods[num_modulemethods:]
+        block.imported_modules = v.model.imported_modules[num_imported_modules:]
+        block.imports = v.imports_encountered[num_imports:]
+        block.symbol_lookups = block_symbol_lookups
+        return block
+
+    def _replay(self, v, block):
+        for name, entry in block.classes:
+            v.model.classlist[name] = entry
+        v.model.modulemethods.extend(block.modulemethods)
+        v.model.imported_modules.extend(block.imported_modules)
+        v.imports_encountered.extend(block.imports)
+        v.model.symbol_lookups.update(block.symbol_lookups)
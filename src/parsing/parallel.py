@@ -0,0 +1,353 @@
+"""
+Parse many Python files in parallel, using a pool of worker processes.
+
+Each file is parsed in a worker process via ``new_parser`` and the resulting
+``OldParseModel`` is shipped back to the main process encoded by ``pmodel_codec``. Results are
+by default yielded in the same order as the filenames passed in, regardless of
+which worker finished first, so that building the display model from them is
+deterministic.  Pass ordered=False to stream each result as soon as it is ready.
+
+If options["symbol_index"] is a symbol_index.SymbolIndex, it is updated with the classes of
+each file that parsed, a file that failed to parse keeps its entries.  Every file is parsed
+against a snapshot of the index taken at the start, so results don't depend on which worker
+finished first.  The snapshot is sent to each worker process once, rather than with every file.
+
+Source code which is already in memory, e.g. the members of an archive, is parsed the same
+way by iter_parse_sources(), which consumes its (filename, data) pairs lazily, keeping at most a
+few per worker in flight.  iter_parse_discovering() parses files as they are discovered, e.g.
+the modules imported by the modules parsed so far, keeping every worker busy meanwhile.
+
+Usage:
+    for result in iter_parse_files(filenames, options={"mode": 3}, jobs=4):
+        displaymodel.build_graphmodel(result.pmodel)
+"""
+
+import os
+import queue
+import time
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+ParseResult = namedtuple("ParseResult", ["filename", "pmodel", "debuginfo", "elapsed"])
+
+_worker_symbol_index = None  # the symbol index snapshot, in worker processes
+
+SOURCES_IN_FLIGHT_PER_JOB = 4  # iter_parse_sources() reads ahead this many sources per worker
+
+
+def resolve_jobs(jobs=None):
+    """
+    Number of worker processes to use.  None or 0 means one per cpu core.
+    """
+    if not jobs:
+        jobs = os.cpu_count() or 1
+    return max(1, int(jobs))
+
+
+def _error_pmodel(filename, err):
+    from parsing.core_parser_ast import OldParseModel
+
+    pmodel = OldParseModel()
+    pmodel.filename = filename
+    pmodel.errors = f"General exception in parsing\n'{filename}'\nexception is: {err}."
+    return pmodel
+
+
+def _init_worker(symbol_index):
+    global _worker_symbol_index
+    _worker_symbol_index = symbol_index
+
+
+def _parse_one(filename, options, cache=None):
+    """Runs in the worker process.  Never raises, errors go into pmodel.errors"""
+    from parsing.api import new_parser
+
+    if _worker_symbol_index is not None:
+        options = dict(options, symbol_index=_worker_symbol_index)
+    start = time.perf_counter()
+    try:
+        pmodel, debuginfo = new_parser(filename, options=options, cache=cache)
+    except Exception as err:
+        pmodel, debuginfo = _error_pmodel(filename, err), ""
+    return ParseResult(filename, pmodel, debuginfo, time.perf_counter() - start)
+
+
+def _parse_source(filename, data, options):
+    """Same as _parse_one() for source code supplied as bytes"""
+    from parsing.core_parser_ast import parse_bytes
+
+    if _worker_symbol_index is not None:
+        options = dict(options, symbol_index=_worker_symbol_index)
+    start = time.perf_counter()
+    try:
+        pmodel, debuginfo = parse_bytes(data, filename, options=options)
+    except Exception as err:
+        pmodel, debuginfo = _error_pmodel(filename, err), ""
+    return ParseResult(filename, pmodel, debuginfo, time.perf_counter() - start)
+
+
+def _parse_one_encoded(filename, options):
+    """Runs in the worker process, the pmodel is sent back encoded, which is quicker than pickle"""
+    return _encoded(_parse_one(filename, options))
+
+
+def _parse_source_encoded(filename, data, options):
+    return _encoded(_parse_source(filename, data, options))
+
+
+def _encoded(result):
+    from parsing import pmodel_codec
+
+    try:
+        return result._replace(pmodel=pmodel_codec.encode(result.pmodel))
+    except pmodel_codec.PmodelCodecError:
+        return result  # something unexpected in the pmodel, let it be pickled
+
+
+def iter_parse_files(filenames, options=None, jobs=1, cache=None, ordered=True):
+    """
+    Parse each file, yielding a ParseResult per file in the order of 'filenames'.
+
+    Args:
+        filenames: list of python files to parse
+        options: parse options dict, as accepted by new_parser - must be picklable
+        jobs: number of worker processes, 1 means parse serially in this process,
+              None or 0 means one worker per cpu core.
+        cache: optional parse_cache.ParseCache.  Lookups and stores are done in this
+               process, only cache misses are sent to the workers.  Bypassed when
+               DEBUGINFO() is on, as by new_parser, so debug runs really parse.
+        ordered: False yields results in the order they complete instead, which gets
+                 them out sooner when parsing in parallel.
+
+    Per file problems, including a worker process dying, are reported in
+    pmodel.errors rather than raised, just like new_parser does.
+    """
+    filenames = list(filenames)
+    options = options or {}
+    jobs = min(resolve_jobs(jobs), len(filenames))
+    cache = _cache_unless_debugging(cache)
+    return _updating_symbol_index(options, lambda options: _iter_parse_files(filenames, options, jobs, cache, ordered))
+
+
+def iter_parse_sources(sources, options=None, jobs=1, cache=None, ordered=True):
+    """
+    Same as iter_parse_files() for source code which is already in memory.
+
+    Args:
+        sources: iterable of (filename, data) where data is the file content as bytes and
+                 filename is the name to report it as.  Consumed lazily - only a few sources
+                 per worker are read ahead, so a generator of archive members is never held
+                 in memory all at once.
+        options, jobs, cache, ordered: as for iter_parse_files().  Cache entries are keyed on
+                 the content, so nothing is ever read from disk.
+    """
+    options = options or {}
+    jobs = resolve_jobs(jobs)
+    cache = _cache_unless_debugging(cache)
+    return _updating_symbol_index(options, lambda options: _iter_parse_sources(sources, options, jobs, cache, ordered))
+
+
+def iter_parse_discovering(filenames, discover, options=None, jobs=1, cache=None):
+    """
+    Parse 'filenames', then whatever files discover(result) returns for each ParseResult, and
+    so on until nothing new is discovered.  Each file is parsed at most once.  Newly discovered
+    files are submitted straight away, so workers don't wait for the rest of a batch to finish.
+
+    Args:
+        filenames: the python files to start with
+        discover: called in this process with each ParseResult, returns an iterable of
+                  filenames to parse too - ones parsed or queued already are ignored
+        options, jobs, cache: as for iter_parse_files()
+
+    Results are yielded as they complete, with 'jobs' > 1 that isn't a predictable order.
+    """
+    options = options or {}
+    jobs = resolve_jobs(jobs)
+    cache = _cache_unless_debugging(cache)
+    return _updating_symbol_index(options, lambda options: _iter_parse_discovering(filenames, discover, options, jobs, cache))
+
+
+def _cache_unless_debugging(cache):
+    from parsing.core_parser_ast import DEBUGINFO
+
+    return None if DEBUGINFO() else cache
+
+
+def _updating_symbol_index(options, iter_parse):
+    """Runs iter_parse(options) against a snapshot of any symbol index, updating the real one"""
+    from parsing.core_parser_ast import parse_failed
+
+    symbol_index = options.get("symbol_index")
+    if symbol_index is not None:
+        snapshot = dict(options, symbol_index=symbol_index.copy())
+        for result in iter_parse(snapshot):
+            if not parse_failed(result.pmodel):  # else keep what was known about the file
+                symbol_index.update(result.pmodel)
+            yield result
+    else:
+        yield from iter_parse(options)
+
+
+def _iter_parse_files(filenames, options, jobs, cache, ordered):
+    if jobs <= 1:
+        for filename in filenames:
+            yield _parse_one(filename, options, cache)
+        return
+
+    symbol_index = options.get("symbol_index")
+    worker_options = {key: value for key, value in options.items() if key != "symbol_index"}
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(symbol_index,)) as pool:
+        pending = []
+        for filename in filenames:
+            key, pmodel = cache.lookup(filename, options) if cache is not None else (None, None)
+            if pmodel is not None:
+                pending.append((filename, key, ParseResult(filename, pmodel, "", 0.0)))
+            else:
+                pending.append((filename, key, pool.submit(_parse_one_encoded, filename, worker_options)))
+
+        if not ordered:
+            hits = [future for filename, key, future in pending if isinstance(future, ParseResult)]
+            pending = {
+                future: (filename, key)
+                for filename, key, future in pending
+                if not isinstance(future, ParseResult)
+            }
+            yield from hits
+            done = queue.Queue()
+            for future in pending:
+                future.add_done_callback(done.put)
+            for _ in range(len(pending)):
+                future = done.get()
+                filename, key = pending.pop(future)  # so that finished pmodels can be freed
+                yield _collect(filename, key, future, cache)
+            return
+
+        for i in range(len(pending)):
+            filename, key, future = pending[i]
+            pending[i] = None  # so that finished pmodels can be freed
+            if isinstance(future, ParseResult):  # cache hit
+                yield future
+            else:
+                yield _collect(filename, key, future, cache)
+
+
+def _collect(filename, key, future, cache):
+    try:
+        result = future.result()
+    except Exception as err:  # e.g. BrokenProcessPool
+        return ParseResult(filename, _error_pmodel(filename, err), "", 0.0)
+    if isinstance(result.pmodel, bytes):
+        from parsing import pmodel_codec
+
+        result = result._replace(pmodel=pmodel_codec.decode(result.pmodel))
+    if key:
+        cache.put(key, result.pmodel)
+    return result
+
+
+def _iter_parse_sources(sources, options, jobs, cache, ordered):
+    def lookup(filename, data):
+        if cache is None:
+            return None, None
+        key = cache.key(filename, data, options)
+        pmodel = cache.get(key, options.get("symbol_index"))
+        if pmodel is not None:
+            pmodel.filename = filename
+        return key, pmodel
+
+    if jobs <= 1:
+        for filename, data in sources:
+            key, pmodel = lookup(filename, data)
+            if pmodel is not None:
+                yield ParseResult(filename, pmodel, "", 0.0)
+                continue
+            result = _parse_source(filename, data, options)
+            if key:
+                cache.put(key, result.pmodel)
+            yield result
+        return
+
+    max_in_flight = jobs * SOURCES_IN_FLIGHT_PER_JOB
+    symbol_index = options.get("symbol_index")
+    worker_options = {key: value for key, value in options.items() if key != "symbol_index"}
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(symbol_index,)) as pool:
+        if ordered:
+            pending = deque()
+            for filename, data in sources:
+                key, pmodel = lookup(filename, data)
+                if pmodel is not None:
+                    pending.append((filename, key, ParseResult(filename, pmodel, "", 0.0)))
+                else:
+                    pending.append((filename, key, pool.submit(_parse_source_encoded, filename, data, worker_options)))
+                while len(pending) > max_in_flight or (pending and isinstance(pending[0][2], ParseResult)):
+                    yield _collect_pending(*pending.popleft(), cache)
+            while pending:
+                yield _collect_pending(*pending.popleft(), cache)
+            return
+
+        pending = {}
+        for filename, data in sources:
+            key, pmodel = lookup(filename, data)
+            if pmodel is not None:
+                yield ParseResult(filename, pmodel, "", 0.0)
+                continue
+            pending[pool.submit(_parse_source_encoded, filename, data, worker_options)] = (filename, key)
+            if len(pending) >= max_in_flight:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield _collect(*pending.pop(future), future, cache)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield _collect(*pending.pop(future), future, cache)
+
+
+def _iter_parse_discovering(filenames, discover, options, jobs, cache):
+    queued = set()
+    todo = deque()
+
+    def add(found):
+        for filename in found:
+            if filename not in queued:
+                queued.add(filename)
+                todo.append(filename)
+
+    add(filenames)
+    if jobs <= 1:
+        while todo:
+            result = _parse_one(todo.popleft(), options, cache)
+            yield result
+            add(discover(result))
+        return
+
+    symbol_index = options.get("symbol_index")
+    worker_options = {key: value for key, value in options.items() if key != "symbol_index"}
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(symbol_index,)) as pool:
+        pending = {}
+        while todo or pending:
+            while todo:
+                filename = todo.popleft()
+                key, pmodel = cache.lookup(filename, options) if cache is not None else (None, None)
+                if pmodel is not None:
+                    result = ParseResult(filename, pmodel, "", 0.0)
+                    yield result
+                    add(discover(result))
+                else:
+                    pending[pool.submit(_parse_one_encoded, filename, worker_options)] = (filename, key)
+            if pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = _collect(*pending.pop(future), future, cache)
+                    yield result
+                    add(discover(result))
+
+
+def _collect_pending(filename, key, future, cache):
+    if isinstance(future, ParseResult):  # cache hit
+        return future
+    return _collect(filename, key, future, cache)
+
+
+def parse_files(filenames, options=None, jobs=1, cache=None, ordered=True):
+    """Same as iter_parse_files() but returns a list of all the ParseResults"""
+    return list(iter_parse_files(filenames, options, jobs, cache, ordered))
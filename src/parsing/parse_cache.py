@@ -0,0 +1,225 @@
+"""
+Persistent, content addressed, on disk cache of parse models.
+
+Re-importing a source tree that has hardly changed since last time should cost
+about as much as reading the files.  The cache key is a hash of
+
+    - the file content (bytes)
+    - the filename (it appears in error messages baked into the parse model)
+    - the parse options that affect the result: 'mode', 'feature_version',
+      'TREAT_PROPERTY_DECORATOR_AS_PROP', 'DATA_MODULE_FAST_PATH', 'PARSE_SIZE_BUDGET' and
+      whether there is a 'symbol_index'
+    - core_parser_ast.PARSER_VERSION, bump this whenever the parser output changes
+
+and the value is the OldParseModel, encoded by pmodel_codec.  The cache directory is kept
+under 'max_bytes' by evicting the least recently used entries - an entry's
+file modification time is bumped on every hit, which gives us LRU ordering
+for free, even across runs.  Files whose parse ran over the time budget aren't cached.
+
+With a symbol index, an entry is only a hit if the index still gives the same answers for
+the names the parse looked up (pmodel.symbol_lookups), so a change elsewhere in the project
+only costs the files it affects.
+
+Usage:
+    cache = ParseCache()
+    pmodel, debuginfo = new_parser(filename, options=options, cache=cache)
+    results = parse_files(filenames, options=options, jobs=4, cache=cache)
+    print(cache.stats())
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+from appdirs import user_cache_dir
+from common.messages import ABOUT_APPNAME as APP_NAME
+from parsing.core_parser_ast import (
+    PARSER_VERSION,
+    TREAT_PROPERTY_DECORATOR_AS_PROP,
+    DATA_MODULE_FAST_PATH,
+    PARSE_SIZE_BUDGET,
+    exceeded_time_budget,
+)
+from parsing import pmodel_codec
+
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+CACHE_FILE_EXT = ".pmodel"
+
+
+def default_cache_dir():
+    if sys.platform == "win32":
+        return os.path.join(user_cache_dir(APP_NAME, appauthor=False), "parse_cache")
+    return os.path.join(user_cache_dir(APP_NAME).lower(), "parse_cache")
+
+
+class ParseCache:
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._total_bytes = None  # calculated lazily, on the first put
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, filename, source, options):
+        """
+        Args:
+            filename: the name the file was parsed as
+            source: file content as bytes
+            options: parse options dict
+
+        Returns: hex digest string
+        """
+        symbol_index = options.get("symbol_index")
+        h = hashlib.sha256()
+        h.update(
+            repr(
+                (
+                    PARSER_VERSION,
+                    options.get("mode", 2),
+                    options.get("feature_version"),
+                    options.get("TREAT_PROPERTY_DECORATOR_AS_PROP", TREAT_PROPERTY_DECORATOR_AS_PROP),
+                    options.get("DATA_MODULE_FAST_PATH", DATA_MODULE_FAST_PATH),
+                    options.get("PARSE_SIZE_BUDGET", PARSE_SIZE_BUDGET),
+                    filename,
+                    symbol_index is not None,
+                )
+            ).encode("utf-8")
+        )
+        h.update(source)
+        return h.hexdigest()
+
+    def lookup(self, filename, options):
+        """
+        Returns (key, pmodel) where pmodel is None on a cache miss, in which case
+        parse the file yourself and put(key, pmodel).  key is None if the file can't be read.
+        """
+        key, pmodel, source = self._lookup(filename, options)
+        return key, pmodel
+
+    def parse(self, filename, options):
+        """
+        Cached equivalent of core_parser_ast.parse() with no html log.
+        The file is only read once, even on a cache miss.
+
+        Returns: pmodel, debuginfo
+        """
+        from parsing.core_parser_ast import parse, parse_bytes
+        from common.logwriter import LogWriterNull
+
+        key, pmodel, source = self._lookup(filename, options)
+        if pmodel is not None:
+            return pmodel, ""
+        if source is None:
+            return parse(filename, LogWriterNull(), options)  # let the parser report the problem
+        pmodel, debuginfo = parse_bytes(source, filename, LogWriterNull(), options)
+        self.put(key, pmodel)
+        return pmodel, debuginfo
+
+    def _lookup(self, filename, options):
+        try:
+            with open(filename, "rb") as f:
+                source = f.read()
+        except OSError:
+            return None, None, None
+        key = self.key(filename, source, options)
+        pmodel = self.get(key, options.get("symbol_index"))
+        if pmodel is not None:
+            pmodel.filename = filename
+        return key, pmodel, source
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + CACHE_FILE_EXT)
+
+    def get(self, key, symbol_index=None):
+        """Returns the cached pmodel or None, also if 'symbol_index' now answers its lookups differently"""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                pmodel = pmodel_codec.decode(f.read())
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:  # corrupt or from an incompatible version of pynsource
+            self._remove(path)
+            self.misses += 1
+            return None
+        if symbol_index is not None and not symbol_index.agrees_with(pmodel.symbol_lookups):
+            self.misses += 1  # put() will replace it
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        self.hits += 1
+        return pmodel
+
+    def put(self, key, pmodel):
+        if exceeded_time_budget(pmodel):
+            return
+        try:
+            data = pmodel_codec.encode(pmodel)
+        except pmodel_codec.PmodelCodecError:
+            return  # something unexpected in the pmodel, just don't cache it
+        path = self._path(key)
+
+        # Write to a temporary file then rename, so that concurrent readers never see half an entry
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        old_size = self._size(path)
+        os.replace(temp_path, path)
+
+        if self._total_bytes is None:
+            self._total_bytes = self._calc_total_bytes()
+        else:
+            self._total_bytes += len(data) - old_size
+        if self._total_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits within max_bytes"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(CACHE_FILE_EXT):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                total -= size
+                self.evictions += 1
+        self._total_bytes = total
+
+    def clear(self):
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(CACHE_FILE_EXT):
+                self._remove(entry.path)
+        self._total_bytes = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def _calc_total_bytes(self):
+        return sum(
+            entry.stat().st_size
+            for entry in os.scandir(self.directory)
+            if entry.name.endswith(CACHE_FILE_EXT)
+        )
+
+    def _size(self, path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
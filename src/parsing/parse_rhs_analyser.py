@@ -79,6 +79,14 @@ class RhsAnalyser:
            
         *3 Note if class 'blah' exists instead of class 'Blah'
             then is just classic case A use cases.
+
+    Project wide symbol index:
+        If the visitor has a symbol_index (see symbol_index.SymbolIndex) then classes defined
+        in other modules of the project also count as existing, for the A cases, and a
+        prefixed call like a.Blah() or a.b.Blah() is a class even though 'a' or 'a.b' wasn't
+        imported, if the index knows of class a.Blah e.g. after 'from pkg import a'.  The
+        B cases only consult the current module, guessing classes from instance names
+        across a whole project is too loose.
     """
 
     def __init__(self, visitor):
@@ -112,10 +120,15 @@ class RhsAnalyser:
 
     def class_exists(self, instance_check=False):
         if instance_check:
-            c = self.upper_just_first_char()
-        else:
-            c = self.rhs_ref_to_class
-        return c in self.v.quick_parse.quick_found_classes
+            return self.upper_just_first_char() in self.v.quick_parse.quick_found_classes
+        c = self.rhs_ref_to_class
+        return c in self.v.quick_parse.quick_found_classes or self.in_symbol_index(c)
+
+    def in_symbol_index(self, c):
+        if self.v.symbol_index is None:
+            return False
+        found = self.v.model.symbol_lookups[c] = c in self.v.symbol_index
+        return found
 
     def upper_just_first_char(self):
         return self.rhs_ref_to_class[0].upper() + self.rhs_ref_to_class[1:]
@@ -156,6 +169,9 @@ class RhsAnalyser:
             if self.prefix in self.v.imports_encountered:  # C1, # D4
                 self.rhs_ref_to_class = "%s.%s" % (self.prefix, self.v.rhs[self.pos])
                 return True
+            elif self.in_symbol_index("%s.%s" % (self.prefix, self.v.rhs[self.pos])):
+                self.rhs_ref_to_class = "%s.%s" % (self.prefix, self.v.rhs[self.pos])
+                return True
             else:
                 self.rhs_ref_to_class = None
                 return False
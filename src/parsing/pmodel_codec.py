@@ -0,0 +1,204 @@
+"""
+Compact, versioned binary encoding of an OldParseModel - the wire format between parse worker
+processes and the main process, and the format of the on disk parse cache.
+
+Every string (class, method and attribute names, the filename, errors) is stored once in a
+string table, everything else is a flat array of little endian uint32 - string table indexes,
+counts and flags.  Decoding is thus a couple of bulk array conversions plus building the
+objects, much quicker than unpickling an object graph, and the result is smaller too.
+Decoded strings are interned, so names repeated across many pmodels are only held once.
+
+Layout:
+    header      magic b"PNPM", format version (uint16), number of strings, number of bytes
+                of string text, number of ints
+    lengths     uint32 length in characters of each string
+    strings     all the strings back to back, utf-8 encoded
+    ints        uint32 body:
+                    number of distinct attrtypes, each attrtype list,
+                    filename, errors, modulemethods list, imported_modules list, number of
+                    symbol_lookups, per lookup: name, found (0/1), number of classes, then
+                    per class
+                    classlist key, name, name_long, ismodulenotrealclass,
+                    stack_functions list (0/1 flags), defs list, classesinheritsfrom list,
+                    number of classdependencytuples, pairs..., number of attrs,
+                    per attr: attrname, index of its attrtype
+                a list is its length followed by its items, of string indexes unless noted
+
+Bump FORMAT_VERSION whenever the layout changes, decode() refuses other versions.
+
+Usage:
+    data = encode(pmodel)
+    pmodel = decode(data)
+"""
+
+import gc
+import struct
+import sys
+from array import array
+from itertools import islice
+from sys import intern
+from parsing.class_entry import ClassEntry, Attribute
+
+MAGIC = b"PNPM"
+FORMAT_VERSION = 3
+
+_HEADER = struct.Struct("<4sHIII")
+
+
+class PmodelCodecError(ValueError):
+    """Data is not an encoded pmodel of this format version"""
+
+
+def _uint32_array(values=()):
+    a = array("I", values)
+    if a.itemsize != 4:  # pragma: no cover - platforms where an unsigned int isn't 32 bit
+        a = array("L", values)
+    return a
+
+
+class _StringTable(dict):
+    """string -> index, new strings are added as they are looked up"""
+
+    def __missing__(self, value):
+        if value.__class__ is not str:
+            raise PmodelCodecError(f"can only encode strings, not {value!r}")
+        index = self[value] = len(self)
+        return index
+
+
+def encode(pmodel):
+    """Returns the pmodel encoded as bytes"""
+    string_table = _StringTable()
+    s = string_table.__getitem__
+    attrtypes = {}  # tuple of the attrtype -> index, there are only a few different ones
+    ints = []
+
+    def strs(values):
+        ints.append(len(values))
+        ints.extend(map(s, values))
+
+    ints.append(s(pmodel.filename))
+    ints.append(s(pmodel.errors))
+    strs(pmodel.modulemethods)
+    strs(pmodel.imported_modules)
+    ints.append(len(pmodel.symbol_lookups))
+    for name, found in pmodel.symbol_lookups.items():
+        ints.append(s(name))
+        ints.append(1 if found else 0)
+    ints.append(len(pmodel.classlist))
+    for key, c in pmodel.classlist.items():
+        ints.extend((s(key), s(c.name), s(c.name_long), int(c.ismodulenotrealclass)))
+        ints.append(len(c.stack_functions))
+        ints.extend([1 if flag else 0 for flag in c.stack_functions])
+        strs(c.defs)
+        strs(c.classesinheritsfrom)
+        ints.append(len(c.classdependencytuples))
+        for attrname, classname in c.classdependencytuples:
+            ints.append(s(attrname))
+            ints.append(s(classname))
+        ints.append(len(c.attrs))
+        for attrobj in c.attrs:
+            ints.append(s(attrobj.attrname))
+            ints.append(attrtypes.setdefault(tuple(attrobj.attrtype), len(attrtypes)))
+
+    body = ints
+    ints = [len(attrtypes)]
+    for attrtype in attrtypes:
+        strs(attrtype)
+    ints += body
+
+    strings = list(string_table)  # in index order
+    text = "".join(strings).encode("utf-8", "surrogatepass")
+    lengths = _uint32_array(map(len, strings))
+    ints = _uint32_array(ints)
+    if sys.byteorder == "big":
+        lengths.byteswap()
+        ints.byteswap()
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, len(strings), len(text), len(ints))
+    return b"".join([header, lengths.tobytes(), text, ints.tobytes()])
+
+
+def decode(data):
+    """Returns the OldParseModel encoded in data, raises PmodelCodecError if it isn't one"""
+    from parsing.core_parser_ast import OldParseModel
+
+    try:
+        magic, version, num_strings, num_text_bytes, num_ints = _HEADER.unpack_from(data)
+    except struct.error:
+        raise PmodelCodecError("too short to be an encoded pmodel")
+    if magic != MAGIC:
+        raise PmodelCodecError("not an encoded pmodel")
+    if version != FORMAT_VERSION:
+        raise PmodelCodecError(f"pmodel format version {version}, expected {FORMAT_VERSION}")
+
+    pos = _HEADER.size
+    if len(data) != pos + num_strings * 4 + num_text_bytes + num_ints * 4:
+        raise PmodelCodecError("truncated or corrupt pmodel")
+    lengths = _uint32_array()
+    lengths.frombytes(data[pos : pos + num_strings * 4])
+    pos += num_strings * 4
+    if sys.byteorder == "big":
+        lengths.byteswap()
+    try:
+        text = data[pos : pos + num_text_bytes].decode("utf-8", "surrogatepass")
+    except UnicodeDecodeError:
+        raise PmodelCodecError("corrupt pmodel")
+    pos += num_text_bytes
+    strings = []
+    start = 0
+    for length in lengths:
+        strings.append(intern(text[start : start + length]))
+        start += length
+    ints = _uint32_array()
+    ints.frombytes(data[pos:])
+    if start != len(text):
+        raise PmodelCodecError("corrupt pmodel")
+    if sys.byteorder == "big":
+        ints.byteswap()
+    ints = ints.tolist()
+
+    gc_was_enabled = gc.isenabled()
+    gc.disable()  # lots of new objects but no cycles, don't let the garbage collector keep looking
+    try:
+        pmodel = _decode_body(OldParseModel(), strings.__getitem__, ints)
+    except (IndexError, StopIteration):
+        raise PmodelCodecError("corrupt pmodel")
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    return pmodel
+
+
+def _decode_body(pmodel, string, ints):
+    it = iter(ints)
+    next_int = it.__next__
+
+    def strs():
+        return list(map(string, islice(it, next_int())))
+
+    attrtypes = [strs() for _ in range(next_int())]
+
+    pmodel.filename = string(next_int())
+    pmodel.errors = string(next_int())
+    pmodel.modulemethods = strs()
+    pmodel.imported_modules = strs()
+    for _ in range(next_int()):
+        name = string(next_int())
+        pmodel.symbol_lookups[name] = bool(next_int())
+    classlist = pmodel.classlist
+    for _ in range(next_int()):
+        key = string(next_int())
+        c = ClassEntry(string(next_int()))
+        c.name_long = string(next_int())
+        c.ismodulenotrealclass = next_int()
+        c.stack_functions = [bool(flag) for flag in islice(it, next_int())]
+        c.defs = strs()
+        c.classesinheritsfrom = strs()
+        n = next_int()
+        if n:  # usually not, keep the empty one ClassEntry made
+            c.classdependencytuples = [(string(next_int()), string(next_int())) for _ in range(n)]
+        c.attrs = [Attribute(string(next_int()), list(attrtypes[next_int()])) for _ in range(next_int())]
+        classlist[key] = c
+    if next(it, None) is not None:
+        raise PmodelCodecError("corrupt pmodel, unexpected data at the end")
+    return pmodel
@@ -10,15 +10,18 @@ class QuickParse(object):
     Achieved via cheap and nasty regex.
 
     Results stored in class instance as properties e.g. ``self.quick_found_classes``
+
+    Pass 'source' if you already have the source code, to avoid re-reading 'filename'.
     """
 
-    def __init__(self, filename, logh=None):
+    def __init__(self, filename=None, logh=None, source=None):
         import re
 
         # secret regular expression based preliminary scan for classes and module defs
         # Feed the file text into findall(); it returns a list of all the found strings
-        with open(filename, "r", encoding='utf-8') as f:
-            source = f.read()
+        if source is None:
+            with open(filename, "r", encoding='utf-8') as f:
+                source = f.read()
         self.quick_found_classes = re.findall(
             REGEX_FOR_CLASSES, source, re.MULTILINE
         )  #: list of classes
@@ -39,3 +42,53 @@ class QuickParse(object):
                 ),
                 style_class="quick_findings",
             )
+
+
+class QuickParseAst(object):
+    """
+    Drop in replacement for QuickParse, deriving the same findings from the already parsed
+    ast tree rather than scanning the source text again.  Results are sets, for fast lookups.
+
+    Class names are collected whilst _ast_parse() annotates the tree, into 'root.class_names',
+    so only the top level statements of the module need looking at here.
+
+    Differences to the regex scan are where the regexes are fooled, e.g. by 'class' or 'def'
+    lines inside strings, by a function signature spanning several lines or with a return
+    type annotation, or by a space before the bracket in 'class A (B):'.
+    """
+
+    def __init__(self, root, ast=None, logh=None):
+        if ast is None:
+            import ast
+        if hasattr(root, "class_names"):
+            self.quick_found_classes = root.class_names  #: set of classes
+        else:
+            self.quick_found_classes = {n.name for n in ast.walk(root) if isinstance(n, ast.ClassDef)}
+        functions = (ast.FunctionDef, getattr(ast, "AsyncFunctionDef", ast.FunctionDef))
+        self.quick_found_module_defs = {
+            stmt.name for stmt in root.body if isinstance(stmt, functions)
+        }  #: set of module functions
+        self.quick_found_module_attrs = set()  #: set of module attributes
+        for stmt in root.body:
+            if isinstance(stmt, ast.Assign):
+                name = _root_name(stmt.targets[0], ast)
+                if name and name[0].isascii() and name[0].isalpha():
+                    self.quick_found_module_attrs.add(name)
+
+        if logh:
+            logh.out_wrap_in_html(
+                "quick_found_classes %s<br>quick_found_module_defs %s<br>quick_found_module_attrs %s<br>"
+                % (
+                    sorted(self.quick_found_classes),
+                    sorted(self.quick_found_module_defs),
+                    sorted(self.quick_found_module_attrs),
+                ),
+                style_class="quick_findings",
+            )
+
+
+def _root_name(target, ast):
+    """'x' for assignment targets like x or x.y.z, otherwise None"""
+    while isinstance(target, ast.Attribute):
+        target = target.value
+    return target.id if isinstance(target, ast.Name) else None
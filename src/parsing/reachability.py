@@ -0,0 +1,147 @@
+"""
+Entry point reachability - parse just the modules transitively imported by some entry modules.
+
+Starting from the entry modules, each module parsed has its pmodel.imported_modules resolved
+against the source roots, and the modules found there are parsed in turn, breadth first, up to
+'max_depth' imports away from an entry module.  Importing 'a.b.c' also runs the __init__.py of
+packages 'a' and 'a.b', so those are reachable too, at the same depth.  Imports which don't
+resolve to a file under a source root - the standard library, installed packages, names
+imported from a module rather than submodules - are ignored.  So tests, vendored code and
+dead modules which nothing reachable imports never get parsed.
+
+Parsing is done by parallel.iter_parse_discovering(), so modules are submitted to the worker
+processes as soon as they are discovered.  Results thus arrive in no particular order, and a
+module may first be discovered via a longer chain of imports than its shortest one - depths are
+lowered as shorter chains turn up, and modules which that brings within 'max_depth' are
+parsed too, so the result is exactly that of a breadth first search.
+
+Usage:
+    reachable = Reachable(["src/app/main.py"], max_depth=3)
+    for result in reachable.iter_parse(options={"mode": 3}, jobs=0):
+        displaymodel.build_graphmodel(result.pmodel)
+    print(reachable.depth)
+"""
+
+import os
+from parsing.parallel import iter_parse_discovering
+
+
+def default_source_root(filename):
+    """The directory containing the top level package that 'filename' is in, or just its directory"""
+    directory = os.path.dirname(os.path.abspath(filename))
+    while os.path.isfile(os.path.join(directory, "__init__.py")):
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+    return directory if os.path.isabs(filename) else os.path.relpath(directory)
+
+
+def resolve_module(name, directory):
+    """
+    Files run by importing dotted module 'name' found under 'directory' - the __init__.py of
+    each package on the way, then the module itself.  Returns [] if it isn't there.
+    Namespace packages, without an __init__.py, are allowed.
+    """
+    files = []
+    parts = name.split(".")
+    for part in parts[:-1]:
+        directory = os.path.join(directory, part)
+        if not os.path.isdir(directory):
+            return []
+        _append_if_file(files, os.path.join(directory, "__init__.py"))
+    path = os.path.join(directory, parts[-1])
+    if os.path.isfile(path + ".py"):
+        return files + [path + ".py"]
+    if os.path.isdir(path):
+        _append_if_file(files, os.path.join(path, "__init__.py"))
+        return files
+    return []
+
+
+def _append_if_file(files, path):
+    if os.path.isfile(path):
+        files.append(path)
+
+
+def resolve_import(imported, importer, source_roots):
+    """
+    Files which 'imported', an entry of the pmodel.imported_modules of module 'importer', resolves
+    to.  Relative imports are resolved against the importer's package, absolute ones against
+    the first source root they are found under.
+    """
+    name = imported.lstrip(".")
+    level = len(imported) - len(name)
+    if level:
+        directory = os.path.dirname(importer)
+        for _ in range(level - 1):
+            directory = os.path.dirname(directory)
+        if not name:  # e.g. 'from . import x' where x isn't a submodule
+            init = os.path.join(directory, "__init__.py")
+            return [init] if os.path.isfile(init) else []
+        return resolve_module(name, directory)
+    for root in source_roots:
+        files = resolve_module(name, root)
+        if files:
+            return files
+    return []
+
+
+class Reachable:
+    """
+    The modules reachable from 'entry_files' via imports, no more than 'max_depth' imports away
+    (None for no limit).  'source_roots' defaults to the default_source_root() of each entry file.
+
+    After iter_parse(), 'depth' is {filename: fewest imports away from an entry module} for
+    every module parsed, and 'imports' is {filename: [filename, ...]} of what each one imports.
+    """
+
+    def __init__(self, entry_files, source_roots=None, max_depth=None):
+        self.entry_files = [os.path.normpath(f) for f in entry_files]
+        if source_roots is None:
+            source_roots = [default_source_root(f) for f in self.entry_files]
+        self.source_roots = list(dict.fromkeys(os.path.normpath(root) for root in source_roots))
+        self.max_depth = max_depth
+        self.depth = {}
+        self.imports = {}
+
+    def iter_parse(self, options=None, jobs=1, cache=None):
+        """
+        Parse the reachable modules, yielding a parallel.ParseResult for each as it completes.
+        See parallel.iter_parse_files() for the arguments.
+        """
+        self.depth = dict.fromkeys(self.entry_files, 0)
+        self.imports = {}
+        return iter_parse_discovering(self.entry_files, self.discover, options, jobs, cache)
+
+    def parse(self, options=None, jobs=1, cache=None):
+        """Same as iter_parse() but returns a list of all the ParseResults"""
+        return list(self.iter_parse(options, jobs, cache))
+
+    def discover(self, result):
+        """Records what the module parsed imports, returns the files which have just become reachable"""
+        imports = []
+        for imported in result.pmodel.imported_modules:
+            for filename in map(os.path.normpath, resolve_import(imported, result.filename, self.source_roots)):
+                if filename not in imports and filename != result.filename:
+                    imports.append(filename)
+        self.imports[result.filename] = imports
+        return self._reach(result.filename)
+
+    def _reach(self, filename):
+        """Relax the depths of the modules imported by 'filename', and by those of them already parsed"""
+        found = []
+        todo = [filename]
+        while todo:
+            importer = todo.pop()
+            depth = self.depth[importer] + 1
+            if self.max_depth is not None and depth > self.max_depth:
+                continue
+            for imported in self.imports.get(importer, ()):
+                if depth < self.depth.get(imported, depth + 1):
+                    self.depth[imported] = depth
+                    if imported in self.imports:  # parsed already, what it imports is nearer now too
+                        todo.append(imported)
+                    else:
+                        found.append(imported)
+        return found
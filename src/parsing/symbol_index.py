@@ -0,0 +1,134 @@
+"""
+Project wide index of which modules define which classes, persisted between runs.
+
+The parser normally only knows about the classes in the file being parsed (the quick
+parse) plus the names of imported modules, so e.g. 'self.basket = basket()' or
+'self.c = models.Customer()' after 'from shop import models' are not recognised as
+composition.  With a SymbolIndex passed in options["symbol_index"] the RhsAnalyser also
+consults the classes defined elsewhere in the project - by dict lookup, other files are
+never re-read.
+
+Each class is indexed under its name and every dotted suffix of its full path, so class
+'Customer' in module 'shop.models' is found as 'Customer', 'models.Customer' and
+'shop.models.Customer'.  The module path of a file is worked out from the packages
+(directories with an __init__.py) it lives in.
+
+The index is filled as files are parsed, via update(pmodel).  iter_parse_files() does this
+for you when given an index, each file sees the index as it was before the run started so
+the results don't depend on the order files finish in.  A file's classes thus become known
+to other files on the next run, which is what persisting the index is for.
+
+Usage:
+    index = SymbolIndex.load(path)  # empty if there is no index file yet
+    for result in iter_parse_files(filenames, options={"mode": 3, "symbol_index": index}):
+        ...
+    index.save(path)
+"""
+
+import json
+import os
+import tempfile
+
+INDEX_VERSION = 1
+
+
+def module_path(filename):
+    """Dotted module path of a python file e.g. 'shop.models' for shop/models.py"""
+    directory, name = os.path.split(os.path.abspath(filename))
+    parts = [os.path.splitext(name)[0]]
+    if parts[0] == "__init__":
+        parts = []
+    while os.path.isfile(os.path.join(directory, "__init__.py")):
+        directory, package = os.path.split(directory)
+        if not package:
+            break
+        parts.insert(0, package)
+    return ".".join(parts)
+
+
+class SymbolIndex:
+    def __init__(self):
+        self.files = {}  # filename -> (module path, [class names]), the persisted data
+        self.names = {}  # class name or dotted path -> set of filenames defining it
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def __len__(self):
+        return len(self.names)
+
+    def lookup(self, name):
+        """Sorted filenames of the modules defining class 'name' (or dotted path)"""
+        return sorted(self.names.get(name, ()))
+
+    def update(self, pmodel):
+        """Record the classes defined in the file a pmodel was parsed from"""
+        classes = sorted(name for name, c in pmodel.classlist.items() if not c.ismodulenotrealclass)
+        self.add(pmodel.filename, classes)
+
+    def add(self, filename, classes, module=None):
+        """Record 'classes' as defined in 'filename', replacing what was known about it"""
+        entry = (module if module is not None else module_path(filename), sorted(classes))
+        if self.files.get(filename) == entry:
+            return
+        self.remove(filename)
+        self.files[filename] = entry
+        for key in self._keys(*entry):
+            self.names.setdefault(key, set()).add(filename)
+
+    def remove(self, filename):
+        entry = self.files.pop(filename, None)
+        if entry is None:
+            return
+        for key in self._keys(*entry):
+            filenames = self.names[key]
+            filenames.discard(filename)
+            if not filenames:
+                del self.names[key]
+
+    def _keys(self, module, classes):
+        parts = module.split(".") if module else []
+        for name in classes:
+            yield name
+            for i in range(len(parts)):
+                yield ".".join(parts[i:] + [name])
+
+    def agrees_with(self, lookups):
+        """
+        Whether a parse which made these lookups (pmodel.symbol_lookups, name -> found) would
+        get the same answers from this index, and thus the same result - a parse only depends
+        on the few names it looked up, not on the rest of the index.
+        """
+        return all((name in self.names) == found for name, found in lookups.items())
+
+    def copy(self):
+        index = SymbolIndex()
+        index.files = dict(self.files)
+        index.names = {key: set(filenames) for key, filenames in self.names.items()}
+        return index
+
+    def save(self, path):
+        data = {"version": INDEX_VERSION, "files": self.files}
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to a temporary file then rename, so that a concurrent load never sees half an index
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Returns the saved index, or an empty one if there is none or it is unreadable"""
+        index = cls()
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return index
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return index
+        for filename, (module, classes) in data["files"].items():
+            index.add(filename, classes, module)
+        return index
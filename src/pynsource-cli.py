@@ -1,12 +1,24 @@
 import os
+import sys
+import tarfile
+import zipfile
+from itertools import chain
+import time
 import click
 import textwrap
-from parsing.dump_pmodel import dump_old_structure, dump_pmodel, dump_pmodel_methods
-from parsing.api import new_parser
-import common.messages
-from view.display_model import DisplayModel
-import glob
-from gui.settings import APP_VERSION, APP_VERSION_FULL
+from contextlib import redirect_stdout
+
+with redirect_stdout(sys.stderr):  # keep import time banners off stdout, which may be --format ndjson
+    from parsing.dump_pmodel import dump_old_structure, dump_pmodel, dump_pmodel_methods, dump_pmodel_ndjson
+    from parsing.api import iter_parse_files, iter_parse_archive, is_archive, Reachable
+    from parsing.parse_cache import ParseCache
+    from parsing.symbol_index import SymbolIndex
+    from parsing.git_changes import GitChanges, GitError, read_model, write_model
+    import common.messages
+    from view.display_model import DisplayModel
+    from view.watch_sync import WatchSync
+    import glob
+    from gui.settings import APP_VERSION, APP_VERSION_FULL
 
 @click.command()
 @click.argument('files', nargs=-1)
@@ -14,8 +26,32 @@ from gui.settings import APP_VERSION, APP_VERSION_FULL
 @click.option('--graph', is_flag=True, default=False, help='Build graph of nodes representing class relationships')
 @click.option('--methods-list', is_flag=True, default=False, help='Dump simple list of methods')
 @click.option('--prop-decorator', is_flag=True, default=False, help='Treat property decorated methods as attributes, not methods')
+@click.option('--jobs', '-j', default=1, help='Number of worker processes to parse with, 0 means one per cpu core')
+@click.option('--cache', is_flag=True, default=False, help='Skip re-parsing files unchanged since the last run, using an on disk cache')
+@click.option('--cache-dir', default=None, help='Directory for the parse cache, implies --cache')
+@click.option('--symbol-index', default=None,
+              help='Index file of the classes in the project, updated each run, so composition with classes in other modules is recognised')
+@click.option('--size-budget', default=None, type=int,
+              help='Files bigger than this many characters are only scanned for top level classes and functions, 0 for no limit')
+@click.option('--time-budget', default=None, type=float,
+              help='Stop parsing a file after this many seconds, reporting an incomplete model, 0 for no limit')
+@click.option('--include', multiple=True,
+              help='Glob of the .zip, .whl and .tar.gz archive members, or --git-diff files, to parse, repeatable, default *.py')
+@click.option('--exclude', multiple=True, help='Glob of archive members, or --git-diff files, not to parse, repeatable e.g. */tests/*')
+@click.option('--follow-imports', is_flag=True, default=False,
+              help='Treat FILES as entry modules, parse them and the modules they transitively import, found under the source roots')
+@click.option('--source-root', multiple=True,
+              help='Directory imports are resolved against with --follow-imports, repeatable, default the top level package dir of each entry module')
+@click.option('--max-depth', default=None, type=int, help='With --follow-imports, only parse modules up to this many imports away')
+@click.option('--git-diff', default=None, metavar='OLD[..NEW]',
+              help='Only re-parse the .py files changed between two git revisions, or between OLD and the working tree, applying them onto --model')
+@click.option('--repo', default='.', help='Directory in the git repository for --git-diff, default the current directory')
+@click.option('--model', 'model_file', default=None, help='Saved --format ndjson model which --git-diff updates in place')
+@click.option('--format', 'output_format', type=click.Choice(['table', 'ndjson']), default='table',
+              help='table for people, or ndjson: one compact json record per file, output as each file completes')
+@click.option('--watch', default=None, help='Keep watching directory DIR, re-parsing changed .py files as they change')
 @click.option('--version', is_flag=True, default=False, help='Display version number')
-def reverse_engineer(files, mode, graph, methods_list, prop_decorator, version):
+def reverse_engineer(files, mode, graph, methods_list, prop_decorator, jobs, cache, cache_dir, symbol_index, size_budget, time_budget, include, exclude, follow_imports, source_root, max_depth, git_diff, repo, model_file, output_format, watch, version):
     """Pynsource CLI - Reverse engineer python source code into UML
 
     This command line tool doesn't actualy generate diagrams, but it does parse Python code into the 
@@ -29,12 +65,72 @@ def reverse_engineer(files, mode, graph, methods_list, prop_decorator, version):
 
         python3 ./src/pynsource-cli.py --methods-list src/common/*.py
 
+        python3 ./src/pynsource-cli.py --jobs 0 src/parsing/*.py
+
+        python3 ./src/pynsource-cli.py --cache --methods-list src/parsing/*.py
+
+        python3 ./src/pynsource-cli.py --watch src/parsing --graph
+
+        python3 ./src/pynsource-cli.py --symbol-index project.index src/*/*.py
+
+        python3 ./src/pynsource-cli.py --format ndjson --jobs 0 src/*/*.py > model.ndjson
+
+        python3 ./src/pynsource-cli.py --jobs 0 --exclude '*/tests/*' dist/foo-1.0.whl dist/foo-1.0.tar.gz
+
+        python3 ./src/pynsource-cli.py --jobs 0 --follow-imports --max-depth 2 --methods-list src/pynsource-cli.py
+
+        python3 ./src/pynsource-cli.py --jobs 0 --git-diff HEAD~1..HEAD --model model.ndjson --methods-list
+
     """
 
-    if version:
-        click.echo(f"Pynsource CLI version {APP_VERSION_FULL}")
+    ndjson = output_format == "ndjson"
+    if ndjson and (graph or methods_list or watch):
+        raise click.UsageError("--format ndjson cannot be combined with --graph, --methods-list or --watch")
 
-    click.echo(f"Files to parse: {files}")
+    if version:
+        click.echo(f"Pynsource CLI version {APP_VERSION_FULL}", err=ndjson)
+
+    options = {"mode": mode, "TREAT_PROPERTY_DECORATOR_AS_PROP": prop_decorator}
+    if symbol_index:
+        options["symbol_index"] = SymbolIndex.load(symbol_index)
+    if size_budget is not None:
+        options["PARSE_SIZE_BUDGET"] = size_budget or None
+    if time_budget is not None:
+        options["PARSE_TIME_BUDGET"] = time_budget or None
+
+    if git_diff:
+        if files or watch or follow_imports:
+            raise click.UsageError("--git-diff takes no FILES and cannot be combined with --watch or --follow-imports")
+        if not model_file or not os.path.isfile(model_file):
+            raise click.UsageError("--git-diff needs the --model file to update, e.g. one saved via --format ndjson")
+        old_rev, _, new_rev = git_diff.partition("..")
+        changes = GitChanges(repo, old_rev or "HEAD", new_rev or None, include or ("*.py",), exclude)
+        displaymodel = DisplayModel(canvas=None) if graph else None
+        parse_cache = ParseCache(cache_dir) if cache or cache_dir else None
+        model = read_model(model_file)
+        try:
+            for f, pmodel, debuginfo, elapsed in changes.apply(model, changes.iter_parse(options, jobs, parse_cache)):
+                report_result(f, pmodel, elapsed, ndjson, methods_list, displaymodel)
+        except GitError as e:
+            raise click.ClickException(str(e))
+        write_model(model_file, model)
+        click.echo(f"Removed {changes.removed}", err=ndjson)
+        click.echo(f"Model {model_file} updated, now has {len(model)} files", err=ndjson)
+        if graph:
+            displaymodel.Dump(msg="Display model Graph of the changed files:")
+        if symbol_index:
+            for filename in changes.removed:
+                options["symbol_index"].remove(filename)
+            options["symbol_index"].save(symbol_index)
+        return
+
+    if watch:
+        watch_directory(watch, options, graph)
+        if symbol_index:
+            options["symbol_index"].save(symbol_index)
+        return
+
+    click.echo(f"Files to parse: {files}", err=ndjson)
     # click.echo(graph)
 
     # Expansion of files seems to happen magically via bash - need to check with windows
@@ -43,30 +139,94 @@ def reverse_engineer(files, mode, graph, methods_list, prop_decorator, version):
     for param in files:
         files = glob.glob(param)
         globbed += files
-    click.echo(globbed)
+    click.echo(globbed, err=ndjson)
+
+    displaymodel = DisplayModel(canvas=None) if graph else None
+
+    parse_cache = ParseCache(cache_dir) if cache or cache_dir else None
+
+    archives = [f for f in globbed if is_archive(f)]
+    sources = [f for f in globbed if not is_archive(f)]
+    if follow_imports:
+        reachable = Reachable(sources, source_root or None, max_depth)
+        parse_sources = reachable.iter_parse(options, jobs, parse_cache)
+    else:
+        parse_sources = iter_parse_files(sources, options=options, jobs=jobs, cache=parse_cache, ordered=not ndjson)
+    results = chain(
+        parse_sources,
+        *(
+            read_archive(archive, options, jobs, parse_cache, not ndjson, include, exclude)
+            for archive in archives
+        ),
+    )
+    for f, pmodel, debuginfo, elapsed in results:
+        report_result(f, pmodel, elapsed, ndjson, methods_list, displaymodel)
 
     if graph:
-        displaymodel = DisplayModel(canvas=None)
-
-    for f in globbed:
-        pmodel, debuginfo = new_parser(f, options={"mode": mode,
-                                                   "TREAT_PROPERTY_DECORATOR_AS_PROP": prop_decorator})
-        if pmodel.errors:
-            print(pmodel.errors)
-
-        if methods_list: # Dump simple list of methods
-            click.echo(dump_pmodel_methods(pmodel))
-
-        else:  # Dump table of underlying pmodel
-            assert f == pmodel.filename
-            click.echo(f"Parse model for '{pmodel.filename}':")
-            click.echo(dump_pmodel(pmodel))
+        displaymodel.Dump(msg="Final display model Graph containing all parse models:")
 
-            if graph:  # Dump table of display model
-                displaymodel.build_graphmodel(pmodel)  # will append
+    if symbol_index:
+        options["symbol_index"].save(symbol_index)
+        click.echo(f"Symbol index {symbol_index} has {len(options['symbol_index'].files)} files", err=ndjson)
+
+    if parse_cache:
+        click.echo(f"Parse cache {parse_cache.directory} {parse_cache.stats()}", err=ndjson)
+
+def read_archive(archive, *args):
+    """iter_parse_archive(archive, *args), reporting an archive that can't be read"""
+    try:
+        yield from iter_parse_archive(archive, *args)
+    except (OSError, zipfile.BadZipFile, tarfile.TarError) as e:
+        raise click.ClickException(f"Cannot read archive {archive}: {e}")
+
+def report_result(f, pmodel, elapsed, ndjson, methods_list, displaymodel):
+    if ndjson:  # errors are part of the record
+        click.echo(dump_pmodel_ndjson(pmodel, elapsed))
+        return
+
+    if pmodel.errors:
+        print(pmodel.errors)
+
+    if methods_list: # Dump simple list of methods
+        click.echo(dump_pmodel_methods(pmodel))
+
+    else:  # Dump table of underlying pmodel
+        assert f == pmodel.filename
+        click.echo(f"Parse model for '{pmodel.filename}':")
+        click.echo(dump_pmodel(pmodel))
+
+        if displaymodel:  # Dump table of display model
+            displaymodel.build_graphmodel(pmodel)  # will append
+
+def watch_directory(directory, options, graph):
+    """Keep a display model in sync with 'directory' until interrupted with Ctrl-C"""
+    displaymodel = DisplayModel(canvas=None)
+    sync = WatchSync(displaymodel, directory, options)
+
+    def report(changes, filenames):
+        for filename in filenames:
+            if filename in sync.errors:
+                click.echo(sync.errors[filename])
+        click.echo(
+            f"nodes +{len(changes.added_nodes)} -{len(changes.removed_nodes)} ~{len(changes.changed_nodes)}, "
+            f"edges +{len(changes.added_edges)} -{len(changes.removed_edges)}, "
+            f"graph now has {len(displaymodel.graph.nodes)} nodes {len(displaymodel.graph.edges)} edges"
+        )
+        if graph:
+            displaymodel.Dump(msg="Display model Graph:")
+
+    click.echo(f"Watching {len(sync.watcher.files)} files in '{directory}', Ctrl-C to stop")
+    report(sync.import_all(), sync.watcher.files)
+    try:
+        while True:
+            time.sleep(sync.watcher.interval)
+            batch, changes = sync.poll()
+            if batch:
+                click.echo(f"{len(batch.changed)} files changed, {len(batch.removed)} removed")
+                report(changes, batch.changed)
+    except KeyboardInterrupt:
+        pass
 
-    if graph:
-        displaymodel.Dump(msg="Final display model Graph containing all parse models:")
 
 """
 Notes
@@ -387,7 +387,11 @@ class MainApp(WxAsyncApp):  #, wx.lib.mixins.inspection.InspectionMixin):
         log.info(f"Pynsource version {APP_VERSION_FULL} running, ASYNC={ASYNC}, PRO={PRO_EDITION}")
         log.info(f'wxPython version {wx.version()}')  # wx.VersionInfo().GetVersionString() doesn't work
 
-        if self.args:
+        if self.args[:1] == ["--watch"] and len(self.args) == 2:
+            wx.CallAfter(self.app.run.CmdFileWatch, self.args[1], 3)
+        elif self.args[:1] == ["--follow-imports"] and len(self.args) >= 2:
+            wx.CallAfter(self.app.run.CmdFileImportReachable, self.args[1:], 3)
+        elif self.args:
             wx.CallAfter(self.app.run.CmdFileImportViaArgs, self.args, 3)  # default to Python 3 reverse engineering
 
         # wx.lib.inspection.InspectionTool().Show()
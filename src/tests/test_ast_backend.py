@@ -0,0 +1,70 @@
+# Ast backend tests - native ast for python 3, typed_ast only loaded for python 2 mode
+#
+# Run with
+# python -m unittest tests.test_ast_backend
+#
+# from the src directory
+
+import ast as ast_native
+import importlib.util
+import os
+import subprocess
+import sys
+import unittest
+from textwrap import dedent
+from unittest import mock
+from parsing.api import parse_text
+from parsing.ast_py2 import Python2SupportMissing
+from parsing.core_parser_ast import ast_backend
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WALRUS = dedent(
+    """
+    class Fred:
+        def __init__(self):
+            if (n := len(self.items)) > 1:
+                self.x = Mary()
+    """
+)
+
+
+class TestAstBackend(unittest.TestCase):
+    def test_python3_is_native(self):
+        self.assertIs(ast_backend(3), ast_native)
+        self.assertIs(ast_backend(0), ast_native)
+
+    def test_typed_ast_not_imported_at_startup(self):
+        code = "import sys, parsing.core_parser_ast; print('typed_ast' in sys.modules)"
+        output = subprocess.run(
+            [sys.executable, "-c", code], cwd=SRC_DIR, capture_output=True, text=True, check=True
+        ).stdout
+        self.assertEqual(output.splitlines()[-1], "False")
+
+    def test_feature_version(self):
+        pmodel, _ = parse_text(WALRUS, options={"mode": 3})
+        self.assertEqual([a.attrname for a in pmodel.classlist["Fred"].attrs], ["x"])
+
+        pmodel, _ = parse_text(WALRUS, options={"mode": 3, "feature_version": (3, 8)})
+        self.assertIn("Fred", pmodel.classlist)
+
+        pmodel, _ = parse_text(WALRUS, options={"mode": 3, "feature_version": (3, 7)})
+        self.assertIn("Syntax error", pmodel.errors)
+        self.assertEqual(pmodel.classlist, {})
+
+    @unittest.skipUnless(importlib.util.find_spec("typed_ast"), "typed_ast not installed")
+    def test_python2(self):
+        pmodel, _ = parse_text("class Fred:\n    def f(self):\n        print 'hi'\n", options={"mode": 2})
+        self.assertEqual(pmodel.classlist["Fred"].defs, ["f"])
+        self.assertEqual(ast_backend(2).__name__, "typed_ast.ast27")
+
+    def test_python2_without_typed_ast(self):
+        with mock.patch.dict(sys.modules, {"typed_ast": None, "typed_ast.ast27": None}):
+            with self.assertRaises(Python2SupportMissing):
+                ast_backend(2)
+            pmodel, _ = parse_text("class Fred:\n    pass\n", filename="fred.py", options={"mode": 2})
+        self.assertIn("typed_ast", pmodel.errors)
+        self.assertEqual(pmodel.filename, "fred.py")
+
+        pmodel, _ = parse_text("class Fred:\n    pass\n", options={"mode": 3})  # python 3 unaffected
+        self.assertIn("Fred", pmodel.classlist)
@@ -0,0 +1,69 @@
+# Parse phase benchmark harness tests
+#
+# Run with
+# python -m unittest tests.test_bench_parse_phases
+#
+# from the src directory
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+from benchmarks.parse_phases import PHASES, compare, main, run, synthetic_modules
+from tests.settings import PYTHON_CODE_EXAMPLES_TO_PARSE
+
+
+class TestParsePhases(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_run(self):
+        files = [PYTHON_CODE_EXAMPLES_TO_PARSE + "testmodule01.py", PYTHON_CODE_EXAMPLES_TO_PARSE + "p2.py"]
+        results = run(files, mode=3, repeat=1)
+        self.assertEqual(list(results["phases"]), PHASES)
+        self.assertEqual(results["corpus"]["files"], 2)
+        self.assertEqual(results["corpus"]["syntax_errors"], 1)  # p2.py is python 2
+        self.assertGreater(results["phases"]["visit"], results["phases"]["rhs_analyser"])
+        self.assertGreater(results["peak_memory_bytes"], 0)
+        json.dumps(results)
+
+    def test_synthetic_modules_are_valid_python(self):
+        for filename in synthetic_modules(self.dir):
+            with open(filename) as f:
+                compile(f.read(), filename, "exec")
+
+    def test_compare(self):
+        phases = {phase: 1.0 for phase in PHASES}
+        baseline = {"phases": phases, "files_per_sec": 100.0, "peak_memory_bytes": 1000}
+        results = {
+            "phases": dict(phases, visit=1.2, quick_parse_ast=1.001),
+            "files_per_sec": 80.0,
+            "peak_memory_bytes": 1050,
+        }
+        rows = compare(results, baseline, tolerance=0.10, noise_floor=0.005)
+        self.assertEqual([metric for metric, *_, regressed in rows if regressed], ["visit", "files_per_sec"])
+
+        # a big fractional slow down of a phase that hardly takes any time is noise
+        results["phases"]["read"] = 0.003
+        baseline["phases"]["read"] = 0.001
+        self.assertNotIn("read", [metric for metric, *_, regressed in compare(results, baseline) if regressed])
+
+    def test_baseline_exit_status(self):
+        output = os.path.join(self.dir, "results.json")
+        args = [PYTHON_CODE_EXAMPLES_TO_PARSE + "testmodule01.py", "--repeat", "1"]
+        with redirect_stdout(StringIO()):
+            self.assertEqual(main(args + ["--output", output]), 0)
+        with open(output) as f:
+            baseline = json.load(f)
+        baseline["files_per_sec"] *= 100
+        with open(output, "w") as f:
+            json.dump(baseline, f)
+        with redirect_stdout(StringIO()) as out:
+            self.assertEqual(main(args + ["--baseline", output]), 1)
+        self.assertIn("REGRESSION", out.getvalue())
@@ -0,0 +1,82 @@
+# Parse model ClassEntry tests
+#
+# Run with
+# python -m unittest tests.test_class_entry
+#
+# from the src directory
+
+import pickle
+import unittest
+from parsing.class_entry import ClassEntry, Attribute, DependencyList
+
+
+class TestClassEntry(unittest.TestCase):
+    def test_attributes_indexed(self):
+        c = ClassEntry("Fred")
+        c.AddAttribute("a", ["normal"])
+        c.AddAttribute("b", ["normal"])
+        c.AddAttribute("a", ["normal", "many"])
+        self.assertEqual([(a.attrname, a.attrtype) for a in c.attrs], [("a", ["normal", "many"]), ("b", ["normal"])])
+        self.assertEqual(c.FindAttribute("b"), (1, c.attrs[1]))
+        self.assertEqual(c.FindAttribute("x"), (0, None))
+
+        # attrs can still be assigned and appended to directly
+        c.attrs = [Attribute("x", ["static"])]
+        self.assertEqual(c.FindAttribute("a"), (0, None))
+        c.attrs.append(Attribute("y", ["normal"]))
+        self.assertEqual(c.FindAttribute("y")[1].attrtype, ["normal"])
+
+    def test_dependencies_are_an_ordered_list(self):
+        c = ClassEntry("Fred")
+        c.classdependencytuples = [("b", "Blah")]
+        self.assertIsInstance(c.classdependencytuples, DependencyList)
+        self.assertTrue(c.classdependencytuples.add(("a", "Mary")))
+        self.assertFalse(c.classdependencytuples.add(("b", "Blah")))
+        c.classdependencytuples.extend([("z", "Zed")])
+        self.assertIn(("z", "Zed"), c.classdependencytuples)
+        self.assertEqual(c.classdependencytuples, [("b", "Blah"), ("a", "Mary"), ("z", "Zed")])
+
+    def test_index_follows_every_change(self):
+        c = ClassEntry("Fred")
+        c.AddAttribute("a", ["normal"])
+        c.AddAttribute("b", ["normal"])
+        c.attrs[0] = Attribute("x", ["normal"])  # same length
+        self.assertEqual(c.FindAttribute("a"), (0, None))
+        self.assertEqual(c.FindAttribute("x"), (1, c.attrs[0]))
+        c.attrs.remove(c.attrs[1])
+        c.attrs.append(Attribute("y", ["normal"]))
+        self.assertEqual(c.FindAttribute("b"), (0, None))
+        c.attrs = [Attribute("p", ["normal"]), Attribute("q", ["normal"])]
+        self.assertEqual(c.FindAttribute("x"), (0, None))
+        c.attrs.insert(0, Attribute("q", ["static"]))
+        self.assertEqual(c.FindAttribute("q")[1].attrtype, ["static"])  # first one wins
+
+        deps = DependencyList([("a", "A"), ("a", "A"), ("b", "B")])  # duplicates
+        deps[2] = ("c", "C")
+        self.assertNotIn(("b", "B"), deps)
+        self.assertIn(("c", "C"), deps)
+        deps.remove(("a", "A"))
+        self.assertIn(("a", "A"), deps)  # the other one
+        deps.pop(0)
+        deps.append(("d", "D"))
+        self.assertNotIn(("a", "A"), deps)
+        deps += [("e", "E")]
+        del deps[0]
+        self.assertEqual(deps, [("d", "D"), ("e", "E")])
+        self.assertEqual([t in deps for t in [("c", "C"), ("d", "D"), ("e", "E")]], [False, True, True])
+
+    def test_compact_and_picklable(self):
+        c = ClassEntry("Fred")
+        c.defs = ["go"]
+        c.AddAttribute("a", ["normal"])
+        c.classdependencytuples.append(("a", "Blah"))
+        self.assertFalse(hasattr(c, "__dict__"))
+        self.assertFalse(hasattr(c.attrs[0], "__dict__"))
+
+        c2 = pickle.loads(pickle.dumps(c, protocol=pickle.HIGHEST_PROTOCOL))
+        self.assertIs(c2.name, c.name)  # interned
+        self.assertIs(c2.attrs[0].attrname, c.attrs[0].attrname)
+        self.assertEqual(c2.defs, ["go"])
+        self.assertEqual(c2.classdependencytuples, [("a", "Blah")])
+        self.assertIn(("a", "Blah"), c2.classdependencytuples)
+        self.assertEqual(c2.FindAttribute("a")[1].attrtype, ["normal"])
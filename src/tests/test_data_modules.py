@@ -0,0 +1,109 @@
+# Data only module fast path and parse budget tests
+#
+# Run with
+# python -m unittest tests.test_data_modules
+#
+# from the src directory
+
+import os
+import shutil
+import tempfile
+import unittest
+from textwrap import dedent
+from parsing.api import new_parser, parse_text
+from parsing.core_parser_ast import exceeded_time_budget
+from parsing.data_modules import DATA, OVERSIZED, classify_source, literal_fraction, top_level_source
+from parsing.dump_pmodel import dump_old_structure
+from parsing.parse_cache import ParseCache
+
+CODE = dedent(
+    """
+    from wx.lib.embeddedimage import PyEmbeddedImage
+
+    class Image(Base, metaclass=Meta):
+        def __init__(self, data):
+            self.data = data
+            self.thing = Thing()
+
+    def get_image(name):
+        return Image(globals()[name])
+
+    """
+)
+
+
+def data_module(num_images=200):
+    lines = [CODE]
+    for i in range(num_images):
+        lines.append(f"image{i} = PyEmbeddedImage(")
+        lines += [f"    b'{'iVBORw0KGgoAAAANSUhEUgAAABAAAAAQCAAAAAA6mKC9AAAABGdBTUEAALGPC' * 2}'"] * 5
+        lines.append(")")
+    return "\n".join(lines) + "\n"
+
+
+class TestDataModules(unittest.TestCase):
+    def test_classify(self):
+        self.assertIsNone(classify_source(CODE))
+        self.assertIsNone(classify_source(CODE * 1000))  # big, but code
+        self.assertEqual(classify_source(data_module()), DATA)
+        self.assertIsNone(classify_source(data_module(), data_modules=False))
+        self.assertEqual(classify_source(CODE * 10, size_budget=len(CODE)), OVERSIZED)
+        self.assertGreater(literal_fraction(data_module()), 0.9)
+        self.assertLess(literal_fraction(CODE), 0.1)
+        self.assertEqual(literal_fraction(""), 0.0)
+
+    def test_data_module_fast_path(self):
+        pmodel, _ = parse_text(data_module(), options={"mode": 3})
+        expected, _ = parse_text(data_module(), options={"mode": 3, "DATA_MODULE_FAST_PATH": False})
+        self.assertEqual(dump_old_structure(pmodel), dump_old_structure(expected))
+        self.assertEqual(pmodel.modulemethods, ["get_image"])
+        self.assertEqual(pmodel.errors, "")
+
+    def test_top_level_source(self):
+        source = "import os\nX = [\n    1,\n]\n\n@deco\nclass A:\n    y = 2\nZ = 3\n"
+        self.assertEqual(top_level_source(source), "import os\n\n\n\n\n@deco\nclass A:\n    y = 2\n\n")
+
+        # Not fooled by 'class' in a multi-line string
+        source = 'DOC = """\nclass Fake:\n    pass\n"""\nclass Real:\n    pass\n'
+        self.assertIsNone(top_level_source(source))
+        pmodel, _ = parse_text(source + data_module(), options={"mode": 3})
+        self.assertEqual(sorted(pmodel.classlist), ["Image", "Real"])
+
+    def test_oversized(self):
+        source = CODE + "class Other(mod.Base ,Mixin):\n    pass\n"
+        pmodel, _ = parse_text(source, filename="big.py", options={"mode": 3, "PARSE_SIZE_BUDGET": 100})
+        self.assertIn("over the parse size budget of 100", pmodel.errors)
+        self.assertEqual(sorted(pmodel.classlist), ["Image", "Other"])
+        self.assertEqual(pmodel.classlist["Image"].classesinheritsfrom, ["Base"])
+        self.assertEqual(pmodel.classlist["Other"].classesinheritsfrom, ["mod.Base", "Mixin"])
+        self.assertEqual(pmodel.classlist["Other"].defs, [])
+        self.assertEqual(pmodel.modulemethods, ["get_image"])
+
+        # Same classes and bases as a full parse, which also finds methods and attributes
+        full, _ = parse_text(source, options={"mode": 3})
+        for name, c in full.classlist.items():
+            self.assertEqual(c.classesinheritsfrom, pmodel.classlist[name].classesinheritsfrom)
+
+    def test_time_budget(self):
+        options = {"mode": 3, "PARSE_TIME_BUDGET": 1e-9}
+        pmodel, _ = parse_text(CODE, filename="slow.py", options=options)
+        self.assertIn("slow.py exceeded the parse time budget", pmodel.errors)
+        self.assertTrue(exceeded_time_budget(pmodel))
+
+        pmodel, _ = parse_text(CODE, options={"mode": 3, "PARSE_TIME_BUDGET": None})
+        self.assertFalse(exceeded_time_budget(pmodel))
+        self.assertIn("thing", [a.attrname for a in pmodel.classlist["Image"].attrs])
+
+    def test_time_budget_overrun_not_cached(self):
+        directory = tempfile.mkdtemp()
+        try:
+            cache = ParseCache(os.path.join(directory, "cache"))
+            filename = os.path.join(directory, "slow.py")
+            with open(filename, "w") as f:
+                f.write(CODE)
+            options = {"mode": 3, "PARSE_TIME_BUDGET": 1e-9}
+            new_parser(filename, options=options, cache=cache)
+            new_parser(filename, options=options, cache=cache)
+            self.assertEqual(cache.stats()["hits"], 0)
+        finally:
+            shutil.rmtree(directory)
@@ -212,6 +212,189 @@ class TestCaseDisplayModel(unittest.TestCase):
         self.assertIsNotNone(dmodel.graph.FindEdge(fred, big, "generalisation"))
         self.assertIsNotNone(dmodel.graph.FindEdge(a, fred, "composition"))
 
+    def test_update_graphmodel(self):
+        """
+        Re-building a file's pmodel only applies the differences, keeping existing nodes
+        and whatever other files contributed.
+        """
+
+        def pmodel_for(filename, source_code):
+            pmodel, debuginfo = parse_source(dedent(source_code), options={"mode": 3}, filename=filename)
+            return pmodel
+
+        dmodel = DisplayModel()
+        dmodel.build_graphmodel(pmodel_for("a.py", """
+            class Fred(Mary):
+                def __init__(self):
+                    self.a = A()
+            """))
+        dmodel.build_graphmodel(pmodel_for("b.py", """
+            class Fred:
+                def other(self):
+                    pass
+            class Mary:
+                pass
+            """))
+        fred = dmodel.graph.FindNodeById("Fred")
+        self.assertEqual(fred.meths, ["__init__", "other"])
+        self.assertEqual(len(dmodel.graph.edges), 2)
+
+        # a.py drops the A dependency and the Mary parent, and adds an attribute
+        changes = dmodel.update_graphmodel(pmodel_for("a.py", """
+            class Fred:
+                def __init__(self):
+                    self.b = 1
+            """))
+        self.assertIs(dmodel.graph.FindNodeById("Fred"), fred)
+        self.assertEqual(fred.attrs, ["b"])
+        self.assertEqual(fred.meths, ["__init__", "other"])
+        self.assertEqual(changes.changed_nodes, [fred])
+        self.assertEqual([n.id for n in changes.removed_nodes], ["A"])  # Mary still defined by b.py
+        self.assertEqual(len(changes.removed_edges), 2)
+        self.assertEqual(dmodel.graph.edges, [])
+
+        changes = dmodel.remove_graphmodel("b.py")
+        self.assertEqual([n.id for n in changes.removed_nodes], ["Mary"])
+        self.assertEqual(fred.meths, ["__init__"])
+        self.assertEqual(len(dmodel.pmodels_i_have_seen), 1)
+
+    def test_build_graphmodel_bulk(self):
+        """
+        Building many pmodels in one go gives the same graph as building them one by one.
+        """
+        sources = {
+            "a.py": """
+                class Fred(Mary, Sam):
+                    def __init__(self):
+                        self.a = A()
+                        self.b = Mary()
+                """,
+            "b.py": """
+                class Mary(Base):
+                    def m(self):
+                        self.x = 1
+                class A:
+                    def __init__(self):
+                        self.fred = Fred()
+                """,
+            "c.py": """
+                class Fred(Mary):
+                    def other(self):
+                        self.x = 2
+                class Sam(Base):
+                    pass
+                """,
+        }
+        pmodels = [
+            parse_source(dedent(source), options={"mode": 3}, filename=filename)[0] for filename, source in sources.items()
+        ]
+
+        def graph_of(dmodel):
+            nodes = [(node.id, node.attrs, node.meths) for node in dmodel.graph.nodes]
+            edges = sorted((e["source"].id, e["target"].id, e["uml_edge_type"]) for e in dmodel.graph.edges)
+            return nodes, edges
+
+        for existing in ([], pmodels[2:]):  # into an empty graph, and one with nodes and edges already
+            with self.subTest(existing=len(existing)):
+                one_by_one = DisplayModel()
+                bulk = DisplayModel()
+                for pmodel in existing:
+                    one_by_one.build_graphmodel(pmodel)
+                    bulk.build_graphmodel(pmodel)
+                for pmodel in pmodels:
+                    one_by_one.build_graphmodel(pmodel)
+                bulk.build_graphmodel_bulk(pmodels)
+
+                nodes, edges = graph_of(bulk)
+                expected_nodes, expected_edges = graph_of(one_by_one)
+                self.assertEqual(sorted(nodes), sorted(expected_nodes))
+                self.assertEqual(edges, expected_edges)
+                self.assertEqual(bulk.contributions, one_by_one.contributions)
+                self.assertEqual(bulk.pmodels_i_have_seen, one_by_one.pmodels_i_have_seen)
+                self.assertEqual(len(bulk.graph.edges), len(edges))
+
+        # nodes in the order one by one creates them, edges in the order found
+        bulk = DisplayModel()
+        bulk.build_graphmodel_bulk(pmodels)
+        self.assertEqual([node.id for node in bulk.graph.nodes], ["Fred", "Mary", "Sam", "A", "Base"])
+        self.assertEqual(
+            [(e["source"].id, e["target"].id) for e in bulk.graph.edges],
+            [("Fred", "Mary"), ("Fred", "Sam"), ("A", "Fred"), ("Mary", "Fred"), ("Mary", "Base"), ("Fred", "A"), ("Sam", "Base")],
+        )
+        fred = bulk.graph.FindNodeById("Fred")
+        self.assertEqual(fred.meths, ["__init__", "other"])
+        self.assertEqual(fred.attrs, ["a", "b", "x"])
+
+    def test_incremental_build_view(self):
+        """
+        build_view() only touches the shapes of what changed since the last build_view().
+        """
+
+        def pmodel_for(filename, source_code):
+            pmodel, debuginfo = parse_source(dedent(source_code), options={"mode": 3}, filename=filename)
+            return pmodel
+
+        def create_shape(node, update_existing_shape=None):
+            node.shape = update_existing_shape or mock.MagicMock(_xpos=0, _ypos=0)
+
+        def create_edge_shape(edge):
+            edge["shape"] = mock.MagicMock()
+
+        umlcanvas = mock.MagicMock()
+        umlcanvas.CreateUmlShape.side_effect = create_shape
+        umlcanvas.CreateUmlEdgeShape.side_effect = create_edge_shape
+        dmodel = DisplayModel(umlcanvas)
+
+        def shapes_built():
+            built = [
+                (node.id, bool(kwargs.get("update_existing_shape")))
+                for (node,), kwargs in umlcanvas.CreateUmlShape.call_args_list
+            ]
+            counts = built, umlcanvas.CreateUmlEdgeShape.call_count, umlcanvas.delete_shape_view.call_count
+            umlcanvas.reset_mock()
+            return counts
+
+        dmodel.build_graphmodel(pmodel_for("a.py", """
+            class Fred(Mary):
+                def __init__(self):
+                    self.a = A()
+            """))
+        dmodel.build_view(translatecoords=False)
+        self.assertEqual(shapes_built(), ([("Fred", False), ("Mary", False), ("A", False)], 2, 0))
+
+        # Mary gains a method, Sam is new, Fred and A are left alone
+        dmodel.build_graphmodel(pmodel_for("b.py", """
+            class Mary:
+                def m(self):
+                    pass
+            class Sam:
+                pass
+            """))
+        dmodel.build_view(translatecoords=False)
+        self.assertEqual(shapes_built(), ([("Mary", True), ("Sam", False)], 0, 0))
+        dmodel.build_view(translatecoords=False)
+        self.assertEqual(shapes_built(), ([], 0, 0))
+
+        # a.py drops A and Mary, so A's shape and both lines go
+        a_shape = dmodel.graph.FindNodeById("A").shape
+        dmodel.update_graphmodel(pmodel_for("a.py", """
+            class Fred:
+                def __init__(self):
+                    self.a = 1
+            """))
+        dmodel.build_view(translatecoords=False)
+        deleted = [shape for (shape,), kwargs in umlcanvas.delete_shape_view.call_args_list]
+        self.assertEqual(shapes_built(), ([], 0, 3))
+        self.assertIn(a_shape, deleted)
+        self.assertEqual(sorted(node.id for node in dmodel.graph.nodes), ["Fred", "Mary", "Sam"])
+
+        dmodel.node_changed(dmodel.graph.FindNodeById("Sam"))
+        dmodel.build_view(translatecoords=False)
+        self.assertEqual(shapes_built(), ([("Sam", True)], 0, 0))
+
+        dmodel.build_view(translatecoords=False, purge_existing_shapes=True)
+        self.assertEqual(shapes_built(), ([("Fred", False), ("Mary", False), ("Sam", False)], 0, 3))
+
 
 """
 Differences between old parser model used in pynsource and GitUML alsm
@@ -0,0 +1,97 @@
+# File watching and watch mode tests
+#
+# Run with
+# python -m unittest tests.test_file_watcher
+#
+# from the src directory
+
+import os
+import shutil
+import tempfile
+import unittest
+from textwrap import dedent
+from common.file_watcher import FileWatcher
+from parsing.symbol_index import SymbolIndex
+from view.display_model import DisplayModel
+from view.watch_sync import WatchSync
+
+
+class TestFileWatcher(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, source_code):
+        path = os.path.join(self.dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(dedent(source_code))
+        mtime = os.stat(path).st_mtime_ns + 10 ** 9  # don't rely on file system timestamp resolution
+        os.utime(path, ns=(mtime, mtime))
+        return path
+
+    def test_changes_are_debounced_and_batched(self):
+        a = self.write("a.py", "x = 1")
+        watcher = FileWatcher(self.dir, debounce=1.0)
+        self.assertEqual(watcher.files, [a])
+        self.assertIsNone(watcher.poll(now=100.0))
+
+        b = self.write("pkg/b.py", "y = 1")
+        self.write("notes.txt", "ignored")
+        self.assertIsNone(watcher.poll(now=101.0))
+        self.write("a.py", "x = 2")
+        self.assertIsNone(watcher.poll(now=101.5))  # still busy
+        batch = watcher.poll(now=102.6)
+        self.assertEqual(batch.changed, [a, b])
+        self.assertEqual(batch.removed, [])
+        self.assertIsNone(watcher.poll(now=110.0))
+
+        os.remove(a)
+        watcher.poll(now=111.0)
+        self.assertEqual(watcher.poll(now=112.0).removed, [a])
+
+    def test_watch_sync(self):
+        a = self.write("a.py", """
+            class Fred(Mary):
+                pass
+            """)
+        displaymodel = DisplayModel()
+        index = SymbolIndex()
+        sync = WatchSync(displaymodel, self.dir, options={"mode": 3, "symbol_index": index}, watcher=FileWatcher(self.dir, debounce=0))
+        sync.import_all()
+        fred = displaymodel.graph.FindNodeById("Fred")
+        self.assertEqual(len(displaymodel.graph.nodes), 2)
+
+        self.write("a.py", """
+            class Fred(Mary):
+                def hi(self):
+                    pass
+            """)
+        batch, changes = sync.poll()
+        self.assertEqual(batch.changed, [a])
+        self.assertEqual(changes.changed_nodes, [fred])
+        self.assertEqual(fred.meths, ["hi"])
+
+        # a syntax error whilst editing keeps the diagram as it was
+        self.write("a.py", "class Fred(:\n")
+        batch, changes = sync.poll()
+        self.assertFalse(any(changes))
+        self.assertIn("Syntax error", sync.errors[a])
+        self.assertEqual(index.lookup("Fred"), [a])
+
+        self.write("a.py", "FRED = None\n")
+        sync.poll()
+        self.assertIn("had no classes", sync.errors[a])
+        self.assertEqual(index.lookup("Fred"), [])
+        self.assertEqual(displaymodel.graph.nodes, [])
+
+        self.write("a.py", "class Fred(Mary):\n    pass\n")
+        sync.poll()
+        self.assertEqual(index.lookup("Fred"), [a])
+
+        os.remove(a)
+        batch, changes = sync.poll()
+        self.assertEqual(len(changes.removed_nodes), 2)
+        self.assertEqual(displaymodel.graph.nodes, [])
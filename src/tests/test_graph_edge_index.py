@@ -0,0 +1,146 @@
+# Graph edge index tests - the indexed edge lookups agree with scanning every edge
+#
+# Run with
+# python -m unittest tests.test_graph_edge_index
+#
+# from the src directory
+
+import unittest
+from view.graph import Graph, GraphNode
+from view.display_model import UmlGraph
+
+
+class Shape:
+    """Stands in for an ogl line shape, unhashable like some of them"""
+
+    __hash__ = None
+
+
+class TestGraphEdgeIndex(unittest.TestCase):
+    def setUp(self):
+        self.g = Graph()
+        self.a, self.b, self.c = [self.g.AddNode(GraphNode(name, 0, 0, 100, 100)) for name in "ABC"]
+
+    def add(self, source, target, edge_type="association"):
+        edge = self.g.AddEdge(source, target)
+        edge["uml_edge_type"] = edge_type
+        return edge
+
+    def assertConsistent(self, g=None):
+        """Every lookup gives what scanning the whole edge list, as the graph used to, would"""
+        g = g or self.g
+        nodes = set(g.nodes) | {e["source"] for e in g.edges} | {e["target"] for e in g.edges}
+        for node in nodes:
+            expected = [e for e in g.edges if e["source"] is node or e["target"] is node]
+            self.assertEqual(list(map(id, g.find_edges_for(node))), list(map(id, expected)))
+        for source in nodes:
+            for target in nodes:
+                for edge_type in ("association", "composition", "generalisation", ""):
+                    expected = [
+                        e for e in g.edges if e["source"] is source and e["target"] is target and e.get("uml_edge_type", "") == edge_type
+                    ]
+                    found = g.FindEdge(source, target, edge_type)
+                    self.assertIs(found, expected[0] if expected else None)
+        for edge in g.edges:
+            if "shape" in edge:
+                self.assertIs(g.find_edge_for_lineshape(edge["shape"]), edge)
+        indexed = set()
+        for index in (g._edges_by_source, g._edges_by_target, g._edges_by_key, g._edges_by_shape):
+            for edges in index.values():
+                self.assertTrue(edges)
+                indexed.update(edges)
+        self.assertEqual(indexed, set(map(id, g.edges)))
+
+    def test_add_and_find(self):
+        ab = self.add(self.a, self.b)
+        bc = self.add(self.b, self.c, "composition")
+        self.g.AddEdge(self.c, self.a)  # no uml_edge_type
+        self.assertIs(self.g.FindEdge(self.a, self.b, "association"), ab)
+        self.assertIsNone(self.g.FindEdge(self.a, self.b, "composition"))
+        self.assertIsNone(self.g.FindEdge(self.b, self.a, "association"))
+        self.assertEqual(self.g.find_edges_for(self.b), [ab, bc])
+        self.assertConsistent()
+
+    def test_duplicates(self):
+        first = self.add(self.a, self.b)
+        second = self.add(self.a, self.b)
+        self.assertEqual(first, second)
+        self.assertIs(self.g.FindEdge(self.a, self.b, "association"), first)
+        self.g.delete_edge(second)  # by identity, not the first equal one
+        self.assertEqual(len(self.g.edges), 1)
+        self.assertIs(self.g.edges[0], first)
+        self.assertConsistent()
+        with self.assertRaises(ValueError):
+            self.g.delete_edge(second)
+
+    def test_mutating_edges(self):
+        edge = self.add(self.a, self.b)
+        other = self.add(self.b, self.c)
+        shape = Shape()
+        edge["shape"] = shape
+        edge["uml_edge_type"] = "generalisation"
+        self.assertIs(self.g.find_edge_for_lineshape(shape), edge)
+        self.assertConsistent()
+
+        # swapping the direction, as the line edge type command does
+        edge["source"], edge["target"] = edge["target"], edge["source"]
+        self.assertIs(self.g.FindEdge(self.b, self.a, "generalisation"), edge)
+        self.assertConsistent()
+
+        edge.update(target=self.c, weight=2)
+        other.pop("uml_edge_type")
+        del edge["shape"]
+        other.setdefault("uml_edge_type", "composition")
+        self.assertIs(self.g.FindEdge(self.b, self.c, "composition"), other)
+        self.assertConsistent()
+
+    def test_delete_node(self):
+        ab = self.add(self.a, self.b)
+        self.add(self.b, self.c)
+        ca = self.add(self.c, self.a)
+        self.add(self.b, self.b)
+        self.g.DeleteNode(self.b)
+        self.assertEqual(self.g.edges, [ca])
+        self.assertNotIn(self.b, self.g.nodes)
+        self.assertIsNone(self.g.FindEdge(self.a, self.b, "association"))
+        self.assertConsistent()
+        ab["uml_edge_type"] = "composition"  # no longer in the graph, so doesn't touch it
+        self.assertConsistent()
+
+    def test_delete_edge_after_reordering(self):
+        edges = [self.add(self.a, self.b), self.add(self.b, self.c), self.add(self.c, self.a)]
+        self.g.edges.reverse()
+        self.g.delete_edge(edges[1])
+        self.assertEqual(self.g.edges, [edges[2], edges[0]])
+        self.assertIsNone(self.g.FindEdge(self.b, self.c, "association"))
+        self.assertEqual(self.g.find_edges_for(self.a), [edges[0], edges[2]])  # in the order added
+
+    def test_rename_node(self):
+        edge = self.add(self.a, self.b)
+        self.g.RenameNode(self.a, "AA")
+        self.assertIs(self.g.FindEdge(self.g.FindNodeById("AA"), self.b, "association"), edge)
+        self.assertConsistent()
+
+    def test_load_and_clear(self):
+        g = UmlGraph()
+        g.LoadGraphFromStrings(
+            """
+# PynSource Version 1.2
+{'type':'meta', 'info1':'Lorem ipsum dolor sit amet, consectetur adipiscing elit is latin.'}
+{'type':'umlshape', 'id':'A', 'x':0, 'y':0, 'width':60, 'height':120, 'attrs':'', 'meths':''}
+{'type':'umlshape', 'id':'B', 'x':100, 'y':0, 'width':60, 'height':120, 'attrs':'', 'meths':''}
+{'type':'edge', 'id':'A_to_B', 'source':'A', 'target':'B', 'uml_edge_type':'generalisation'}
+{'type':'edge', 'id':'B_to_A', 'source':'B', 'target':'A', 'uml_edge_type':'composition'}
+"""
+        )
+        a, b = g.FindNodeById("A"), g.FindNodeById("B")
+        self.assertEqual(len(g.edges), 2)
+        self.assertIs(g.FindEdge(a, b, "generalisation"), g.edges[0])
+        self.assertIs(g.FindEdge(b, a, "composition"), g.edges[1])
+        self.assertConsistent(g)
+
+        edge = g.edges[0]
+        g.Clear()
+        self.assertIsNone(g.FindEdge(a, b, "generalisation"))
+        edge["uml_edge_type"] = "association"
+        self.assertConsistent(g)
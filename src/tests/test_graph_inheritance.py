@@ -0,0 +1,69 @@
+# Graph inheritance index tests - the cached generalisation hierarchy used for ascii ordering and colouring
+#
+# Run with
+# python -m unittest tests.test_graph_inheritance
+#
+# from the src directory
+
+import unittest
+from view.graph import Graph, GraphNode
+
+
+class TestGraphInheritance(unittest.TestCase):
+    def setUp(self):
+        # A <|-- B, C <|-- D <|-- E     F <|-- G
+        self.g = Graph()
+        self.n = {id: self.g.AddNode(GraphNode(id, 0, 0)) for id in "ABCDEFG"}
+        for child, parent in ["BA", "CA", "DB", "DC", "ED", "GF"]:
+            self.inherit(child, parent)
+
+    def inherit(self, child, parent):
+        edge = self.g.AddEdge(self.n[child], self.n[parent])
+        edge["uml_edge_type"] = "generalisation"
+        return edge
+
+    def test_index(self):
+        index = self.g.inheritance
+        self.assertEqual(index.parents(self.n["D"]), (self.n["B"], self.n["C"]))
+        self.assertEqual(index.children(self.n["A"]), (self.n["B"], self.n["C"]))
+        self.assertEqual(index.children(self.n["E"]), ())
+        self.assertEqual([index.descendant_levels(self.n[id]) for id in "ABDEF"], [3, 2, 1, 0, 1])
+        self.assertEqual(index.parent_visits(self.n["A"]), 5)  # D and its child E are each reached twice
+
+    def test_invalidation(self):
+        index = self.g.inheritance
+        self.g.AddNode(GraphNode("H", 0, 0))
+        self.g.AddEdge(self.n["A"], self.n["G"])["uml_edge_type"] = "composition"
+        self.g.nodes_sorted_by_generalisation
+        self.assertIs(self.g.inheritance, index)  # kept, no generalisation changed
+
+        edge = self.inherit("G", "E")
+        self.assertIsNot(self.g.inheritance, index)
+        self.assertEqual(self.g.inheritance.descendant_levels(self.n["A"]), 4)
+
+        edge["uml_edge_type"] = "composition"
+        self.assertEqual(self.g.inheritance.descendant_levels(self.n["A"]), 3)
+        self.g.DeleteNode(self.n["D"])
+        self.assertEqual(self.g.inheritance.descendant_levels(self.n["A"]), 1)
+
+    def test_sorted_and_coloured(self):
+        self.assertEqual(
+            [(node.id, annotation) for node, annotation in self.g.nodes_sorted_by_generalisation],
+            [("A", "root"), ("B", "fc"), ("C", "tab"), ("D", "root"), ("E", "fc"), ("F", "root"), ("G", "fc")],
+        )
+        self.g.colour_mark_siblings()
+        # G's colour counts D being gone through once per parent, as it always has
+        self.assertEqual([node.colour_index for node in self.g.nodes], [0, 1, 1, 2, 3, 0, 6])
+        self.assertFalse(hasattr(self.n["A"], "children"))
+
+    def test_deep_diamonds(self):
+        # each node inherits from the previous two, exponentially many paths from the last to the first
+        g = Graph()
+        nodes = [g.AddNode(GraphNode(f"N{i}", 0, 0)) for i in range(60)]
+        for i in range(1, 60):
+            for parent in dict.fromkeys([nodes[i - 1], nodes[max(0, i - 2)]]):
+                g.AddEdge(nodes[i], parent)["uml_edge_type"] = "generalisation"
+        self.assertEqual(g.inheritance.descendant_levels(nodes[0]), 59)
+        g.colour_mark_siblings()
+        self.assertNotIn(-1, [node.colour_index for node in nodes])
+        self.assertEqual(g.nodes_sorted_by_generalisation[:2], [(nodes[0], "root"), (nodes[1], "fc")])
@@ -0,0 +1,74 @@
+# Slotted graph nodes, typed edge attributes and struct of arrays node coordinates tests
+#
+# Run with
+# python -m unittest tests.test_node_coordinates
+#
+# from the src directory
+
+import copy
+import pickle
+import random
+import unittest
+from layout.layout_spring import GraphLayoutSpring
+from view.display_model import UmlNode
+from view.graph import Graph, GraphNode, NodeCoordinates
+
+
+class TestNodeCoordinates(unittest.TestCase):
+    def test_slotted_nodes(self):
+        node = GraphNode("A", 10, 20, 30, 40)
+        self.assertFalse(hasattr(node, "__dict__"))
+        self.assertFalse(hasattr(node, "shape"))
+        node.shape = "shape"
+        node.colour_index = 1
+        with self.assertRaises(AttributeError):
+            node.attrs = []  # only UmlNode has those
+        uml = UmlNode("B", 1, 2, attrs=["x"])
+        self.assertFalse(hasattr(uml, "__dict__"))
+        self.assertFalse(hasattr(uml, "comment"))  # how CommentNode is told apart
+        for clone in (copy.deepcopy(uml), pickle.loads(pickle.dumps(uml))):
+            self.assertEqual((clone.id, clone.left, clone.top, clone.attrs, clone.shape), ("B", 1, 2, ["x"], None))
+
+    def test_edge_attributes(self):
+        g = Graph()
+        a, b = GraphNode("A", 0, 0), GraphNode("B", 0, 0)
+        edge = g.AddEdge(a, b)
+        self.assertIs(edge.source, a)
+        self.assertEqual(edge.uml_edge_type, "")
+        self.assertIsNone(edge.shape)
+        edge.uml_edge_type = "composition"
+        self.assertEqual(edge["uml_edge_type"], "composition")
+        self.assertIs(g.FindEdge(a, b, "composition"), edge)  # still indexed
+        edge.source, edge.target = edge.target, edge.source
+        self.assertIs(g.FindEdge(b, a, "composition"), edge)
+
+    def test_write_back(self):
+        nodes = [GraphNode(f"N{i}", i, i * 2) for i in range(3)]
+        coords = NodeCoordinates(nodes, ("left", "top"))
+        self.assertEqual(coords.left, [0, 1, 2])
+        self.assertEqual(coords.top, [0, 2, 4])
+        self.assertEqual(coords.index()[id(nodes[2])], 2)
+        coords.left[1] = 100
+        self.assertEqual(nodes[1].left, 1)  # a copy
+        coords.write_back()
+        self.assertEqual([node.left for node in nodes], [0, 100, 2])
+
+    def test_spring_layout(self):
+        g = Graph()
+        nodes = [g.AddNode(GraphNode(f"N{i}", 0, 0)) for i in range(6)]
+        for i in range(6):
+            g.AddEdge(nodes[i], nodes[(i + 1) % 6])
+        stranger = GraphNode("N0", 0, 0)  # an edge end the graph doesn't hold, as the id is taken
+        g.AddEdge(nodes[3], stranger)
+        self.assertNotIn(stranger, g.nodes)
+
+        layouter = GraphLayoutSpring(g)
+        layouter.iterations = 50
+        random.seed(1)
+        layouter.layout()
+        positions = {(round(n.layoutPosX, 6), round(n.layoutPosY, 6)) for n in nodes}
+        self.assertEqual(len(positions), 6)  # spread out
+        self.assertEqual((stranger.layoutPosX, stranger.layoutPosY), (0, 0))  # never moves
+        self.assertNotEqual(stranger.layoutForceX, 0)  # but felt the pull
+        self.assertEqual([e["weight"] for e in g.edges], [1] * 7)
+        self.assertEqual(g.layoutMinX, min(n.layoutPosX for n in nodes))
@@ -0,0 +1,122 @@
+# Archive parsing tests - python files parsed straight out of .zip, .whl and .tar.gz archives
+#
+# Run with
+# python -m unittest tests.test_parse_archives
+#
+# from the src directory
+
+import io
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+from glob import glob
+from parsing.api import is_archive, iter_parse_archive, new_parser, new_parser_archive, parse_archive
+from parsing.archives import iter_members
+from parsing.dump_pmodel import dump_old_structure
+from parsing.parse_cache import ParseCache
+from tests.settings import PYTHON_CODE_EXAMPLES_TO_PARSE
+
+
+class TestParseArchives(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.options = {"mode": 3}
+        self.files = sorted(glob(PYTHON_CODE_EXAMPLES_TO_PARSE + "*.py"))[:6]
+        self.members = {f"pkg/{os.path.basename(f)}": f for f in self.files}
+        self.members["pkg/tests/test_fred.py"] = self.files[0]
+        self.members["pkg/broken.py"] = None
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def content(self, name):
+        if self.members[name] is None:
+            return b"class Fred(:\n    pass\n"
+        with open(self.members[name], "rb") as f:
+            return f.read()
+
+    def make_zip(self, name):
+        path = os.path.join(self.directory.name, name)
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+            z.writestr("pkg/", b"")
+            for member in self.members:
+                z.writestr(member, self.content(member))
+            z.writestr("pkg/README.txt", b"not python")
+        return path
+
+    def make_tar(self, name):
+        path = os.path.join(self.directory.name, name)
+        with tarfile.open(path, "w:gz") as tar:
+            for member in list(self.members) + ["pkg/README.txt"]:
+                data = self.content(member) if member in self.members else b"not python"
+                info = tarfile.TarInfo(member)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        return path
+
+    def archives(self):
+        return [self.make_zip("foo-1.0.zip"), self.make_zip("foo-1.0-py3-none-any.whl"), self.make_tar("foo-1.0.tar.gz")]
+
+    def assertSameAsFiles(self, archive, results):
+        self.assertEqual([r.filename for r in results], [os.path.join(archive, *m.split("/")) for m in self.members])
+        for r in results:
+            self.assertEqual(r.pmodel.filename, r.filename)
+            member = os.path.relpath(r.filename, archive).replace(os.sep, "/")
+            if self.members[member] is None:
+                self.assertIn("Syntax error", r.pmodel.errors)
+                continue
+            pmodel, _ = new_parser(self.members[member], options=self.options)
+            self.assertEqual(r.pmodel.errors, pmodel.errors.replace(self.members[member], r.filename))
+            self.assertEqual(dump_old_structure(r.pmodel), dump_old_structure(pmodel))
+
+    def test_is_archive(self):
+        for path in ("a.zip", "a.whl", "a.tar.gz", "A.TGZ"):
+            self.assertTrue(is_archive(path))
+        for path in ("a.py", "a.tar", "a.gz"):
+            self.assertFalse(is_archive(path))
+
+    def test_same_as_files(self):
+        for archive in self.archives():
+            for jobs in (1, 2):
+                with self.subTest(archive=archive, jobs=jobs):
+                    self.assertSameAsFiles(archive, parse_archive(archive, self.options, jobs=jobs))
+
+    def test_unordered(self):
+        archive = self.make_tar("foo-1.0.tar.gz")
+        results = parse_archive(archive, self.options, jobs=2)
+        unordered = list(iter_parse_archive(archive, self.options, jobs=2, ordered=False))
+        self.assertEqual(sorted(r.filename for r in unordered), sorted(r.filename for r in results))
+
+    def test_include_exclude(self):
+        for archive in self.archives():
+            with self.subTest(archive=archive):
+                names = [os.path.relpath(f, archive).replace(os.sep, "/") for f, _ in iter_members(archive)]
+                self.assertEqual(names, list(self.members))
+                names = [
+                    os.path.relpath(f, archive).replace(os.sep, "/")
+                    for f, _ in iter_members(archive, include=["*.py", "*.txt"], exclude=["*/tests/*", "*/broken.py"])
+                ]
+                self.assertIn("pkg/README.txt", names)
+                self.assertNotIn("pkg/tests/test_fred.py", names)
+                self.assertNotIn("pkg/broken.py", names)
+                pmodels = new_parser_archive(archive, self.options, include=["pkg/tests/*"])
+                self.assertEqual([p.filename for p, _ in pmodels], [os.path.join(archive, "pkg", "tests", "test_fred.py")])
+
+    def test_cache(self):
+        archive = self.make_zip("foo-1.0.whl")
+        cache = ParseCache(os.path.join(self.directory.name, "cache"))
+        first = parse_archive(archive, self.options, cache=cache)
+        self.assertEqual(cache.hits, 0)
+        second = parse_archive(archive, self.options, jobs=2, cache=cache)
+        self.assertEqual(cache.hits, len(self.members))  # files with syntax errors too
+        self.assertSameAsFiles(archive, second)
+        self.assertEqual([r.pmodel.errors for r in first], [r.pmodel.errors for r in second])
+
+    def test_unreadable_archive(self):
+        path = os.path.join(self.directory.name, "bad.zip")
+        with open(path, "wb") as f:
+            f.write(b"not a zip file")
+        with self.assertRaises(zipfile.BadZipFile):
+            parse_archive(path, self.options)
@@ -0,0 +1,101 @@
+# Parse cache tests
+#
+# Run with
+# python -m unittest tests.test_parse_cache
+#
+# from the src directory
+
+import os
+import pathlib
+import shutil
+import tempfile
+import unittest
+from textwrap import dedent
+from parsing.api import new_parser, parse_files, iter_parse_sources
+from parsing.core_parser_ast import OldParseModel, DEBUGINFO, set_DEBUGINFO
+from parsing.dump_pmodel import dump_old_structure
+from parsing.parse_cache import ParseCache
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = ParseCache(os.path.join(self.dir, "cache"))
+        self.filename = os.path.join(self.dir, "fred.py")
+        self.write_source("Mary")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write_source(self, parent_class):
+        with open(self.filename, "w") as f:
+            f.write(dedent(
+                f"""
+                class Fred({parent_class}):
+                    def __init__(self):
+                        self.a = Blah()
+                """))
+
+    def test_hit_and_miss(self):
+        pmodel1, _ = new_parser(self.filename, options={"mode": 3}, cache=self.cache)
+        self.assertEqual(self.cache.stats(), {"hits": 0, "misses": 1, "evictions": 0})
+
+        pmodel2, _ = new_parser(self.filename, options={"mode": 3}, cache=self.cache)
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 1, "evictions": 0})
+        self.assertEqual(dump_old_structure(pmodel1), dump_old_structure(pmodel2))
+        self.assertEqual(pmodel2.filename, self.filename)
+
+        # Different options must not share the cache entry
+        new_parser(self.filename, options={"mode": 2}, cache=self.cache)
+        self.assertEqual(self.cache.misses, 2)
+
+        # Changed content is a miss
+        self.write_source("Sam")
+        pmodel3, _ = new_parser(self.filename, options={"mode": 3}, cache=self.cache)
+        self.assertEqual(self.cache.misses, 3)
+        self.assertEqual(pmodel3.classlist["Fred"].classesinheritsfrom, ["Sam"])
+
+    def test_persists_between_cache_instances(self):
+        new_parser(self.filename, options={"mode": 3}, cache=self.cache)
+        cache = ParseCache(self.cache.directory)
+        results = parse_files([self.filename, self.filename], options={"mode": 3}, jobs=2, cache=cache)
+        self.assertEqual(cache.hits, 2)
+        self.assertEqual(results[0].pmodel.classlist["Fred"].classesinheritsfrom, ["Mary"])
+
+    def test_bypassed_when_debugging(self):
+        parse_files([self.filename], options={"mode": 3}, cache=self.cache)
+        with open(self.filename, "rb") as f:
+            sources = [(self.filename, f.read())] * 2
+        was = DEBUGINFO()
+        set_DEBUGINFO(True)
+        try:
+            for jobs in (1, 2):
+                parse_files([self.filename] * 2, options={"mode": 3}, jobs=jobs, cache=self.cache)
+                list(iter_parse_sources(sources, options={"mode": 3}, jobs=jobs, cache=self.cache))
+        finally:
+            set_DEBUGINFO(was)
+        self.assertEqual(self.cache.stats(), {"hits": 0, "misses": 1, "evictions": 0})
+
+    def test_unencodable_pmodel_not_cached(self):
+        pmodel = OldParseModel()
+        pmodel.filename = pathlib.PurePath(self.filename)  # not a string
+        key = self.cache.key(self.filename, b"", {})
+        self.cache.put(key, pmodel)
+        self.assertIsNone(self.cache.get(key))
+        self.assertEqual(os.listdir(self.cache.directory), [])
+
+    def test_lru_eviction(self):
+        keys = []
+        pmodel = OldParseModel()
+        pmodel.errors = "x" * 1000
+        for i in range(3):
+            keys.append(self.cache.key(f"file{i}.py", b"", {}))
+            self.cache.put(keys[-1], pmodel)
+            os.utime(self.cache._path(keys[-1]), (i, i))  # deterministic ages
+        self.assertIsNotNone(self.cache.get(keys[0]))  # now the most recently used
+        self.cache.max_bytes = 2500
+        self.cache.evict()
+        self.assertEqual(self.cache.evictions, 1)
+        self.assertIsNone(self.cache.get(keys[1]))  # least recently used went
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
@@ -0,0 +1,35 @@
+# Concurrent (multi threaded) parsing stress test
+#
+# Run with
+# python -m unittest tests.test_parse_concurrent
+#
+# from the src directory
+
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from glob import glob
+from parsing.api import new_parser
+from parsing.dump_pmodel import dump_old_structure
+from tests.settings import PYTHON_CODE_EXAMPLES_TO_PARSE
+
+
+class TestConcurrentParsing(unittest.TestCase):
+    def parse(self, job):
+        filename, mode = job
+        pmodel, debuginfo = new_parser(filename, options={"mode": mode})
+        return dump_old_structure(pmodel), pmodel.errors
+
+    def test_mixed_modes_in_threads(self):
+        """
+        Python 2 and Python 3 mode parses, running at the same time in different threads,
+        must not interfere with each other e.g. by switching a shared ast module.
+        """
+        files = sorted(glob(PYTHON_CODE_EXAMPLES_TO_PARSE + "*.py"))
+        jobs = [(f, mode) for f in files for mode in (2, 3, 0)]
+        expected = {job: self.parse(job) for job in jobs}
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            for _ in range(2):
+                results = list(pool.map(self.parse, jobs * 2))
+                for job, result in zip(jobs * 2, results):
+                    self.assertEqual(result, expected[job], job)
@@ -0,0 +1,127 @@
+# Git aware incremental parsing tests - re-parsing just the files changed between revisions
+#
+# Run with
+# python -m unittest tests.test_parse_git_changes
+#
+# from the src directory
+
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from parsing.api import parse_text
+from parsing.dump_pmodel import dump_pmodel_ndjson
+from parsing.git_changes import GitChanges, GitError, changed_paths, iter_contents, read_model, write_model
+
+
+@unittest.skipUnless(shutil.which("git"), "git not installed")
+class TestParseGitChanges(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.repo = os.path.join(self.directory.name, "repo")
+        os.makedirs(self.repo)
+        self.git("init", "-q")
+        self.git("config", "user.email", "fred@example.com")
+        self.git("config", "user.name", "Fred")
+        self.write("pkg/a.py", "class A:\n    pass\n")
+        self.write("pkg/b.py", "class B:\n    pass\n")
+        self.write("c.py", "class C:\n    pass\n")
+        self.write("notes.txt", "not python\n")
+        self.commit("one")
+        self.options = {"mode": 3}
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def git(self, *args):
+        subprocess.run(["git", "-C", self.repo, *args], check=True, capture_output=True)
+
+    def write(self, path, source):
+        path = os.path.join(self.repo, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(source)
+
+    def commit(self, message):
+        self.git("add", "-A")
+        self.git("commit", "-q", "-m", message)
+
+    def filename(self, path):
+        return os.path.normpath(os.path.join(self.repo, path))
+
+    def saved_model(self):
+        """The model of revision one, as saved by the cli's --format ndjson"""
+        path = os.path.join(self.directory.name, "model.ndjson")
+        with open(path, "w") as f:
+            for name in ("pkg/a.py", "pkg/b.py", "c.py"):
+                with open(os.path.join(self.repo, name)) as source:
+                    pmodel, _ = parse_text(source.read(), self.filename(name), options=self.options)
+                f.write(dump_pmodel_ndjson(pmodel, 0.001) + "\n")
+        return path
+
+    def make_second_commit(self):
+        self.write("pkg/a.py", "class A2:\n    pass\n")
+        self.git("mv", "pkg/b.py", "pkg/bb.py")
+        self.git("rm", "-q", "c.py")
+        self.write("notes.txt", "still not python\n")
+        self.commit("two")
+
+    def test_changed_paths(self):
+        self.make_second_commit()
+        self.assertEqual(sorted(changed_paths(self.repo, "HEAD~1", "HEAD")), ["c.py", "pkg/a.py", "pkg/b.py", "pkg/bb.py"])
+        self.assertEqual(changed_paths(self.repo, "HEAD~1", "HEAD", exclude=["pkg/*"]), ["c.py"])
+        self.assertEqual(sorted(changed_paths(os.path.join(self.repo, "pkg"), "HEAD~1", "HEAD")), ["a.py", "b.py", "bb.py"])
+        self.assertEqual(changed_paths(self.repo, "HEAD"), [])  # working tree unchanged
+        with self.assertRaises(GitError):
+            changed_paths(self.repo, "no-such-revision")
+
+    def test_contents(self):
+        self.make_second_commit()
+        contents = dict(iter_contents(self.repo, "HEAD~1", ["pkg/a.py", "pkg/bb.py"]))
+        self.assertEqual(contents, {"pkg/a.py": b"class A:\n    pass\n", "pkg/bb.py": None})
+        self.write("pkg/a.py", "class A3:\n    pass\n")
+        contents = dict(iter_contents(self.repo, None, ["pkg/a.py", "c.py"]))  # working tree
+        self.assertEqual(contents, {"pkg/a.py": b"class A3:\n    pass\n", "c.py": None})
+
+    def test_update_model(self):
+        model_file = self.saved_model()
+        unchanged = read_model(model_file)[self.filename("c.py")]
+        self.write("c.py", "class C:\n    pass\n\nclass D:\n    pass\n")
+        self.commit("c only")
+        self.make_second_commit()
+
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                model = read_model(model_file)
+                changes = GitChanges(self.repo, "HEAD~2", "HEAD")
+                results = changes.update_model(model, self.options, jobs=jobs)
+                self.assertEqual(sorted(r.filename for r in results), [self.filename("pkg/a.py"), self.filename("pkg/bb.py")])
+                self.assertEqual(sorted(changes.removed), [self.filename("c.py"), self.filename("pkg/b.py")])
+                self.assertEqual(sorted(model), [self.filename("pkg/a.py"), self.filename("pkg/bb.py")])
+                self.assertEqual(list(json.loads(model[self.filename("pkg/a.py")])["classlist"]), ["A2"])
+
+        model = read_model(model_file)
+        GitChanges(self.repo, "HEAD~2", "HEAD~1").update_model(model, self.options)
+        self.assertEqual(list(json.loads(model[self.filename("c.py")])["classlist"]), ["C", "D"])
+        model[self.filename("c.py")] = unchanged
+        GitChanges(self.repo, "HEAD~1", "HEAD", exclude=["c.py"]).update_model(model, self.options)
+        self.assertEqual(model[self.filename("c.py")], unchanged)  # copied over verbatim
+
+        write_model(model_file, model)
+        self.assertEqual(read_model(model_file), model)
+
+    def test_deleted_path_with_space(self):
+        self.write("a b.py", "class AB:\n    pass\n")
+        self.commit("space")
+        self.git("rm", "-q", "a b.py")
+        self.commit("gone")
+        contents = dict(iter_contents(self.repo, "HEAD", ["a b.py", "pkg/a.py"]))
+        self.assertEqual(contents, {"a b.py": None, "pkg/a.py": b"class A:\n    pass\n"})
+
+        model = {self.filename("a b.py"): "{}"}
+        changes = GitChanges(self.repo, "HEAD~1", "HEAD")
+        self.assertEqual(changes.update_model(model, self.options), [])
+        self.assertEqual(changes.removed, [self.filename("a b.py")])
+        self.assertEqual(model, {})
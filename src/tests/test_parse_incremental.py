@@ -0,0 +1,113 @@
+# Incremental re-parse tests
+#
+# Run with
+# python -m unittest tests.test_parse_incremental
+#
+# from the src directory
+
+import unittest
+from glob import glob
+from textwrap import dedent
+from parsing.api import IncrementalParser, parse_text
+from parsing.dump_pmodel import dump_old_structure
+from parsing.symbol_index import SymbolIndex
+from tests.settings import PYTHON_CODE_EXAMPLES_TO_PARSE
+
+SOURCE = dedent(
+    """
+    import os
+
+    class Fred(Mary):
+        def __init__(self):
+            self.a = Blah()
+
+    def helper():
+        pass
+
+    class Blah:
+        def go(self):
+            self.x = 1
+    """
+)
+
+
+class TestIncrementalParse(unittest.TestCase):
+    def assertSameAsFullParse(self, parser, source):
+        pmodel, _ = parser.parse(source)
+        expected, _ = parse_text(source, parser.filename, options=parser.options)
+        self.assertEqual(dump_old_structure(pmodel), dump_old_structure(expected))
+        self.assertEqual(pmodel.errors, expected.errors)
+        self.assertEqual(pmodel.modulemethods, expected.modulemethods)
+        self.assertEqual(list(pmodel.classlist), list(expected.classlist))
+        return pmodel
+
+    def test_only_changed_blocks_revisited(self):
+        parser = IncrementalParser("fred.py", options={"mode": 3})
+        pmodel1 = self.assertSameAsFullParse(parser, SOURCE)
+        self.assertEqual(parser.added_classes, ["Fred", "Blah"])
+        self.assertEqual(parser.blocks_visited, 3)
+
+        # a new attribute in Blah, plus lines shifted by a comment
+        source = "# comment\n" + SOURCE.replace("self.x = 1", "self.x = 1\n        self.y = 2")
+        pmodel2 = self.assertSameAsFullParse(parser, source)
+        self.assertEqual(parser.blocks_reused, 2)
+        self.assertEqual(parser.blocks_visited, 1)
+        self.assertEqual(parser.changed_classes, ["Blah"])
+        self.assertIs(pmodel2.classlist["Fred"], pmodel1.classlist["Fred"])
+
+        # a body edit which does not alter the class reuses its ClassEntry too
+        pmodel3 = self.assertSameAsFullParse(parser, source.replace("self.y = 2", "self.y = 3"))
+        self.assertEqual(parser.blocks_visited, 1)
+        self.assertEqual(parser.changed_classes, [])
+        self.assertIs(pmodel3.classlist["Blah"], pmodel2.classlist["Blah"])
+
+    def test_added_and_removed(self):
+        parser = IncrementalParser("fred.py", options={"mode": 3})
+        parser.parse(SOURCE)
+        self.assertSameAsFullParse(parser, SOURCE.replace("class Blah", "class Sam"))
+        self.assertEqual(parser.added_classes, ["Sam"])
+        self.assertEqual(parser.removed_classes, ["Blah"])
+        # the set of known classes changed, so everything was re-visited, but Fred came out the same
+        self.assertEqual(parser.blocks_visited, 3)
+        self.assertEqual(parser.changed_classes, [])
+
+    def test_symbol_index_change_revisits_dependent_blocks(self):
+        index = SymbolIndex()
+        parser = IncrementalParser("fred.py", options={"mode": 3, "symbol_index": index})
+        source = SOURCE.replace("self.x = 1", "self.x = customer()")
+        self.assertSameAsFullParse(parser, source)
+
+        index.add("other.py", ["Other"])
+        self.assertSameAsFullParse(parser, source)
+        self.assertEqual(parser.blocks_reused, 3)
+
+        index.add("shop.py", ["customer"])  # only Blah looked up 'customer'
+        pmodel = self.assertSameAsFullParse(parser, source)
+        self.assertEqual(parser.blocks_reused, 2)
+        self.assertEqual(parser.changed_classes, ["Blah"])
+        self.assertEqual(pmodel.classlist["Blah"].classdependencytuples, [("x", "customer")])
+        self.assertEqual(pmodel.symbol_lookups, {"customer": True})
+
+    def test_survives_syntax_error(self):
+        parser = IncrementalParser("fred.py", options={"mode": 3})
+        parser.parse(SOURCE)
+        pmodel, _ = parser.parse(SOURCE + "\nclass Broken(:\n")
+        self.assertIn("Syntax error", pmodel.errors)
+        self.assertSameAsFullParse(parser, SOURCE)
+        self.assertEqual(parser.blocks_reused, 3)
+
+    def test_equivalence_deleting_each_block(self):
+        """Remove each top level block in turn from every example, compare to a full parse"""
+        for filename in sorted(glob(PYTHON_CODE_EXAMPLES_TO_PARSE + "*.py")):
+            with open(filename, encoding="utf-8") as f:
+                source = f.read()
+            lines = source.splitlines(keepends=True)
+            parser = IncrementalParser(filename, options={"mode": 3})
+            pmodel, _ = parser.parse(source)
+            if "Syntax error" in pmodel.errors:
+                continue
+            starts = [i for i, line in enumerate(lines) if line.startswith(("class ", "def "))]
+            for start, end in zip(starts, starts[1:] + [len(lines)]):
+                with self.subTest(filename=filename, line=start + 1):
+                    self.assertSameAsFullParse(parser, "".join(lines[:start] + lines[end:]))
+                    self.assertSameAsFullParse(parser, source)
@@ -0,0 +1,62 @@
+# Parallel parsing tests
+#
+# Run with
+# python -m unittest tests.test_parse_parallel
+#
+# from the src directory
+
+import json
+import os
+import tempfile
+import unittest
+from glob import glob
+from textwrap import dedent
+from parsing.api import new_parser, parse_files
+from parsing.dump_pmodel import dump_old_structure, dump_pmodel_ndjson, pmodel_from_dict
+from tests.settings import PYTHON_CODE_EXAMPLES_TO_PARSE
+
+
+class TestParallelParsing(unittest.TestCase):
+    def setUp(self):
+        self.files = sorted(glob(PYTHON_CODE_EXAMPLES_TO_PARSE + "*.py"))
+        self.options = {"mode": 3}
+
+    def test_same_as_serial(self):
+        results = parse_files(self.files, options=self.options, jobs=3)
+        self.assertEqual([r.filename for r in results], self.files)  # stable order
+        for r in results:
+            pmodel, debuginfo = new_parser(r.filename, options=self.options)
+            self.assertEqual(r.pmodel.filename, r.filename)
+            self.assertEqual(r.pmodel.errors, pmodel.errors)
+            self.assertEqual(dump_old_structure(r.pmodel), dump_old_structure(pmodel))
+
+    def test_errors_reported_per_file(self):
+        with tempfile.NamedTemporaryFile(mode="wt", suffix=".py", delete=False) as temp:
+            temp.write(dedent(
+                """
+                class Fred(:
+                    pass
+                """))
+        try:
+            files = [PYTHON_CODE_EXAMPLES_TO_PARSE + "testmodule01.py", temp.name, "no such file.py"]
+            results = parse_files(files, options=self.options, jobs=2)
+        finally:
+            os.remove(temp.name)
+        self.assertEqual([r.filename for r in results], files)
+        self.assertNotIn("Syntax error", results[0].pmodel.errors)
+        self.assertIn("Syntax error", results[1].pmodel.errors)
+        self.assertIn("no such file.py", results[2].pmodel.errors)
+
+    def test_unordered(self):
+        results = parse_files(self.files, options=self.options, jobs=3, ordered=False)
+        self.assertEqual(sorted(r.filename for r in results), self.files)
+
+    def test_ndjson_round_trip(self):
+        for r in parse_files(self.files, options=self.options, jobs=2):
+            data = json.loads(dump_pmodel_ndjson(r.pmodel, r.elapsed))
+            self.assertEqual(data["filename"], r.filename)
+            self.assertGreaterEqual(data["elapsed"], 0)
+            pmodel = pmodel_from_dict(data)
+            self.assertEqual(pmodel.errors, r.pmodel.errors)
+            self.assertEqual(pmodel.modulemethods, r.pmodel.modulemethods)
+            self.assertEqual(dump_old_structure(pmodel), dump_old_structure(r.pmodel))
@@ -0,0 +1,108 @@
+# Pruned visiting tests - skipping subtrees which can't affect the model
+#
+# Run with
+# python -m unittest tests.test_parse_pruning
+#
+# from the src directory
+
+import unittest
+from glob import glob
+from textwrap import dedent
+from parsing.api import new_parser, parse_text
+from parsing.core_parser_ast import Visitor, _ast_parse, _first_token, ast_backend
+from parsing.dump_pmodel import dump_old_structure
+from parsing.quick_parse import QuickParseAst
+from common.logwriter import LogWriterNull
+from tests.settings import PYTHON_CODE_EXAMPLES_TO_PARSE
+
+
+class TestParsePruning(unittest.TestCase):
+    def assertSameAsUnpruned(self, pmodel, expected):
+        self.assertEqual(dump_old_structure(pmodel), dump_old_structure(expected))
+        self.assertEqual(pmodel.errors, expected.errors)
+
+    def test_same_pmodel(self):
+        for filename in sorted(glob(PYTHON_CODE_EXAMPLES_TO_PARSE + "*.py")):
+            for mode in (2, 3):
+                with self.subTest(filename=filename, mode=mode):
+                    pmodel, _ = new_parser(filename, options={"mode": mode})
+                    expected, _ = new_parser(filename, options={"mode": mode, "PRUNE_VISIT": False})
+                    self.assertSameAsUnpruned(pmodel, expected)
+
+    def test_same_pmodel_tricky(self):
+        source_code = dedent(
+            """
+            x = Fred()
+
+            class Mary:
+                y = Fred(Bill())
+                def __init__(self):
+                    self.a = Fred(lambda: Bill(), [Sam() for s in range(3)])
+                    self.b = [Fred()]
+                    self.c = Fred() if x else Bill()
+                    self.items.append(Sam())
+                    helper(self.d, Fred())
+                    other, self.e = Fred(), Bill()
+                    assert Bill()
+                    self.f = Fred()
+                    assert Bill()
+                    if self.items.append(Sam()):
+                        pass
+                    for self.g in Fred():
+                        pass
+                    with open(f) as self.h:
+                        pass
+                    del x[self.i]
+                    items.append(Bill())
+                    return Fred(self.j)
+
+            def helper(a, b):
+                b.append(Fred())
+                return [Bill() for x in a]
+            """
+        )
+        for mode in (2, 3):
+            with self.subTest(mode=mode):
+                pmodel, _ = parse_text(source_code, options={"mode": mode})
+                expected, _ = parse_text(source_code, options={"mode": mode, "PRUNE_VISIT": False})
+                self.assertSameAsUnpruned(pmodel, expected)
+                self.assertIn(("a", "Fred"), pmodel.classlist["Mary"].classdependencytuples)
+
+    def test_visits_fewer_nodes(self):
+        source_code = dedent(
+            """
+            TABLE = [(i, str(i), [j for j in range(i)]) for i in range(100)]
+
+            class Fred:
+                def __init__(self):
+                    self.a = Bill(1, 2, [x * 2 for x in range(10)], key=lambda y: y.name)
+                    print(f"{self.a} is {len(TABLE)}")
+            """
+        )
+        ast = ast_backend(3)
+        root = _ast_parse(source_code, ast)
+        visits = {}
+        for prune in (True, False):
+            v = Visitor(QuickParseAst(root, ast), LogWriterNull(), {"PRUNE_VISIT": prune}, ast)
+            v.history = []  # every node visited, rather than just the last few
+            v.visit(root)
+            visits[prune] = len(v.history)
+        self.assertLess(visits[True], visits[False] / 2)
+
+    def test_first_token(self):
+        ast = ast_backend(3)
+        expected = {
+            "foo.bar(self.x)": "foo",
+            "self.x.append(y)": "self",
+            "a[1].b + c": "a",
+            "not x or y": "x",
+            "(a, b)": "a",
+            "fred() if x else mary()": "fred",
+            "'text'.join(self.x)": None,
+            "[]": None,
+            "lambda: fred": None,
+        }
+        for expression, token in expected.items():
+            with self.subTest(expression=expression):
+                node = ast.parse(expression, mode="eval").body
+                self.assertEqual(_first_token(node), token)
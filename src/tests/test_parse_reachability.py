@@ -0,0 +1,142 @@
+# Entry point reachability tests - parsing just the modules transitively imported
+#
+# Run with
+# python -m unittest tests.test_parse_reachability
+#
+# from the src directory
+
+import os
+import tempfile
+import unittest
+from textwrap import dedent
+from parsing.api import Reachable, new_parser_reachable, parse_text
+from parsing.core_parser_ast import OldParseModel
+from parsing.dump_pmodel import pmodel_from_dict, pmodel_to_dict
+from parsing.parallel import ParseResult
+from parsing import pmodel_codec
+from parsing.reachability import default_source_root, resolve_import
+
+SOURCE_TREE = {
+    "app/__init__.py": "",
+    "app/main.py": """
+        import os
+        from app import models
+        from .views import render
+        import app.util.helpers
+
+        def main():
+            models.Fred()
+        """,
+    "app/models.py": """
+        from .views import View
+
+        class Fred(View):
+            pass
+        """,
+    "app/views.py": """
+        from app.deep import Deep
+
+        class View:
+            def __init__(self):
+                self.deep = Deep()
+        """,
+    "app/deep.py": """
+        class Deep:
+            def f(self):
+                from . import deeper
+        """,
+    "app/deeper.py": "class Deeper:\n    pass\n",
+    "app/util/__init__.py": "",
+    "app/util/helpers.py": "def helper():\n    pass\n",
+    "app/tests/test_main.py": "from app.main import main\n",
+    "app/dead.py": "import app.main\n",
+}
+
+
+class TestParseReachability(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = self.directory.name
+        for name, source in SOURCE_TREE.items():
+            path = self.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w") as f:
+                f.write(dedent(source))
+        self.options = {"mode": 3}
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.root, *name.split("/"))
+
+    def depths(self, reachable):
+        return {os.path.relpath(f, self.root).replace(os.sep, "/"): d for f, d in reachable.depth.items()}
+
+    def test_imported_modules(self):
+        pmodel, _ = parse_text(
+            "import a.b, c as d\nfrom . import e\nfrom ..f import g\nfrom k import *\ndef h():\n    from i import j\n",
+            options=self.options,
+        )
+        self.assertEqual(pmodel.imported_modules, ["a.b", "c", ".e", "..f", "..f.g", "k", "i", "i.j"])
+        self.assertEqual(pmodel_codec.decode(pmodel_codec.encode(pmodel)).imported_modules, pmodel.imported_modules)
+        self.assertEqual(pmodel_from_dict(pmodel_to_dict(pmodel)).imported_modules, pmodel.imported_modules)
+
+    def test_resolve_import(self):
+        main = self.path("app/main.py")
+        self.assertEqual(default_source_root(main), self.root)
+        roots = [self.root]
+        self.assertEqual(resolve_import("app.models", main, roots), [self.path("app/__init__.py"), self.path("app/models.py")])
+        self.assertEqual(resolve_import(".views", main, roots), [self.path("app/views.py")])
+        self.assertEqual(resolve_import("..app.views", main, roots), [self.path("app/__init__.py"), self.path("app/views.py")])
+        self.assertEqual(resolve_import(".", main, roots), [self.path("app/__init__.py")])
+        self.assertEqual(resolve_import("app.util", main, roots), [self.path("app/__init__.py"), self.path("app/util/__init__.py")])
+        self.assertEqual(resolve_import("os", main, roots), [])
+        self.assertEqual(resolve_import(".views.render", main, roots), [])  # a name, not a submodule
+
+    def test_reachable(self):
+        expected = {
+            "app/main.py": 0,
+            "app/__init__.py": 1,
+            "app/models.py": 1,
+            "app/views.py": 1,
+            "app/util/__init__.py": 1,
+            "app/util/helpers.py": 1,
+            "app/deep.py": 2,
+            "app/deeper.py": 3,
+        }
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                reachable = Reachable([self.path("app/main.py")])
+                results = reachable.parse(self.options, jobs=jobs)
+                self.assertEqual(sorted(r.filename for r in results), sorted(reachable.depth))
+                self.assertEqual(self.depths(reachable), expected)
+                self.assertFalse([r.filename for r in results if "Syntax error" in r.pmodel.errors])
+
+    def test_max_depth(self):
+        reachable = Reachable([self.path("app/main.py")], max_depth=1)
+        reachable.parse(self.options, jobs=2)
+        self.assertEqual(max(reachable.depth.values()), 1)
+        self.assertNotIn(self.path("app/deep.py"), reachable.depth)
+
+        pmodels = new_parser_reachable([self.path("app/main.py")], self.options, max_depth=0)
+        self.assertEqual([pmodel.filename for pmodel, _ in pmodels], [self.path("app/main.py")])
+
+    def test_shorter_chain_found_later(self):
+        # Parse results arriving in an unlucky order - views.py found via models.py first
+        reachable = Reachable([self.path("app/main.py")], max_depth=2)
+        reachable.depth = {self.path("app/main.py"): 0}
+
+        def result(name, *imported_modules):
+            pmodel = OldParseModel()
+            pmodel.imported_modules = list(imported_modules)
+            return ParseResult(self.path(name), pmodel, "", 0.0)
+
+        self.assertEqual(reachable.discover(result("app/main.py", "app.models")), [self.path("app/__init__.py"), self.path("app/models.py")])
+        self.assertEqual(reachable.discover(result("app/models.py", ".views")), [self.path("app/views.py")])
+        self.assertEqual(reachable.discover(result("app/views.py", "app.deep")), [])  # 3 imports away
+        self.assertEqual(reachable.discover(result("app/__init__.py", ".views")), [])
+        found = reachable.discover(result("app/main.py", "app.models", "app.views"))  # views turns out to be nearer
+        self.assertEqual(found, [self.path("app/deep.py")])
+        self.assertEqual(reachable.depth[self.path("app/views.py")], 1)
+        self.assertEqual(reachable.depth[self.path("app/deep.py")], 2)
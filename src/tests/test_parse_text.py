@@ -0,0 +1,45 @@
+# In memory parsing tests
+#
+# Run with
+# python -m unittest tests.test_parse_text
+#
+# from the src directory
+
+import unittest
+from textwrap import dedent
+from parsing.api import new_parser, parse_text, parse_bytes
+from parsing.dump_pmodel import dump_old_structure
+from tests.settings import PYTHON_CODE_EXAMPLES_TO_PARSE
+
+
+class TestParseText(unittest.TestCase):
+    def test_same_as_file_parse(self):
+        FILE = PYTHON_CODE_EXAMPLES_TO_PARSE + "testmodule08_multiple_inheritance.py"
+        with open(FILE, encoding="utf-8") as f:
+            source_code = f.read()
+        pmodel1, debuginfo = new_parser(FILE, options={"mode": 3})
+        pmodel2, debuginfo = parse_text(source_code, FILE, options={"mode": 3})
+        self.assertEqual(pmodel1.errors, pmodel2.errors)
+        self.assertEqual(dump_old_structure(pmodel1), dump_old_structure(pmodel2))
+
+    def test_parse_bytes(self):
+        source_code = dedent(
+            """
+            class Fred(Mary):
+                def __init__(self):
+                    self.a = Blah()
+            """
+        )
+        data = source_code.replace("\n", "\r\n").encode("utf-8")
+        pmodel, debuginfo = parse_bytes(data, "fred.py", options={"mode": 3})
+        self.assertEqual(pmodel.errors, "")
+        self.assertEqual(pmodel.filename, "fred.py")
+        self.assertEqual(pmodel.classlist["Fred"].classesinheritsfrom, ["Mary"])
+        self.assertEqual(pmodel.classlist["Fred"].classdependencytuples, [("a", "Blah")])
+
+    def test_errors_mention_filename(self):
+        pmodel, debuginfo = parse_text("class Fred(:\n    pass\n", "fred.py", options={"mode": 3})
+        self.assertIn("Syntax error in parsing\n'fred.py'", pmodel.errors)
+
+        pmodel, debuginfo = parse_bytes(b"\xff\xfe class", "bad.py", options={"mode": 3})
+        self.assertIn("General exception in parsing\n'bad.py'", pmodel.errors)
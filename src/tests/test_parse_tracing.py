@@ -0,0 +1,46 @@
+# Visitor tracing vs production mode tests
+#
+# Run with
+# python -m unittest tests.test_parse_tracing
+#
+# from the src directory
+
+import unittest
+from parsing.core_parser_ast import (
+    Visitor,
+    ast_backend,
+    _ast_parse,
+    PARSE_HISTORY_SIZE,
+)
+from parsing.dump_pmodel import dump_old_structure
+from parsing.api import new_parser
+from parsing.quick_parse import QuickParse
+from common.logwriter import LogWriterNull
+from tests.settings import PYTHON_CODE_EXAMPLES_TO_PARSE
+
+
+class TestParseTracing(unittest.TestCase):
+    def visit(self, source, options):
+        ast = ast_backend(3)
+        node = _ast_parse(source, ast)
+        logh = LogWriterNull()
+        v = Visitor(QuickParse(source=source, logh=logh), logh, options, ast)
+        v.source_code_lines = source.splitlines(keepends=True)
+        v.visit(node)
+        return v
+
+    def test_production_mode_keeps_no_trace(self):
+        source = "\n".join(f"class C{i}:\n    def __init__(self):\n        self.a = C{i}()\n" for i in range(40))
+        v = self.visit(source, {"TRACE_PARSE": False})
+        self.assertEqual(v.result_for_log_proper, [])
+        self.assertEqual(len(v.history), PARSE_HISTORY_SIZE)
+        self.assertIn("ClassDef line 157 col 0", v.result_for_log_proper_cleaned)
+
+        v = self.visit(source, {"TRACE_PARSE": True})
+        self.assertIn("visit_Name", " ".join(v.result_for_log_proper))
+
+    def test_same_result_either_mode(self):
+        FILE = PYTHON_CODE_EXAMPLES_TO_PARSE + "testmodule08_multiple_inheritance.py"
+        pmodel1, _ = new_parser(FILE, options={"mode": 3, "TRACE_PARSE": True})
+        pmodel2, _ = new_parser(FILE, options={"mode": 3, "TRACE_PARSE": False})
+        self.assertEqual(dump_old_structure(pmodel1), dump_old_structure(pmodel2))
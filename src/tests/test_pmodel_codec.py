@@ -0,0 +1,58 @@
+# Binary pmodel codec tests
+#
+# Run with
+# python -m unittest tests.test_pmodel_codec
+#
+# from the src directory
+
+import sys
+import unittest
+from glob import glob
+from parsing.api import new_parser
+from parsing.core_parser_ast import OldParseModel
+from parsing.class_entry import ClassEntry
+from parsing.dump_pmodel import pmodel_to_dict
+from parsing import pmodel_codec
+from parsing.pmodel_codec import PmodelCodecError, encode, decode
+from tests.settings import PYTHON_CODE_EXAMPLES_TO_PARSE
+
+
+class TestPmodelCodec(unittest.TestCase):
+    def test_round_trip_examples(self):
+        for filename in sorted(glob(PYTHON_CODE_EXAMPLES_TO_PARSE + "*.py")):
+            for mode in (2, 3):
+                with self.subTest(filename=filename, mode=mode):
+                    pmodel, _ = new_parser(filename, options={"mode": mode})
+                    pmodel2 = decode(encode(pmodel))
+                    self.assertEqual(pmodel_to_dict(pmodel2), pmodel_to_dict(pmodel))
+                    for name, c in pmodel.classlist.items():
+                        self.assertEqual(pmodel2.classlist[name].stack_functions, c.stack_functions)
+
+    def test_unusual_strings(self):
+        pmodel = OldParseModel()
+        pmodel.filename = "ünïcode/fred.py"
+        pmodel.errors = "line 1\nline 2 \x00 \udcff"
+        c = pmodel.classlist["Fred"] = ClassEntry("Fred")
+        c.defs = ["λ", ""]
+        c.classdependencytuples = [("a", "Fred"), ("b", "Fred")]
+        c.AddAttribute("a", ["normal", "many"])
+        pmodel.symbol_lookups = {"models.Customer": True, "λ": False}
+        pmodel2 = decode(encode(pmodel))
+        self.assertEqual(pmodel_to_dict(pmodel2), pmodel_to_dict(pmodel))
+        self.assertEqual(pmodel2.symbol_lookups, pmodel.symbol_lookups)
+        self.assertIs(pmodel2.classlist["Fred"].defs[0], sys.intern("λ"))
+
+    def test_bad_data(self):
+        data = encode(new_parser(PYTHON_CODE_EXAMPLES_TO_PARSE + "testmodule01.py")[0])
+        for bad in [b"", b"PNPM", b"nope" + data[4:], data[:-1], data + b"\x00", data[:30]]:
+            with self.assertRaises(PmodelCodecError):
+                decode(bad)
+        future = data[:4] + (pmodel_codec.FORMAT_VERSION + 1).to_bytes(2, "little") + data[6:]
+        with self.assertRaisesRegex(PmodelCodecError, "version"):
+            decode(future)
+
+    def test_only_strings(self):
+        pmodel = OldParseModel()
+        pmodel.modulemethods = [None]
+        with self.assertRaises(PmodelCodecError):
+            encode(pmodel)
@@ -0,0 +1,81 @@
+# Quick parse from the ast tree tests
+#
+# Run with
+# python -m unittest tests.test_quickparse_ast
+#
+# from the src directory
+
+import unittest
+from glob import glob
+from textwrap import dedent
+from parsing.api import new_parser, parse_text
+from parsing.core_parser_ast import _ast_parse, ast_backend
+from parsing.dump_pmodel import dump_old_structure
+from parsing.quick_parse import QuickParse, QuickParseAst
+from tests.settings import PYTHON_CODE_EXAMPLES_TO_PARSE
+
+FINDINGS = ["quick_found_classes", "quick_found_module_defs", "quick_found_module_attrs"]
+
+
+class TestQuickParseAst(unittest.TestCase):
+    def test_same_as_regex_quick_parse(self):
+        """Both quick parses agree on every example, in whichever python syntax it parses as"""
+        for filename in sorted(glob(PYTHON_CODE_EXAMPLES_TO_PARSE + "*.py")):
+            with open(filename, encoding="utf-8") as f:
+                source = f.read()
+            for python in (2, 3):
+                ast = ast_backend(python)
+                try:
+                    root = _ast_parse(source, ast)
+                except SyntaxError:
+                    continue
+                qp = QuickParse(source=source)
+                qp_ast = QuickParseAst(root, ast)
+                for finding in FINDINGS:
+                    with self.subTest(filename=filename, python=python, finding=finding):
+                        self.assertIsInstance(getattr(qp_ast, finding), set)
+                        self.assertEqual(getattr(qp_ast, finding), set(getattr(qp, finding)))
+
+    def test_same_pmodel(self):
+        for filename in sorted(glob(PYTHON_CODE_EXAMPLES_TO_PARSE + "*.py")):
+            with self.subTest(filename=filename):
+                pmodel, _ = new_parser(filename, options={"mode": 3, "QUICK_PARSE": "ast"})
+                expected, _ = new_parser(filename, options={"mode": 3, "QUICK_PARSE": "regex"})
+                self.assertEqual(dump_old_structure(pmodel), dump_old_structure(expected))
+                self.assertEqual(pmodel.errors, expected.errors)
+
+    def test_not_fooled_by_strings(self):
+        source_code = dedent(
+            '''
+            EXAMPLE = """
+            class Fred:
+                pass
+            def helper(): pass
+            x = 1
+            """
+
+            class Mary (object):
+                class Inner:
+                    pass
+
+            async def fetch(url,
+                            timeout=10) -> bytes:
+                pass
+
+            a.b.c = 1
+            y, z = 1, 2
+            '''
+        )
+        qp_ast = QuickParseAst(_ast_parse(source_code))
+        self.assertEqual(qp_ast.quick_found_classes, {"Mary", "Inner"})
+        self.assertEqual(qp_ast.quick_found_module_defs, {"fetch"})
+        self.assertEqual(qp_ast.quick_found_module_attrs, {"EXAMPLE", "a"})
+
+    def test_class_names_without_annotation(self):
+        """Trees not produced by _ast_parse are walked for their classes"""
+        import ast
+
+        root = ast.parse("class A:\n    class B: pass\n")
+        self.assertEqual(QuickParseAst(root).quick_found_classes, {"A", "B"})
+        pmodel, _ = parse_text("class A:\n    def go(self):\n        self.b = B()\nclass B: pass\n")
+        self.assertEqual(pmodel.classlist["A"].classdependencytuples, [("b", "B")])
@@ -38,6 +38,7 @@ class MockVisitor:
         self.quick_parse = quick_parse
         self.init_lhs_rhs()
         self.imports_encountered = []
+        self.symbol_index = None
 
     def init_lhs_rhs(self):
         self.lhs = []
@@ -0,0 +1,155 @@
+# Project wide symbol index tests
+#
+# Run with
+# python -m unittest tests.test_symbol_index
+#
+# from the src directory
+
+import os
+import shutil
+import tempfile
+import unittest
+from textwrap import dedent
+from parsing.api import parse_files, parse_text
+from parsing.parse_cache import ParseCache
+from parsing.symbol_index import SymbolIndex, module_path
+
+MODELS = dedent(
+    """
+    class basket:
+        pass
+
+    class Customer:
+        pass
+    """
+)
+
+VIEWS = dedent(
+    """
+    from shop import models
+    from shop.models import basket
+
+    class View:
+        def __init__(self):
+            self.c = models.Customer()
+            self.b = basket()
+            self.n = notaclass()
+    """
+)
+
+
+class TestSymbolIndex(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.dir, "shop"))
+        self.init = self.write("shop/__init__.py", "")
+        self.models = self.write("shop/models.py", MODELS)
+        self.views = self.write("shop/views.py", VIEWS)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, name, source_code):
+        path = os.path.join(self.dir, name)
+        with open(path, "w") as f:
+            f.write(source_code)
+        return path
+
+    def test_module_path(self):
+        self.assertEqual(module_path(self.models), "shop.models")
+        self.assertEqual(module_path(self.init), "shop")
+        self.assertEqual(module_path(os.path.join(self.dir, "script.py")), "script")
+
+    def test_lookup(self):
+        index = SymbolIndex()
+        index.add(self.models, ["Customer", "basket"])
+        for name in ["Customer", "models.Customer", "shop.models.Customer", "basket"]:
+            self.assertIn(name, index)
+        self.assertNotIn("odels.Customer", index)
+        self.assertEqual(index.lookup("Customer"), [self.models])
+
+        lookups = {"basket": True, "models.Customer": True, "Sam": False}
+        self.assertTrue(index.agrees_with(lookups))
+        index.add(self.write("sam.py", ""), ["Fred"])
+        self.assertTrue(index.agrees_with(lookups))
+        index.add(self.models, ["Customer"])
+        self.assertNotIn("basket", index)
+        self.assertFalse(index.agrees_with(lookups))
+        index.remove(self.models)
+        index.remove(os.path.join(self.dir, "sam.py"))
+        self.assertEqual(len(index), 0)
+
+    def test_cross_module_composition(self):
+        pmodel, _ = parse_text(VIEWS, self.views, options={"mode": 3})
+        self.assertEqual(pmodel.classlist["View"].classdependencytuples, [])
+
+        index = SymbolIndex()
+        index.add(self.models, ["Customer", "basket"])
+        pmodel, _ = parse_text(VIEWS, self.views, options={"mode": 3, "symbol_index": index})
+        self.assertEqual(
+            pmodel.classlist["View"].classdependencytuples, [("c", "models.Customer"), ("b", "basket")]
+        )
+
+    def test_filled_by_parsing_and_persisted(self):
+        path = os.path.join(self.dir, "index", "project.index")
+        filenames = [self.views, self.models]
+        for run in range(3):
+            index = SymbolIndex.load(path)
+            cache = ParseCache(os.path.join(self.dir, "cache"))
+            results = parse_files(filenames, options={"mode": 3, "symbol_index": index}, jobs=1 + run % 2, cache=cache)
+            index.save(path)
+            dependencies = results[0].pmodel.classlist["View"].classdependencytuples
+            if run == 0:
+                # the order files are parsed in doesn't matter, the index isn't consulted until the next run
+                self.assertEqual(dependencies, [])
+                self.assertEqual(index.lookup("basket"), [self.models])
+            else:
+                self.assertEqual(dependencies, [("c", "models.Customer"), ("b", "basket")])
+        # the index content changed between the first two runs only
+        self.assertEqual(cache.stats()["hits"], 2)
+
+    def test_cache_only_misses_files_the_index_change_affects(self):
+        cache = ParseCache(os.path.join(self.dir, "cache"))
+        index = SymbolIndex()
+        options = {"mode": 3, "symbol_index": index}
+
+        def parse(jobs=1):
+            hits, misses = cache.hits, cache.misses
+            results = parse_files([self.views, self.models], options=options, jobs=jobs, cache=cache)
+            return results, (cache.hits - hits, cache.misses - misses)
+
+        self.assertEqual(parse()[1], (0, 2))
+        results, stats = parse(jobs=2)
+        self.assertEqual(stats, (1, 1))  # the first run filled the index, views.py looked up 'basket'
+        self.assertEqual(results[0].pmodel.symbol_lookups, {"models.Customer": True, "basket": True, "notaclass": False})
+        self.assertEqual(parse()[1], (2, 0))
+
+        index.add(self.write("shop/other.py", ""), ["Other"])  # nothing looks up 'Other'
+        self.assertEqual(parse(jobs=2)[1], (2, 0))
+        index.add(os.path.join(self.dir, "shop/other.py"), ["notaclass"])
+        results, stats = parse()
+        self.assertEqual(stats, (1, 1))
+        self.assertEqual(results[0].pmodel.classlist["View"].classdependencytuples[-1], ("n", "notaclass"))
+
+    def test_updated_unless_parsing_failed(self):
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                index = SymbolIndex()
+                self.write("shop/models.py", MODELS)
+                parse_files([self.models], options={"mode": 3, "symbol_index": index}, jobs=jobs)
+                self.assertEqual(index.lookup("Customer"), [self.models])
+
+                self.write("shop/models.py", "class Customer(:\n")
+                results = parse_files([self.models], options={"mode": 3, "symbol_index": index}, jobs=jobs)
+                self.assertIn("Syntax error", results[0].pmodel.errors)
+                self.assertEqual(index.lookup("Customer"), [self.models])  # kept
+
+                self.write("shop/models.py", "CUSTOMERS = []\n")
+                results = parse_files([self.models], options={"mode": 3, "symbol_index": index}, jobs=jobs)
+                self.assertIn("had no classes", results[0].pmodel.errors)
+                self.assertEqual(index.lookup("Customer"), [])  # all gone
+
+    def test_unreadable_index_is_empty(self):
+        path = self.write("bad.index", "{not json")
+        self.assertEqual(len(SymbolIndex.load(path)), 0)
+        self.assertEqual(len(SymbolIndex.load(os.path.join(self.dir, "missing.index"))), 0)
@@ -0,0 +1,41 @@
+# Visitor traversal tests - the iterative, dispatch table driven visit
+#
+# Run with
+# python -m unittest tests.test_visitor_traversal
+#
+# from the src directory
+
+import sys
+import unittest
+from parsing.api import parse_text
+from parsing.core_parser_ast import Visitor, ast_backend
+
+
+class TestVisitorTraversal(unittest.TestCase):
+    def test_deeper_than_the_recursion_limit(self):
+        depth = sys.getrecursionlimit() * 2
+        source_code = f"class A:\n    def f(self):\n        self.x = {'a + ' * depth}B()\n        self.y = C()\n"
+        pmodel, _ = parse_text(source_code, options={"mode": 3})
+        self.assertEqual(pmodel.errors, "")
+        self.assertEqual([a.attrname for a in pmodel.classlist["A"].attrs], ["x", "y"])
+        self.assertIn(("y", "C"), pmodel.classlist["A"].classdependencytuples)
+
+    def test_dispatch_table(self):
+        for mode in (2, 3):
+            ast = ast_backend(mode)
+            table = Visitor.dispatch_table(ast)
+            self.assertIs(Visitor.dispatch_table(ast), table)  # built once per backend
+            self.assertIs(table[ast.ClassDef], Visitor.visit_ClassDef)
+            self.assertIs(table[ast.Assign], Visitor.visit_Assign)
+            self.assertIs(table[ast.Pass], Visitor.visit_Pass)
+            self.assertIs(table[ast.Module], Visitor.visit_Module)
+            self.assertIs(table[ast.keyword], Visitor.generic_visit)  # no visit_keyword
+
+    def test_subclass_gets_its_own_table(self):
+        class MyVisitor(Visitor):
+            def visit_Pass(self, node):
+                self.passes = getattr(self, "passes", 0) + 1
+
+        ast = ast_backend(3)
+        self.assertIs(MyVisitor.dispatch_table(ast)[ast.Pass], MyVisitor.visit_Pass)
+        self.assertIs(Visitor.dispatch_table(ast)[ast.Pass], Visitor.visit_Pass)
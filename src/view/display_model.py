@@ -1,5 +1,6 @@
 import random
 import sys
+from collections import namedtuple
 from .graph import Graph, GraphNode
 from base64 import b64encode
 from typing import List, Set, Dict, Tuple, Optional
@@ -10,6 +11,12 @@ from termcolor import colored  # also install colorama to make this work on wind
 from gui.coord_utils import getpos
 
 
+# What update_graphmodel() / remove_graphmodel() did to the graph, so that views can follow suit
+GraphChanges = namedtuple(
+    "GraphChanges", ["added_nodes", "removed_nodes", "changed_nodes", "added_edges", "removed_edges"]
+)
+
+
 class UmlGraph(Graph):
     def create_new_node(self, id, l, t, w, h):
         # subclasses overriding, opportunity to create different instance type
@@ -74,6 +81,8 @@ class UmlGraph(Graph):
 
 
 class UmlNode(GraphNode):
+    __slots__ = ("attrs", "meths")
+
     def __init__(self, id, left, top, width=60, height=60, attrs=[], meths=[]):
         GraphNode.__init__(self, id, left, top, width=width, height=height)
         self.attrs = attrs
@@ -90,6 +99,8 @@ class UmlNode(GraphNode):
 
 
 class UmlModuleNode(GraphNode):
+    __slots__ = ("attrs", "meths")
+
     def __init__(self, id, left, top, width=60, height=60, attrs=[], meths=[]):
         GraphNode.__init__(self, id, left, top, width=width, height=height)
         self.attrs = attrs
@@ -106,6 +117,8 @@ class UmlModuleNode(GraphNode):
 
 
 class CommentNode(GraphNode):
+    __slots__ = ("comment",)
+
     def __init__(self, id, left, top, width=60, height=60, comment=""):
         GraphNode.__init__(self, id, left, top, width, height)
         self.comment = comment
@@ -155,12 +168,32 @@ class DisplayModel:
         self.umlcanvas = canvas
         self.pmodels_i_have_seen = []  # just for reference and dumping purposes
         self.alsms_i_have_seen = []  # just for reference and dumping purposes
+        self.contributions = {}  # filename -> (nodes, edges) each pmodel built, see graph_contribution()
         self.Clear()
 
     def Clear(self):
         self.graph.Clear()
         self.pmodels_i_have_seen = []
         self.alsms_i_have_seen = []
+        self.contributions = {}
+
+        # What build_view() has to catch up with, each {id(obj): obj}.  Only nodes and edges which
+        # have a shape need tracking - those added since the last build_view() have none yet.
+        self._changed_nodes = {}  # with shapes out of date
+        self._removed = {}  # nodes and edges no longer in the graph, whose shapes are still about
+
+    def node_changed(self, node):
+        """
+        Have the next build_view() update the shape of 'node', e.g. after changing its attrs.
+        DisplayModel's own methods do this for the nodes they change.
+        """
+        if getattr(node, "shape", None):
+            self._changed_nodes[id(node)] = node
+
+    def _removed_from_graph(self, obj):
+        shape = obj.shape if isinstance(obj, GraphNode) else obj.get("shape", None)
+        if shape:
+            self._removed[id(obj)] = obj
 
     def build_graphmodel(self, pmodel):
         """
@@ -187,6 +220,7 @@ class DisplayModel:
         Note AddUmlNode, AddUmlEdge are methods on the umlcanvas.
         """
         self.pmodels_i_have_seen.append(pmodel)
+        self.contributions[pmodel.filename] = self.graph_contribution(pmodel)
 
         generalisations = []
         compositions = []
@@ -236,6 +270,182 @@ class DisplayModel:
         # build_edges(associations, "associations")
 
 
+    def build_graphmodel_bulk(self, pmodels):
+        """
+        Same graph as calling build_graphmodel() on each of the pmodels in turn, but built in
+        one go, which is much quicker for many pmodels mentioning the same classes.
+
+        Algorithm
+        ---------
+        1. Every mention of a class - defined, or at either end of a relationship - is staged
+            in a dict by id, in the order build_graphmodel() would have created the nodes, and
+            every relationship in an ordered, duplicate free dict.
+        2. Each node's attrs and meths are then merged once, with the same result as
+            AddUmlNode() merging them on every mention, and the nodes are created.
+        3. Lastly the edges are created, generalisations then compositions of each pmodel in
+            turn, with AddUmlEdge()'s duplicate protection against edges already in the graph.
+        """
+        staged = {}  # id -> [attrs, meths, all attrs or None, all meths or None], None till mentioned twice
+        edges = {}  # (from id, to id, edge type) -> None
+
+        def mention(id, attrs, meths):
+            entry = staged.get(id)
+            if entry is None:
+                staged[id] = [attrs, meths, None, None]
+            elif entry[2] is None:
+                entry[2] = set(entry[0]).union(attrs)
+                entry[3] = set(entry[1]).union(meths)
+            else:
+                entry[2].update(attrs)
+                entry[3].update(meths)
+
+        for pmodel in pmodels:
+            self.pmodels_i_have_seen.append(pmodel)
+            classes, relationships = self._graphmodel_staging(pmodel)
+            self.contributions[pmodel.filename] = self._contribution(classes, relationships)
+            for classname, classAttrs, classMeths in classes:
+                mention(classname, classAttrs, classMeths)
+            for from_id, to_id, edge_type in relationships:
+                mention(from_id, [], [])
+                mention(to_id, [], [])
+            edges.update(dict.fromkeys(relationships))
+
+        nodes = {}
+        for id, (attrs, meths, all_attrs, all_meths) in staged.items():
+            node = self.graph.FindNodeById(id)
+            if node:
+                if all_attrs is not None:
+                    attrs, meths = list(all_attrs), list(all_meths)
+                self.merge_attrs_and_meths(node, attrs, meths)
+            elif all_attrs is None:
+                node = self.AddUmlNode(id, attrs, meths)
+            else:
+                node = self.AddUmlNode(id, sorted(all_attrs), sorted(all_meths))
+            nodes[id] = node
+
+        for from_id, to_id, edge_type in edges:
+            self.AddUmlEdge(nodes[from_id], nodes[to_id], edge_type)
+
+    def _graphmodel_staging(self, pmodel):
+        """
+        The classes and relationships of 'pmodel', as build_graphmodel() gathers them.
+
+        Returns: classes, relationships
+            classes: [(id, attrs, meths), ...]
+            relationships: [(from id, to id, edge type), ...] generalisations then compositions,
+                without duplicates, in the order found
+        """
+        classes = []
+        generalisations = {}
+        compositions = {}
+        for classname, classentry in pmodel.classlist.items():
+            for attr, otherclass in classentry.classdependencytuples:
+                compositions[(otherclass, classname, "composition")] = None
+            for parentclass in classentry.classesinheritsfrom:
+                generalisations[(classname, parentclass, "generalisation")] = None
+            classAttrs = sorted([attrobj.attrname for attrobj in classentry.attrs])
+            classes.append((classname, classAttrs, sorted(classentry.defs)))
+        return classes, list(generalisations) + list(compositions)
+
+    def graph_contribution(self, pmodel):
+        """
+        The nodes and edges that build_graphmodel() creates for 'pmodel'.
+
+        Returns: nodes, edges
+            nodes: {id: (attrs, meths)} incl. nodes only referred to by edges, with no attrs/meths
+            edges: set of (from id, to id, edge type)
+        """
+        return self._contribution(*self._graphmodel_staging(pmodel))
+
+    def _contribution(self, classes, relationships):
+        nodes = {classname: (classAttrs, classMeths) for classname, classAttrs, classMeths in classes}
+        for from_id, to_id, edge_type in relationships:
+            nodes.setdefault(from_id, ([], []))
+            nodes.setdefault(to_id, ([], []))
+        return nodes, set(relationships)
+
+    def update_graphmodel(self, pmodel):
+        """
+        Like build_graphmodel() but replaces whatever an earlier pmodel of the same file
+        contributed to the graph, rather than just adding to it.  Only the differences are applied -
+        nodes keep their positions and shapes, nodes and edges which no other file contributes are
+        removed, and attrs/meths are recomputed from every file which contributes to the node.
+
+        Returns: GraphChanges
+        """
+        self._forget_pmodel(pmodel.filename)
+        self.pmodels_i_have_seen.append(pmodel)
+        return self._apply_contribution(pmodel.filename, self.graph_contribution(pmodel))
+
+    def remove_graphmodel(self, filename):
+        """
+        Removes what the pmodel of 'filename' contributed to the graph, e.g. when the file is deleted.
+
+        Returns: GraphChanges
+        """
+        self._forget_pmodel(filename)
+        return self._apply_contribution(filename, ({}, set()))
+
+    def _forget_pmodel(self, filename):
+        self.pmodels_i_have_seen = [p for p in self.pmodels_i_have_seen if p.filename != filename]
+
+    def _apply_contribution(self, filename, contribution):
+        old_nodes, old_edges = self.contributions.pop(filename, ({}, set()))
+        new_nodes, new_edges = contribution
+        others = list(self.contributions.values())
+        if new_nodes:
+            self.contributions[filename] = contribution
+        changes = GraphChanges([], [], [], [], [])
+
+        for from_id, to_id, edge_type in old_edges - new_edges:
+            if any((from_id, to_id, edge_type) in edges for nodes, edges in others):
+                continue
+            edge = self.graph.FindEdge(
+                self.graph.FindNodeById(from_id), self.graph.FindNodeById(to_id), edge_type
+            )
+            if edge:
+                self.graph.delete_edge(edge)
+                self._removed_from_graph(edge)
+                changes.removed_edges.append(edge)
+
+        for id in list(old_nodes) + [id for id in new_nodes if id not in old_nodes]:
+            contributors = [nodes[id] for nodes, edges in others if id in nodes]
+            if id in new_nodes:
+                contributors.append(new_nodes[id])
+            node = self.graph.FindNodeById(id)
+            if not node:
+                if contributors:
+                    attrs = sorted(set().union(*[a for a, m in contributors]))
+                    meths = sorted(set().union(*[m for a, m in contributors]))
+                    changes.added_nodes.append(self.AddUmlNode(id, attrs, meths))
+                continue
+
+            # Take away what this file used to contribute, keeping anything from elsewhere
+            # e.g. a loaded workspace or edited by hand, then add what the files contribute now
+            old_attrs, old_meths = old_nodes.get(id, ([], []))
+            attrs = set(node.attrs) - set(old_attrs)
+            meths = set(node.meths) - set(old_meths)
+            if not contributors and not attrs and not meths and not self.graph.find_edges_for(node):
+                self.graph.DeleteNode(node)
+                self._removed_from_graph(node)
+                changes.removed_nodes.append(node)
+                continue
+            attrs = sorted(attrs.union(*[a for a, m in contributors]))
+            meths = sorted(meths.union(*[m for a, m in contributors]))
+            if (node.attrs, node.meths) != (attrs, meths):
+                node.attrs, node.meths = attrs, meths
+                self.node_changed(node)
+                changes.changed_nodes.append(node)
+
+        for from_id, to_id, edge_type in new_edges - old_edges:
+            from_node = self.graph.FindNodeById(from_id)
+            to_node = self.graph.FindNodeById(to_id)
+            if not self.graph.FindEdge(from_node, to_node, edge_type):
+                self.AddUmlEdge(from_node, to_node, edge_type)
+                changes.added_edges.append(self.graph.edges[-1])
+
+        return changes
+
     def build_graphmodel_from_alsm(self, alsm, options=None):
         """
         Build the graph with node and edges, from the ALSM (parse model)
@@ -316,8 +526,11 @@ class DisplayModel:
             parameter False. TODO remove this param?
             This is the culprit which keeps resetting the node positions after import!!
 
-        Updates existing shapes by default, with option to zap all shapes (which used to be
-                                                                            the default behaviour)
+        Incremental - creates shapes for the nodes and edges which haven't got one, updates
+        just the shapes of nodes changed since the last build_view() (see node_changed()) and
+        deletes the shapes of nodes and edges removed since, so that importing into a big
+        diagram only costs in proportion to what changed.  Option to zap all shapes and
+        recreate them (which used to be the default behaviour).
 
         Returns: -
         """
@@ -325,6 +538,19 @@ class DisplayModel:
         if translatecoords:
             self.umlcanvas.AllToWorldCoords()
 
+        changed_nodes, removed = self._changed_nodes, self._removed
+        self._changed_nodes, self._removed = {}, {}
+
+        # Shapes of whatever is no longer in the graph
+        for obj in removed.values():
+            if isinstance(obj, GraphNode):
+                if obj.shape and self.graph.FindNodeById(obj.id) is not obj:
+                    self.umlcanvas.delete_shape_view(obj.shape)
+                    obj.shape = None
+            elif obj.get("shape", None) and obj.graph is not self.graph:
+                self.umlcanvas.delete_shape_view(obj["shape"])
+                obj["shape"] = None
+
         # Clear existing visualisation, including any attached edges/lines
         if purge_existing_shapes:
             for node in self.graph.nodes:
@@ -338,6 +564,8 @@ class DisplayModel:
 
         # Create fresh visualisation (or update existing)
         for node in self.graph.nodes:
+            if node.shape and id(node) not in changed_nodes:
+                continue  # up to date
             if isinstance(node, CommentNode) or hasattr(node, "comment"):
                 # Comment shape
                 if node.shape:
@@ -548,8 +776,12 @@ class DisplayModel:
         """
         adds new attrs and meths into existing node, avoiding duplicates
         """
-        node.attrs = sorted(list(set(attrs + node.attrs)))
-        node.meths = sorted(list(set(meths + node.meths)))
+        merged_attrs = sorted(list(set(attrs + node.attrs)))
+        merged_meths = sorted(list(set(meths + node.meths)))
+        if (merged_attrs, merged_meths) != (node.attrs, node.meths):
+            self.node_changed(node)
+        node.attrs = merged_attrs
+        node.meths = merged_meths
 
     def obj_id(self, obj) -> str:
         # as hex, just the last few digits of the id, to reduce noise.  None protection.
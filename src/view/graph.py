@@ -1,6 +1,7 @@
 # graph / node abstraction
 # for use by spring layout and overlap removeal
 
+from operator import attrgetter
 from layout.line_intersection import FindLineIntersection
 from layout.permutations import getpermutations
 from common.architecture_support import listdiff
@@ -9,6 +10,83 @@ from typing import List, Set, Dict, Tuple, Optional
 
 global_colour_index = 1
 
+INDEXED_EDGE_KEYS = ("source", "target", "uml_edge_type", "shape")  # what Graph looks edges up by
+
+# The numbers each node has, see NodeCoordinates
+NODE_COORDINATES = ("left", "top", "width", "height", "layoutPosX", "layoutPosY", "layoutForceX", "layoutForceY")
+
+
+def _edge_key_property(key, default=None):
+    def fget(edge):
+        return edge.get(key, default)
+
+    def fset(edge, value):
+        edge[key] = value
+
+    return property(fget, fset, doc=f'edge["{key}"], {default!r} if not set')
+
+
+class Edge(dict):
+    """
+    A graph edge, a dict e.g. {"source": node, "target": node, "uml_edge_type": "composition"}.
+    Tells the graph it belongs to whenever one of the INDEXED_EDGE_KEYS changes, however it
+    is changed, so that the graph's indexes of its edges stay consistent.  Edges are
+    always different objects, lookups are by identity not by content.
+
+    The well known keys can be used as attributes too, edge.source is edge["source"].
+    """
+
+    __slots__ = ("graph", "seq")  # seq orders the edges as graph.edges does
+
+    source = _edge_key_property("source")
+    target = _edge_key_property("target")
+    uml_edge_type = _edge_key_property("uml_edge_type", "")
+    shape = _edge_key_property("shape")
+    weight = _edge_key_property("weight")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.graph = None
+        self.seq = 0
+
+    def _reindexing(self, method, *args):
+        graph = self.graph
+        if graph is None:
+            return method(self, *args)
+        graph._unindex_edge(self)
+        try:
+            return method(self, *args)
+        finally:
+            graph._index_edge(self)
+
+    def __setitem__(self, key, value):
+        if self.graph is not None and key in INDEXED_EDGE_KEYS:
+            self._reindexing(dict.__setitem__, key, value)
+        else:
+            dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self._reindexing(dict.__delitem__, key)
+
+    def pop(self, *args):
+        return self._reindexing(dict.pop, *args)
+
+    def popitem(self):
+        return self._reindexing(dict.popitem)
+
+    def setdefault(self, *args):
+        return self._reindexing(dict.setdefault, *args)
+
+    def update(self, *args, **kwargs):
+        return self._reindexing(lambda edge: dict.update(edge, *args, **kwargs))
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def clear(self):
+        self._reindexing(dict.clear)
+
 
 class Graph:
     def __init__(self):
@@ -25,10 +103,21 @@ class Graph:
         self.filedata_list = []
 
     def Clear(self):
+        for edge in getattr(self, "edges", []):
+            edge.graph = None
         self.nodeSet = {}
         self.nodes = []
         self.edges = []
 
+        # Indexes of the edges, each a dict of {id(edge): edge}.  Nodes are keyed by object
+        # so RenameNode() doesn't affect them, shapes by id() as they mightn't be hashable.
+        self._edges_by_source = {}  # node -> edges
+        self._edges_by_target = {}  # node -> edges
+        self._edges_by_key = {}  # (source node, target node, uml_edge_type or "") -> edges
+        self._edges_by_shape = {}  # id(shape) -> edges
+        self._edge_seq = 0
+        self._inheritance = None  # see inheritance
+
         self.layoutMinX = 0
         self.layoutMaxX = 0
         self.layoutMinY = 0
@@ -46,6 +135,7 @@ class Graph:
         del self.nodeSet[node.id]
         node.id = new_id
         self.nodeSet[node.id] = node
+        # edges are indexed by node object rather than id, so they need no updating
 
     def AddNode(self, node):
         if not self.FindNodeById(node.id):
@@ -53,18 +143,50 @@ class Graph:
             self.nodes.append(node)
         return node
 
+    # Edge indexes
+
+    def _index_edge(self, edge):
+        if edge.get("uml_edge_type") == "generalisation":
+            self._inheritance = None
+        eid = id(edge)
+        self._edges_by_source.setdefault(edge.get("source"), {})[eid] = edge
+        self._edges_by_target.setdefault(edge.get("target"), {})[eid] = edge
+        self._edges_by_key.setdefault(self._edge_key(edge), {})[eid] = edge
+        self._edges_by_shape.setdefault(id(edge.get("shape")), {})[eid] = edge
+
+    def _unindex_edge(self, edge):
+        if edge.get("uml_edge_type") == "generalisation":
+            self._inheritance = None
+        eid = id(edge)
+        for index, key in (
+            (self._edges_by_source, edge.get("source")),
+            (self._edges_by_target, edge.get("target")),
+            (self._edges_by_key, self._edge_key(edge)),
+            (self._edges_by_shape, id(edge.get("shape"))),
+        ):
+            edges = index[key]
+            del edges[eid]
+            if not edges:
+                del index[key]
+
+    @staticmethod
+    def _edge_key(edge):
+        return edge.get("source"), edge.get("target"), edge.get("uml_edge_type", "")
+
+    @staticmethod
+    def _in_edge_order(edges):
+        return sorted(edges, key=lambda edge: edge.seq)
+
     def find_edge_for_lineshape(self, shape) -> Dict:
-        edges = [edge for edge in self.edges if edge.get("shape", None) == shape]
+        edges = list(self._edges_by_shape.get(id(shape), {}).values())
         assert len(edges) == 1, f"Unexpected number {len(edges)} of graph edges {edges} for shape {shape}"
         return edges[0]
 
     def find_edges_for(self, node) -> List[Dict]:
         """Find edges that refer to node"""
-        edges = []
-        for edge in self.edges:
-            if edge["source"] == node or edge["target"] == node:
-                edges.append(edge)
-        return edges
+        edges = dict(self._edges_by_source.get(node, {}))
+        edges.update(self._edges_by_target.get(node, {}))
+        return self._in_edge_order(edges.values())
 
     def FindEdge(self, from_node, to_node, edge_type) -> Dict:
         """
@@ -74,15 +196,10 @@ class Graph:
         AddEdge complains that it cannot do duplicate protection, but
         we need it and I don't see why this Find function won't work.
         """
-        edge: Dict[str, GraphNode]  # e.g. {"source": source_node, "target": target_node}
-        for edge in self.edges:
-            if (
-                edge["source"] == from_node
-                and edge["target"] == to_node
-                and edge.get("uml_edge_type", "") == edge_type
-            ):
-                return edge
-        return None
+        edges = self._edges_by_key.get((from_node, to_node, edge_type))
+        if not edges:
+            return None
+        return min(edges.values(), key=lambda edge: edge.seq)  # the first added, if duplicated
 
     def AddEdge(self, source_node, target_node, weight=None):
         # Uniqueness of this edge relationship must be ensured by caller!
@@ -100,9 +217,13 @@ class Graph:
         if not self.FindNodeById(target_node.id):
             self.AddNode(target_node)
 
-        edge = {"source": source_node, "target": target_node}
+        edge = Edge(source=source_node, target=target_node)
         if weight:
             edge["weight"] = weight
+        self._edge_seq += 1
+        edge.seq = self._edge_seq
+        edge.graph = self
+        self._index_edge(edge)
         self.edges.append(edge)
         return edge
 
@@ -111,15 +232,52 @@ class Graph:
             self.nodes.remove(node)
             if node.id in list(self.nodeSet.keys()):
                 del self.nodeSet[node.id]
-        for edge in self.edges[:]:
-            if edge["source"].id == node.id or edge["target"].id == node.id:
-                self.delete_edge(edge)
+        doomed = self.find_edges_for(node)
+        if doomed:
+            self._remove_edges(doomed)
 
     def delete_edge(self, edge: Dict):
-        self.edges.remove(edge)
+        self._remove_edges([edge])
+
+    def _remove_edges(self, edges):
+        positions = sorted((self._edge_position(edge) for edge in edges), reverse=True)
+        for i in positions:
+            del self.edges[i]
+        for edge in edges:
+            self._unindex_edge(edge)
+            edge.graph = None
+
+    def _edge_position(self, edge):
+        """
+        Where 'edge' is in self.edges, by identity as another edge can have the same content.
+        AddEdge() appends, so the edges are in seq order and a binary search finds it, unless
+        someone has reordered self.edges.
+        """
+        lo, hi = 0, len(self.edges)
+        seq = getattr(edge, "seq", None)
+        if seq is not None:
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self.edges[mid].seq < seq:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo < len(self.edges) and self.edges[lo] is edge:
+                return lo
+        for i, e in enumerate(self.edges):
+            if e is edge:
+                return i
+        raise ValueError("edge not in graph")
 
     # Special getter which sorts nodes
 
+    @property
+    def inheritance(self):
+        """The InheritanceIndex of the nodes, kept until a generalisation edge changes"""
+        if self._inheritance is None:
+            self._inheritance = InheritanceIndex(self.edges)
+        return self._inheritance
+
     @property
     def nodes_sorted_by_generalisation(self):
         """
@@ -128,16 +286,8 @@ class Graph:
         so that they will end up along the left side of the page and thereby connected
         to the parent above with a generalisation ascii line.
         """
-
-        def num_descendant_levels(node):
-            if not node.children:
-                return 0
-            count = 1
-            child_level_counts = []
-            for n in node.children:
-                child_level_counts.append(num_descendant_levels(n))
-            count += max(child_level_counts)
-            return count
+        inheritance = self.inheritance
+        num_descendant_levels = inheritance.descendant_levels
 
         def count_attrs_meths(node):
             result = 0
@@ -161,6 +311,8 @@ class Graph:
 
             return result
 
+        expanded = set()
+
         def process_descendants(node, prevent_fc=False):
             """
             Note: this algorithm takes a while to understand. There is recursion
@@ -169,11 +321,18 @@ class Graph:
             'annotation'). Usually a lone node gets the 'root' annotation and
             the biggest (most methods/attrs) child (subclass) gets the honor to
             be 'fc'.
+
+            With multiple inheritance a node is reached once per parent.  Its descendants
+            come out the same each time, so are only gone through the first time - the
+            repeats would only be filtered out as duplicates anyway.
             """
+            if (node, prevent_fc) in expanded:
+                return []
+            expanded.add((node, prevent_fc))
             result = []
-            kids = sort_siblings(node.children)
+            kids = sort_siblings(inheritance.children(node))
             for child in kids:
-                if len(child.parents) > 1:  # multiple inheritance
+                if len(inheritance.parents(child)) > 1:  # multiple inheritance
                     annotation = "root"
                 elif child == kids[0]:
                     if prevent_fc:
@@ -192,7 +351,7 @@ class Graph:
 
         def order_the_nodes():
             result = []
-            parentless_nodes = [node for node in self.nodes if not node.parents]
+            parentless_nodes = [node for node in self.nodes if not inheritance.parents(node)]
             parentless_nodes = sorted(
                 parentless_nodes[:], key=lambda node: -num_descendant_levels(node)
             )  # put childless roots last
@@ -205,7 +364,6 @@ class Graph:
             node.id for node in self.nodes
         ]  # ensure no duplicates exist
 
-        self.setup_temporary_parent_child_relationships()
         result = order_the_nodes()
 
         # You CAN get repeated children entries due to having multiple parents (with multiple inheritance)
@@ -220,47 +378,42 @@ class Graph:
             node.id for node in result
         ]  # ensure no duplicates exist
 
-        self.del_temporary_parent_child_relationships()
         return result
 
     def remove_duplicates_preserver_order(self, lzt):
+        seen = set()
         result = []
         for item in lzt:
-            if item not in result:
+            if item not in seen:
+                seen.add(item)
                 result.append(item)
             # else:
             #    print "duplicate skipped", item
         return result
 
-    def setup_temporary_parent_child_relationships(self):
-        # setup temporary parent and child relationship attributes based on generalisation
-        for node in self.nodes:
-            node.parents = []
-            node.children = []
-        for edge in self.edges:
-            if "uml_edge_type" in edge and edge["uml_edge_type"] == "generalisation":
-                parent = edge["target"]
-                child = edge["source"]
-                if parent not in child.parents:
-                    child.parents.append(parent)
-                if child not in parent.children:
-                    parent.children.append(child)
-
     def colour_mark_siblings(self):
         """
         Siblings of different parents to be a different colour.
         All root nodes to be the same color.
         """
-        self.setup_temporary_parent_child_relationships()
+        inheritance = self.inheritance
         global global_colour_index
         global_colour_index = 0
 
         for node in self.nodes:
             node.colour_index = -1  # mark so that only assign a colour once
 
+        visited = set()
+
         def process_descendants(node):
             global global_colour_index
-            kids = node.children
+            if node in visited:
+                # Reached again via another parent - its children all have their colour already,
+                # going through them again would only move the colour index along
+                global_colour_index += inheritance.parent_visits(node)
+                return
+            visited.add(node)
+            kids = inheritance.children(node)
             if kids:
                 global_colour_index += 1
             for child in kids:
@@ -270,19 +423,11 @@ class Graph:
             for child in kids:
                 process_descendants(child)
 
-        parentless_nodes = [node for node in self.nodes if not node.parents]
+        parentless_nodes = [node for node in self.nodes if not inheritance.parents(node)]
         for node in parentless_nodes:
             node.colour_index = 0
             process_descendants(node)
 
-        self.del_temporary_parent_child_relationships()
-
-    def del_temporary_parent_child_relationships(self):
-        # remove parent / child knowledge attributes
-        for node in self.nodes:
-            del node.parents
-            del node.children
-
     # These next methods take id as parameters, not nodes.
 
     def FindNodeById(self, id):
@@ -471,6 +616,10 @@ class Graph:
 
 
 class GraphNode:
+    # No __dict__, attributes set later on like shape and colour_index need a slot too, as do those
+    # of subclasses
+    __slots__ = ("id", "previous_left", "previous_top", "shape", "colour_index", "__weakref__") + NODE_COORDINATES
+
     def __init__(self, id, left, top, width=60, height=60):
         self.id = id
 
@@ -554,3 +703,77 @@ class GraphNode:
                 getattr(self, "shape", None),
             )
         )
+
+
+class InheritanceIndex:
+    """
+    The generalisation hierarchy of a graph - the parents and children of each node, in the
+    order of the generalisation edges, and memoised measures of the descendants of each.
+    """
+
+    def __init__(self, edges):
+        parents = {}
+        children = {}
+        for edge in edges:
+            if edge.get("uml_edge_type") == "generalisation":
+                parent = edge["target"]
+                child = edge["source"]
+                parents.setdefault(child, {})[parent] = None
+                children.setdefault(parent, {})[child] = None
+        self._parents = {node: tuple(nodes) for node, nodes in parents.items()}
+        self._children = {node: tuple(nodes) for node, nodes in children.items()}
+        self._levels = {}
+        self._visits = {}
+
+    def parents(self, node):
+        return self._parents.get(node, ())
+
+    def children(self, node):
+        return self._children.get(node, ())
+
+    def descendant_levels(self, node):
+        """Number of generations of descendants 'node' has, 0 for none"""
+        levels = self._levels.get(node)
+        if levels is None:
+            self._levels[node] = 0  # in case of an inheritance cycle
+            kids = self.children(node)
+            levels = 1 + max(map(self.descendant_levels, kids)) if kids else 0
+            self._levels[node] = levels
+        return levels
+
+    def parent_visits(self, node):
+        """
+        How many times a walk of the descendants of 'node', which goes through each node once
+        per parent it is reached from, comes to a node with children.
+        """
+        visits = self._visits.get(node)
+        if visits is None:
+            self._visits[node] = 0  # in case of an inheritance cycle
+            kids = self.children(node)
+            visits = (1 if kids else 0) + sum(map(self.parent_visits, kids))
+            self._visits[node] = visits
+        return visits
+
+
+class NodeCoordinates:
+    """
+    Struct of arrays copy of some of the NODE_COORDINATES of 'nodes', one list per attribute
+    e.g. coords.layoutPosX[i] is nodes[i].layoutPosX.  Passes over every node, many times
+    over, can then index lists rather than look attributes up node by node.  Call
+    write_back() to store the numbers onto the nodes again.
+    """
+
+    def __init__(self, nodes, names=NODE_COORDINATES):
+        self.nodes = list(nodes)
+        self.names = names
+        for name in names:
+            setattr(self, name, list(map(attrgetter(name), self.nodes)))
+
+    def index(self):
+        """{id(node): its position in the arrays}"""
+        return {id(node): i for i, node in enumerate(self.nodes)}
+
+    def write_back(self, names=None):
+        for name in names or self.names:
+            for node, value in zip(self.nodes, getattr(self, name)):
+                setattr(node, name, value)
@@ -0,0 +1,69 @@
+"""
+Keeps a DisplayModel in sync with a directory of python source - the --watch mode of the cli and GUI.
+
+Only changed files are re-parsed, incrementally, and only the differences are applied to the
+graph (see DisplayModel.update_graphmodel) so existing nodes keep their layout positions.
+Any options["symbol_index"] is kept up to date with the classes of the changed files.
+"""
+
+from common.file_watcher import FileWatcher
+from parsing.incremental import IncrementalParser
+from view.display_model import GraphChanges
+
+
+class WatchSync:
+    def __init__(self, displaymodel, directory, options={}, watcher=None):
+        """
+        Args:
+            displaymodel: the DisplayModel to keep up to date
+            directory: root of the python source tree to watch
+            options: parse options e.g. {"mode": 3}
+            watcher: optional FileWatcher, by default one polling 'directory'
+        """
+        self.displaymodel = displaymodel
+        self.options = options
+        self.symbol_index = options.get("symbol_index")
+        self.watcher = watcher or FileWatcher(directory)
+        self.parsers = {}  # filename -> IncrementalParser
+        self.errors = {}  # filename -> pmodel.errors of the latest parse, if there were errors
+
+    def import_all(self):
+        """Parse every file in the tree into the display model, returns GraphChanges"""
+        return self.apply(self.watcher.files, [])
+
+    def poll(self):
+        """
+        Check for changed files and apply them to the display model once they have settled.
+
+        Returns: batch, changes - the FileWatcher batch and GraphChanges, or None, None
+        """
+        batch = self.watcher.poll()
+        if not batch:
+            return None, None
+        return batch, self.apply(batch.changed, batch.removed)
+
+    def apply(self, changed, removed):
+        changes = GraphChanges([], [], [], [], [])
+        for filename in changed:
+            parser = self.parsers.setdefault(filename, IncrementalParser(filename, self.options))
+            pmodel, debuginfo = parser.parse_file()
+            if pmodel.errors:
+                self.errors[filename] = pmodel.errors
+            else:
+                self.errors.pop(filename, None)
+            if parser.parsed_ok and self.symbol_index is not None:
+                self.symbol_index.update(pmodel)
+            if not parser.parsed_ok and filename in self.displaymodel.contributions:
+                continue  # e.g. half typed syntax error, keep what the file contributed last time
+            self._merge(changes, self.displaymodel.update_graphmodel(pmodel))
+        for filename in removed:
+            self.parsers.pop(filename, None)
+            self.errors.pop(filename, None)
+            if self.symbol_index is not None:
+                self.symbol_index.remove(filename)
+            self._merge(changes, self.displaymodel.remove_graphmodel(filename))
+        return changes
+
+    def _merge(self, changes, more):
+        for total, extra in zip(changes, more):
+            total.extend(extra)